@@ -49,6 +49,7 @@ typedef struct {
     bit     retard                              "When enabled, a positive edge moves the clock on by half the amount less than normal";
     bit     lock_to_master                      "Used by slaves to enable locking to a master when they are asynchronous";
     t_timer_lock_window_lsb lock_window_lsb     "Used by slaves to control the synchronization loop bandwidth";
+    bit     lock_window_auto                    "Used by slaves to start with the widest lock window and narrow it to @a lock_window_lsb while locked";
     bit[2]  synchronize                         "Two bits to indicate whether to write top or bottom halves";
     bit[64] synchronize_value                   "Value to synchronize to";
     bit     block_writes                        "If the timer has a seperate read/write interface, block writes";
@@ -64,6 +65,7 @@ typedef struct {
     bit[64] value   "64-bit timer value, reflecting the value in the timer counter";
     bit     irq     "Asserted if comparator >= timer value";
     bit     locked  "Asserted if the timer has locked (held low unless in a slave clock domain)";
+    bit[4]  fraction "Fraction of the timer value, in 1/16ths of a timer unit";
 } t_timer_value;
 
 /*t t_timer_sec_nsec */
@@ -73,3 +75,60 @@ typedef struct {
     bit[30] nsec     "Qualified by 'valid', nanoseconds since epoch of timer_value";
 } t_timer_sec_nsec;
 
+/*t t_timer_compare_request
+ *
+ * Request to a clock_timer_compare bank of compare registers (of up to 8)
+ *
+ */
+typedef struct {
+    bit     write        "Asserted to write @a value to compare register @a select, arming it and clearing its hit";
+    bit     disarm       "Used with @a write to leave compare register @a select disarmed";
+    bit[3]  select       "Compare register to write";
+    bit[64] value        "Compare value; an armed register hits when the timer value is first at or beyond it";
+    bit[8]  clear_hits   "Hits to clear, one bit per compare register";
+} t_timer_compare_request;
+
+/*t t_timer_compare_response */
+typedef struct {
+    bit[8]  hits         "Compare registers that have hit and not been cleared or rewritten";
+    bit[8]  armed        "Compare registers that are armed and have not yet hit";
+} t_timer_compare_response;
+
+/*t t_timer_capture_request
+ *
+ * Request to a clock_timer_capture FIFO
+ *
+ */
+typedef struct {
+    bit     pop              "Asserted to remove the capture at the head of the FIFO, if there is one";
+    bit     clear_overflows  "Asserted to clear the overflow count";
+} t_timer_capture_request;
+
+/*t t_timer_capture_response */
+typedef struct {
+    bit     valid        "Asserted if the FIFO is not empty; the other capture fields are then the capture at its head";
+    bit[8]  events       "Event inputs whose synchronized rising edges were captured together";
+    bit[64] value        "Timer value at the capture";
+    bit[4]  fraction     "Timer fraction at the capture";
+    bit[8]  overflows    "Number of captures lost because the FIFO was full, saturating at 255";
+} t_timer_capture_response;
+
+/*t t_timer_async_master
+ *
+ * Master clock domain signals of a clock_timer_async_master, for any
+ * number of clock_timer_async_slave modules in other clock domains
+ *
+ * The controls are synchronized by each slave; @a value and @a
+ * synchronize_value are only used by a slave when they are stable
+ *
+ */
+typedef struct {
+    bit     reset_counter                       "Master timer control reset_counter";
+    bit     enable_counter                      "Master timer control enable_counter";
+    bit     lock_to_master                      "Master timer control lock_to_master";
+    bit     synchronize_request                 "High for a whole lock window (of the master @a lock_window_lsb, which must be the widest of any slave) after a synchronize of the master; a slave synchronizes on its falling edge";
+    bit[4]  quarter_window_passed               "Toggled when the master timer value crosses from the first to the second quarter window, for each lock window lsb (lsb 4 at the bottom)";
+    bit[64] value                               "Master timer value";
+    bit[64] synchronize_value                   "Value for a slave to synchronize to - the top bits of @a value and the quarter window";
+} t_timer_async_master;
+
@@ -39,17 +39,44 @@ extern module clock_timer_async( clock master_clk             "Master clock",
                           input bit master_reset_n     "Active low reset",
                           clock slave_clk              "Slave clock, asynchronous to master",
                           input bit slave_reset_n     " Active low reset",
-                          input t_timer_control  master_timer_control     "Timer control in the master domain - synchronize, reset, enable and lock_to_master are used",
+                          input t_timer_control  master_timer_control     "Timer control in the master domain - synchronize, reset, enable, lock_to_master and lock window are used",
                           input t_timer_value    master_timer_value       "Timer value in the master domain - only 'value' is used",
                           input t_timer_control   slave_timer_control_in  "Timer control in the slave domain - only adder values are used",
                           output t_timer_control  slave_timer_control_out "Timer control in the slave domain for other synchronous clock_timers - all valid",
-                          output t_timer_value    slave_timer_value       "Timer value in the slave domain"
+                          output t_timer_value    slave_timer_value       "Timer value in the slave domain, with locked asserted while locked to the master"
     )
 {
     timing to   rising clock master_clk master_timer_control, master_timer_value;
     timing to   rising clock slave_clk slave_timer_control_in;
     timing from rising clock slave_clk slave_timer_control_out, slave_timer_value;
 }
+
+/*m clock_timer_async_master */
+extern module clock_timer_async_master( clock master_clk             "Master clock",
+                                        input bit master_reset_n     "Active low reset",
+                                        input t_timer_control  master_timer_control     "Timer control in the master domain - synchronize, reset, enable, lock_to_master and lock_window_lsb are used",
+                                        input t_timer_value    master_timer_value       "Timer value in the master domain - only 'value' is used",
+                                        output t_timer_async_master timer_async_master  "Master domain signals for any number of clock_timer_async_slave modules"
+    )
+{
+    timing to   rising clock master_clk master_timer_control, master_timer_value;
+    timing from rising clock master_clk timer_async_master;
+    timing comb input master_timer_control, master_timer_value;
+    timing comb output timer_async_master;
+}
+
+/*m clock_timer_async_slave */
+extern module clock_timer_async_slave( clock slave_clk              "Slave clock, asynchronous to master",
+                                       input bit slave_reset_n     " Active low reset",
+                                       input t_timer_async_master timer_async_master   "Master domain signals from a clock_timer_async_master",
+                                       input t_timer_control   slave_timer_control_in  "Timer control in the slave domain - adder values and lock window are used",
+                                       output t_timer_control  slave_timer_control_out "Timer control in the slave domain for other synchronous clock_timers - all valid",
+                                       output t_timer_value    slave_timer_value       "Timer value in the slave domain, with locked asserted while locked to the master"
+    )
+{
+    timing to   rising clock slave_clk timer_async_master, slave_timer_control_in;
+    timing from rising clock slave_clk slave_timer_control_out, slave_timer_value;
+}
 /*a Module */
 extern module clock_timer_as_sec_nsec( clock clk             "Timer clock",
                                 input bit reset_n     "Active low reset",
@@ -61,3 +88,51 @@ extern module clock_timer_as_sec_nsec( clock clk             "Timer clock",
     timing to   rising clock clk timer_control, timer_value;
     timing from rising clock clk timer_sec_nsec;
 }
+/*a Module - radix 4 divider (divider_bits_per_step of 2) */
+extern module clock_timer_as_sec_nsec_r4( clock clk             "Timer clock",
+                                   input bit reset_n     "Active low reset",
+                                   input t_timer_control timer_control "Control of the timer",
+                                   input t_timer_value  timer_value,
+                                   output t_timer_sec_nsec timer_sec_nsec
+    )
+{
+    timing to   rising clock clk timer_control, timer_value;
+    timing from rising clock clk timer_sec_nsec;
+}
+/*a Module - radix 16 divider (divider_bits_per_step of 4) */
+extern module clock_timer_as_sec_nsec_r16( clock clk             "Timer clock",
+                                    input bit reset_n     "Active low reset",
+                                    input t_timer_control timer_control "Control of the timer",
+                                    input t_timer_value  timer_value,
+                                    output t_timer_sec_nsec timer_sec_nsec
+    )
+{
+    timing to   rising clock clk timer_control, timer_value;
+    timing from rising clock clk timer_sec_nsec;
+}
+
+/*m clock_timer_compare */
+extern module clock_timer_compare( clock clk             "Timer clock",
+                                   input bit reset_n     "Active low reset",
+                                   input t_timer_control timer_control "Control of the timer",
+                                   input t_timer_compare_request timer_compare_request "Write of compare registers and clear of hits",
+                                   output t_timer_value  timer_value "Timer value with irq",
+                                   output t_timer_compare_response timer_compare_response "Hit and armed state of the compare registers"
+    )
+{
+    timing to   rising clock clk timer_control, timer_compare_request;
+    timing from rising clock clk timer_value, timer_compare_response;
+}
+
+/*m clock_timer_capture */
+extern module clock_timer_capture( clock clk             "Timer clock",
+                                   input bit reset_n     "Active low reset",
+                                   input t_timer_value timer_value "Timer value from a clock_timer (or clock_timer_async) in the same clock domain",
+                                   input bit[8] events   "Asynchronous event inputs; only the bottom @a capture_events are used",
+                                   input t_timer_capture_request timer_capture_request "Pop of the FIFO and clear of the overflow count",
+                                   output t_timer_capture_response timer_capture_response "Capture at the head of the FIFO, and the overflow count"
+    )
+{
+    timing to   rising clock clk timer_value, timer_capture_request;
+    timing from rising clock clk timer_capture_response;
+}
@@ -23,6 +23,7 @@
  */
 typedef struct {
     bit valid;
+    bit[3] search_step_log2 "If nonzero then search in steps of 2^search_step_log2 taps and bisect; must be no wider than the narrowest stable region of the clock";
 } t_phase_measure_request;
 
 /*t t_phase_measure_response
@@ -45,6 +46,8 @@ typedef struct {
     bit track_enable    "If asserted and enabled, then data delay can be adjusted in steps; otherwise eye width is measured and centre determined by data delay is not adjusted";
     bit[9] phase_width "Width in taps of a phase of clock - no eye can be wider than this! Must be valid if enable is asserted";
     bit[9] min_eye_width "Width in taps of a phase of clock - no eye can be wider than this! Must be valid if enable is asserted";
+    bit early_quality  "If asserted then a quality measurement completes as soon as the quality is clearly good or cannot be good";
+    bit fast_seek      "If asserted then seek with a halving step rather than 16 taps, and when tracking move directly to the measured eye center";
 } t_eye_track_request;
 
 /*t t_eye_track_response
@@ -1,3 +1,4 @@
+import shutil
 import cdl_desc
 from cdl_desc import CdlModule, CdlSimVerilatedModule, CModel, CSrc
 
@@ -17,14 +18,17 @@ class ClockingModules(cdl_desc.Modules):
     modules += [ CdlModule("clocking_phase_measure") ]
     modules += [ CdlModule("tb_clocking", src_dir=tb_src_dir) ]
     modules += [ CdlModule("tb_clock_timer", src_dir=tb_src_dir) ]
-    # Without cwv:  Ran 12 tests in 94.743s :real 1m34.834s: user: 1m17.309s sys 0m49.748s
-    # With cwv:     Ran 12 tests in 87.201s :real 1m27.292s: user: 1m7.740s sys 0m51.569s
-    # modules += [ CdlSimVerilatedModule("cwv__tb_clock_timer",
-    #                                    cdl_filename="tb_clock_timer",
-    #                                   src_dir=tb_src_dir,
-    #                                   verilog_filename="tb_clock_timer",
-    #                                   # extra_verilog=["../std/srw_srams.v", "../std/mrw_srams.v"]
-    #                                   ) ]
+    modules += [ CdlModule("tb_clock_timer_multi", src_dir=tb_src_dir) ]
+    # The Verilated tb_clock_timer is built if verilator is available; test/python/bench_backends
+    # compares it with the native simulation
+    if shutil.which("verilator") is not None:
+        modules += [ CdlSimVerilatedModule("cwv__tb_clock_timer",
+                                           cdl_filename="tb_clock_timer",
+                                           src_dir=tb_src_dir,
+                                           verilog_filename="tb_clock_timer",
+                                           # extra_verilog=["../std/srw_srams.v", "../std/mrw_srams.v"]
+                                           ) ]
+        pass
     pass
 
 class TimerModules(cdl_desc.Modules):
@@ -36,7 +40,13 @@ class TimerModules(cdl_desc.Modules):
     export_dirs = cdl_include_dirs + [ src_dir ]
     modules = []
     modules += [ CdlModule("clock_timer") ]
+    modules += [ CdlModule("clock_timer_async_master") ]
+    modules += [ CdlModule("clock_timer_async_slave") ]
     modules += [ CdlModule("clock_timer_async") ]
+    modules += [ CdlModule("clock_timer_compare") ]
+    modules += [ CdlModule("clock_timer_capture") ]
     modules += [ CdlModule("clock_timer_as_sec_nsec") ]
+    modules += [ CdlModule("clock_timer_as_sec_nsec_r4",  cdl_filename="clock_timer_as_sec_nsec", constants={"divider_bits_per_step":2}) ]
+    modules += [ CdlModule("clock_timer_as_sec_nsec_r16", cdl_filename="clock_timer_as_sec_nsec", constants={"divider_bits_per_step":4}) ]
     pass
 
@@ -0,0 +1,177 @@
+#a Copyright
+#
+#  This file 'bitfields.py' copyright Gavin J Stark 2017-20
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Imports
+import numpy as np
+from .clock_timer import t_timer_control, t_timer_value, t_timer_sec_nsec
+from .clock_timer import t_timer_compare_request, t_timer_compare_response
+from .clock_timer import t_timer_capture_request, t_timer_capture_response
+from .clocking    import t_phase_measure_request, t_phase_measure_response, t_eye_track_request, t_eye_track_response
+
+#a Classes
+#c c_bitfield_codec
+class c_bitfield_codec(object):
+    """
+    Codec for a structure descriptor (a dictionary of field name to
+    width, in the order of the CDL header)
+
+    The first field is at bit 0, and each subsequent field is packed
+    immediately above the previous one. A packed structure is an int,
+    or little-endian bytes (num_bytes per structure); in bulk it is a
+    NumPy array of num_bytes uint8 per structure, and unpacked it is a
+    NumPy structured array of dtype.
+
+    The field positions are compiled when the codec is created, as are
+    the 64-bit word, shift and mask of each field for the bulk methods.
+    """
+    #f __init__
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = []
+        lsb = 0
+        for (field_name, width) in fields.items():
+            if width>64: raise Exception("Field %s of %s is more than 64 bits wide"%(field_name, name))
+            self.fields.append((field_name, lsb, width, (1<<width)-1))
+            lsb += width
+            pass
+        self.width = lsb
+        self.num_bytes = (self.width+7)//8
+        self.num_words = (self.width+63)//64
+        dtypes = []
+        self.word_fields = []
+        for (field_name, lsb, width, mask) in self.fields:
+            for (max_width, dtype) in ((8,np.uint8), (16,np.uint16), (32,np.uint32), (64,np.uint64)):
+                if width<=max_width: break
+                pass
+            dtypes.append((field_name, dtype))
+            (word, shift) = divmod(lsb, 64)
+            self.word_fields.append((field_name, word, np.uint64(shift), np.uint64(mask), (shift+width)>64))
+            pass
+        self.dtype = np.dtype(dtypes)
+        pass
+    #f __repr__
+    def __repr__(self):
+        return "c_bitfield_codec(%s, %d bits)"%(self.name, self.width)
+    #f lsb_of
+    def lsb_of(self, field_name):
+        """
+        Bit position of a field
+        """
+        for (f, lsb, width, mask) in self.fields:
+            if f==field_name: return lsb
+            pass
+        raise KeyError(field_name)
+    #f pack
+    def pack(self, values=None, **kwargs):
+        """
+        Pack a dictionary of field values (and/or keyword arguments) to an int; missing fields are zero
+        """
+        if values is None: values={}
+        if len(kwargs)>0: values=dict(values, **kwargs)
+        data = 0
+        for (field_name, lsb, width, mask) in self.fields:
+            v = values.get(field_name, 0)
+            if (v<0) or (v>mask): raise ValueError("Value %d does not fit field %s of %s"%(v, field_name, self.name))
+            data |= v<<lsb
+            pass
+        return data
+    #f unpack
+    def unpack(self, data):
+        """
+        Unpack an int to a dictionary of field values
+        """
+        return dict([(field_name, (data>>lsb) & mask) for (field_name, lsb, width, mask) in self.fields])
+    #f pack_bytes
+    def pack_bytes(self, values=None, **kwargs):
+        """
+        Pack a dictionary of field values to num_bytes little-endian bytes
+        """
+        return self.pack(values, **kwargs).to_bytes(self.num_bytes, "little")
+    #f unpack_bytes
+    def unpack_bytes(self, data):
+        """
+        Unpack num_bytes little-endian bytes to a dictionary of field values
+        """
+        return self.unpack(int.from_bytes(data[:self.num_bytes], "little"))
+    #f empty
+    def empty(self, n):
+        """
+        Return a zeroed structured array of n records
+        """
+        return np.zeros(n, dtype=self.dtype)
+    #f _words_of_bytes
+    def _words_of_bytes(self, data):
+        if isinstance(data, np.ndarray) and (data.dtype==np.uint64) and (data.ndim==1) and (self.num_words==1):
+            return data.reshape(-1,1)
+        data = np.frombuffer(data, dtype=np.uint8) if not isinstance(data, np.ndarray) else data
+        data = data.reshape(-1, self.num_bytes)
+        if self.num_bytes==8*self.num_words:
+            return np.ascontiguousarray(data).view(np.uint64).reshape(-1, self.num_words)
+        words = np.zeros((len(data), self.num_words*8), dtype=np.uint8)
+        words[:,:self.num_bytes] = data
+        return words.view("<u8").reshape(-1, self.num_words)
+    #f pack_array
+    def pack_array(self, records):
+        """
+        Pack a structured array (with fields named as the codec) to an
+        (n, num_bytes) uint8 array of little-endian structures; use
+        .tobytes() on the result for a byte string
+        """
+        words = np.zeros((len(records), self.num_words), dtype="<u8")
+        for (field_name, word, shift, mask, spills) in self.word_fields:
+            v = records[field_name].astype(np.uint64) & mask
+            words[:,word] |= v << shift
+            if spills: words[:,word+1] |= v >> (np.uint64(64)-shift)
+            pass
+        return words.view(np.uint8).reshape(-1, self.num_words*8)[:,:self.num_bytes]
+    #f unpack_array
+    def unpack_array(self, data, out=None):
+        """
+        Unpack little-endian structures to a structured array of dtype
+
+        data is bytes (or a buffer) of n*num_bytes, or an (n, num_bytes)
+        uint8 array, or for structures of at most 64 bits a uint64 array
+        of packed values. If out is given the results are written to it
+        """
+        words = self._words_of_bytes(data)
+        if out is None: out=self.empty(len(words))
+        for (field_name, word, shift, mask, spills) in self.word_fields:
+            v = words[:,word] >> shift
+            if spills: v = v | (words[:,word+1] << (np.uint64(64)-shift))
+            out[field_name] = v & mask
+            pass
+        return out
+    #f pack_ints
+    def pack_ints(self, records):
+        """
+        Pack a structured array to a list of ints (for structures of any width)
+        """
+        return [int.from_bytes(r.tobytes(), "little") for r in self.pack_array(records)]
+    pass
+
+#a Codecs
+timer_control_codec          = c_bitfield_codec("t_timer_control",          t_timer_control)
+timer_value_codec            = c_bitfield_codec("t_timer_value",            t_timer_value)
+timer_sec_nsec_codec         = c_bitfield_codec("t_timer_sec_nsec",         t_timer_sec_nsec)
+timer_compare_request_codec  = c_bitfield_codec("t_timer_compare_request",  t_timer_compare_request)
+timer_compare_response_codec = c_bitfield_codec("t_timer_compare_response", t_timer_compare_response)
+timer_capture_request_codec  = c_bitfield_codec("t_timer_capture_request",  t_timer_capture_request)
+timer_capture_response_codec = c_bitfield_codec("t_timer_capture_response", t_timer_capture_response)
+phase_measure_request_codec  = c_bitfield_codec("t_phase_measure_request",  t_phase_measure_request)
+phase_measure_response_codec = c_bitfield_codec("t_phase_measure_response", t_phase_measure_response)
+eye_track_request_codec      = c_bitfield_codec("t_eye_track_request",      t_eye_track_request)
+eye_track_response_codec     = c_bitfield_codec("t_eye_track_response",     t_eye_track_response)
@@ -22,6 +22,7 @@ t_timer_control = {"reset_counter":1,
                  "retard":1,
                  "lock_to_master":1,
                  "lock_window_lsb":2,
+                 "lock_window_auto":1,
                  "synchronize":2,
                  "synchronize_value":64,
                  "block_writes":1,
@@ -32,9 +33,10 @@ t_timer_control = {"reset_counter":1,
 }
 
 #t t_timer_value
-t_timer_value = {"irq":1,
+t_timer_value = {"value":64,
+               "irq":1,
                "locked":1,
-               "value":64,
+               "fraction":4,
 }
 
 #t t_timer_sec_nsec
@@ -43,6 +45,42 @@ t_timer_sec_nsec = {"valid":1,
                "nsec":30,
 }
 
+#t t_timer_compare_request
+t_timer_compare_request = {"write":1,
+               "disarm":1,
+               "select":3,
+               "value":64,
+               "clear_hits":8,
+}
+
+#t t_timer_compare_response
+t_timer_compare_response = {"hits":8,
+               "armed":8,
+}
+
+#t t_timer_async_master
+t_timer_async_master = {"reset_counter":1,
+               "enable_counter":1,
+               "lock_to_master":1,
+               "synchronize_request":1,
+               "quarter_window_passed":4,
+               "value":64,
+               "synchronize_value":64,
+}
+
+#t t_timer_capture_request
+t_timer_capture_request = {"pop":1,
+               "clear_overflows":1,
+}
+
+#t t_timer_capture_response
+t_timer_capture_response = {"valid":1,
+               "events":8,
+               "value":64,
+               "fraction":4,
+               "overflows":8,
+}
+
 def dda_of_ratio(r):
     if r is None: return (0,0)
     (n,d) = r
@@ -50,7 +88,10 @@ def dda_of_ratio(r):
     dda_sub = d-2-dda_add
     return (dda_add, dda_sub)
     
-def find_closest_ratio(f, max):
+def find_closest_ratio_by_mediants(f, max):
+    """
+    Reference version of find_closest_ratio that tests every mediant in turn
+    """
     def ratio_compare(f, r):
         (n,d) = r
         diff = f*d - n
@@ -76,7 +117,96 @@ def find_closest_ratio(f, max):
         pass
     if must_be_above[0]==0: return None
     return must_be_above
-                     
+
+def find_closest_ratio(f, max):
+    """
+    Find the best rational approximation n/d to f (0<=f<1) whose DDA
+    add/sub values are both less than max, or None if there is none
+
+    This walks the Stern-Brocot tree, but a run of mediants that all
+    replace the same bound (one continued fraction term) is L+k*U or
+    U+k*L; f*d-n and the DDA values are linear in k, so the end of the
+    run is estimated directly and then checked with the same comparison
+    that testing each mediant in turn would use - the result is identical.
+    """
+    tolerance = 1.0/max/3
+    def ratio_compare(r):
+        (n,d) = r
+        diff = f*d - n
+        if abs(diff)<tolerance: return 0
+        if diff<0: return -1
+        return 1
+    def first_k_reaching(h0, h1, threshold, k_limit):
+        """
+        Smallest k in 1..k_limit-1 with h0+k*h1>=threshold, else k_limit
+        """
+        if h0+h1>=threshold: return 1
+        if h1<=0: return k_limit
+        return min(k_limit, (threshold-h0+h1-1)//h1)
+    must_be_above = (0, 1)
+    must_be_below = (1, 0)
+    while True:
+        # The first mediant determines the direction of the run
+        ratio_to_test = (must_be_below[0] + must_be_above[0],
+                         must_be_below[1] + must_be_above[1])
+        (dda_add, dda_sub) = dda_of_ratio(ratio_to_test)
+        if (dda_add>=max) or (dda_sub>=max):
+            break
+        c = ratio_compare(ratio_to_test)
+        if (c==0): return ratio_to_test
+        # Mediants of the run are base + k*step for k>=1
+        if (c==1):
+            (base, step) = (must_be_above, must_be_below)
+            pass
+        else:
+            (base, step) = (must_be_below, must_be_above)
+            pass
+        # First k whose mediant is out of DDA range (k_limit means never)
+        k_limit = max+2
+        k_limit = first_k_reaching(base[0]-1, step[0], max, k_limit)
+        k_limit = first_k_reaching(base[1]-base[0]-1, step[1]-step[0], max, k_limit)
+        # Estimate first k whose mediant does not compare as c, then correct it
+        diff_base = f*base[1] - base[0]
+        diff_step = f*step[1] - step[0]
+        if (c==1):
+            k = int((diff_base-tolerance)/-diff_step)+1
+            pass
+        elif diff_step>0:
+            k = int((-tolerance-diff_base)/diff_step)+1
+            pass
+        else:
+            k = k_limit
+            pass
+        if k<2: k=2
+        if k>k_limit: k=k_limit
+        mediant = lambda k:(base[0]+k*step[0], base[1]+k*step[1])
+        while (k>2) and (ratio_compare(mediant(k-1))!=c):
+            k -= 1
+            pass
+        while (k<k_limit) and (ratio_compare(mediant(k))==c):
+            k += 1
+            pass
+        # Mediants 1..k-1 all compared as c; k is out of range, or a match, or turns the walk
+        if (c==1):
+            must_be_above = mediant(k-1)
+            pass
+        else:
+            must_be_below = mediant(k-1)
+            pass
+        if k==k_limit:
+            break
+        ratio_to_test = mediant(k)
+        if ratio_compare(ratio_to_test)==0: return ratio_to_test
+        if (c==1):
+            must_be_below = ratio_to_test
+            pass
+        else:
+            must_be_above = ratio_to_test
+            pass
+        pass
+    if must_be_above[0]==0: return None
+    return must_be_above
+
 def clock_timer_adder_bonus(ns):
     ns_times_16 = (16.0*ns+1E-16)
     adder = int(ns_times_16)
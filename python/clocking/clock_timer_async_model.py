@@ -0,0 +1,431 @@
+#a Copyright
+#
+#  This file 'clock_timer_async_model.py' copyright Gavin J Stark 2017-20
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Imports
+import math
+import copy
+from .clock_timer import clock_timer_adder_bonus, clock_timer_period
+from .clock_timer_model import c_clock_timer_model
+from .sweep import sweep
+
+#a Constants
+# These match cdl/clock_timer_async_slave.cdl
+sync_toggle_count  = 16
+toggle_count_width = 5
+lock_window_lsbs   = (4, 6, 8, 10)
+lock_window_narrow_decisions = 2
+
+#a Classes
+#c c_timer_track
+class c_timer_track(object):
+    """
+    A clock_timer model in a clock domain, run with a constant control
+    except for one-edge control events (advance, retard, synchronize)
+
+    Edge k of the clock is at time phase + k*period; the model holds the
+    state after edge 'edge'. The timer is enabled from edge enable_edge.
+    """
+    #f __init__
+    def __init__(self, period, phase, adder, bonus, enable_edge=1):
+        self.period = period
+        self.phase  = phase
+        self.control = {"integer_adder":adder[0], "fractional_adder":adder[1],
+                        "bonus_subfraction_add":bonus[0], "bonus_subfraction_sub":bonus[1],
+                        "enable_counter":1}
+        self.disabled_control = dict(self.control, enable_counter=0)
+        self.enable_edge = enable_edge
+        self.model = c_clock_timer_model()
+        self.edge = 0
+        self.events = {}
+        pass
+    #f time_of_edge
+    def time_of_edge(self, edge):
+        return self.phase + edge*self.period
+    #f first_edge_after
+    def first_edge_after(self, time):
+        """
+        First edge strictly after time
+        """
+        return int(math.floor((time-self.phase)/float(self.period)))+1
+    #f last_edge_at
+    def last_edge_at(self, time):
+        """
+        Last edge at or before time
+        """
+        return int(math.floor((time-self.phase)/float(self.period)))
+    #f add_event
+    def add_event(self, edge, **kwargs):
+        """
+        Add a one-edge change to the control, at an edge after the current one
+        """
+        if edge<=self.edge: edge=self.edge+1
+        self.events[edge] = dict(self.events.get(edge,{}), **kwargs)
+        pass
+    #f _next_break
+    def _next_break(self):
+        """
+        Next edge after the current one with a change in control, or None
+        """
+        breaks = [e for e in self.events if e>self.edge]
+        if self.enable_edge>self.edge: breaks.append(self.enable_edge)
+        if len(breaks)==0: return None
+        return min(breaks)
+    #f _control_at
+    def _control_at(self, edge):
+        control = self.control if edge>=self.enable_edge else self.disabled_control
+        if edge in self.events: control=dict(control, **self.events[edge])
+        return control
+    #f advance_to
+    def advance_to(self, edge):
+        """
+        Advance the model to the state after edge, applying events on the way
+        """
+        while self.edge<edge:
+            next_break = self._next_break()
+            if (next_break is None) or (next_break>edge):
+                self.model.advance(edge-self.edge, self._control_at(edge))
+                self.edge = edge
+                break
+            if next_break>self.edge+1:
+                self.model.advance(next_break-1-self.edge, self._control_at(next_break-1))
+                pass
+            self.model.step(self._control_at(next_break))
+            self.events.pop(next_break, None)
+            self.edge = next_break
+            pass
+        return self.model.value
+    #f value_at
+    def value_at(self, edge):
+        """
+        Timer value after edge, which must not be before the current edge
+        """
+        return self.advance_to(edge)
+    #f value_at_time
+    def value_at_time(self, time):
+        return self.advance_to(max(self.edge, self.last_edge_at(time)))
+    #f edge_reaching
+    def edge_reaching(self, value):
+        """
+        Return the first edge after the current one at which the timer
+        value is at least value; the model is advanced to no further
+        than the edge before that
+        """
+        while True:
+            next_break = self._next_break()
+            if next_break!=self.edge+1:
+                control = self._control_at(self.edge+1)
+                n = self.model.cycles_until(value, control)
+                if (next_break is None) or (self.edge+n<next_break):
+                    return self.edge+max(1,n)
+                self.advance_to(next_break-1)
+                pass
+            model = self.model.copy().step(self._control_at(self.edge+1))
+            if model.value>=value: return self.edge+1
+            self.advance_to(self.edge+1)
+            pass
+        pass
+    pass
+
+#c c_clock_timer_async_model
+class c_clock_timer_async_model(object):
+    """
+    Event-driven behavioural model of cdl/clock_timer_async.cdl with
+    a master clock_timer, as in tb_cdl/tb_clock_timer.cdl
+
+    The model moves from master toggle to master toggle (the master
+    timer value crossing from the first to the second quarter window),
+    rather than cycle by cycle; the master and slave timers are
+    c_clock_timer_model instances that are fast-forwarded between
+    toggles.
+
+    For each toggle it determines the slave clock cycle in which the
+    synchronized toggle is seen - two slave edges after the master edge
+    that registers the toggle, with no metastability - and classifies
+    the slave as simultaneous, early, late or unexpected from the slave
+    timer value windows recorded in the slave FSM. Every sync_toggle_count
+    toggles the slave FSM decides the lock state and any advance or
+    retard, and the advance or retard is applied to the slave timer
+    with the same latency as the hardware. A master synchronize is
+    passed to the slave on the master's quarter-window crossings of
+    lock_window_lsb, and is worked out when the model is created.
+
+    Times are in the units of the clock periods (the testbench uses a
+    master clock period of 10 with a 1ns master timer adder).
+
+    With lock_window_auto the slave starts with the widest lock window
+    (lsb 10) and adapts it as the hardware does: see toggles_required()
+    and adapt_lock_window().
+    """
+    slave_control_latency = 3 # slave clock edges from enable to the slave timer seeing it
+    #f __init__
+    def __init__(self, slave_period=16, slave_adder=None, slave_bonus=None, slave_ns=None,
+                 master_period=10, master_adder=(1,0), master_bonus=(0,0),
+                 master_phase=0, slave_phase=3,
+                 lock_window_lsb=4, lock_to_master=True, lock_window_auto=False,
+                 master_sync=None, master_sync_time=5000):
+        """
+        The slave adder and bonus are given directly or from slave_ns
+        (the nominal slave period in timer units); master_sync is the
+        value the master timer is synchronized to at master_sync_time
+        """
+        if slave_adder is None:
+            if slave_ns is None: slave_ns = slave_period*clock_timer_period(master_adder, master_bonus)/master_period
+            (slave_adder, slave_bonus) = clock_timer_adder_bonus(slave_ns)
+            pass
+        if slave_bonus is None: slave_bonus=(0,0)
+        if lock_window_lsb not in lock_window_lsbs: raise Exception("Lock window lsb must be one of %s"%str(lock_window_lsbs))
+        self.lock_to_master   = lock_to_master
+        self.lock_window_auto = lock_window_auto
+        self.lock_window_min_lsb = lock_window_lsb
+        self.locked_decisions = 0
+        self.set_lock_window(lock_window_lsbs[-1] if lock_window_auto else lock_window_lsb)
+        self.master = c_timer_track(master_period, master_phase, master_adder, master_bonus, enable_edge=1)
+        slave_enable_edge = self.slave_control_latency + 1
+        self.slave  = c_timer_track(slave_period,  slave_phase,  slave_adder,  slave_bonus,  enable_edge=slave_enable_edge)
+        self.master_sync = master_sync
+        if master_sync is not None:
+            self.master.add_event(self.master.first_edge_after(master_sync_time),
+                                  synchronize=3, synchronize_value=master_sync)
+            self.synchronize_slave(self.master.first_edge_after(master_sync_time))
+            pass
+        self.toggles = {"seen":0, "early":0, "late":0, "unexpected":False}
+        self.phase_locked = False
+        self.locked = False
+        self.time = 0
+        self.decisions = []
+        pass
+    #f set_lock_window
+    def set_lock_window(self, lsb):
+        """
+        Set the lock window used by the slave (and for its master toggles)
+        """
+        self.lock_window_lsb = lsb
+        self.quarter_window  = 1<<lsb
+        self.window          = 4<<lsb
+        self.top_value_mask  = ~(self.window-1)
+        pass
+    #f toggles_required
+    def toggles_required(self):
+        """
+        Number of toggles per lock decision - sync_toggle_count, divided
+        by four for each step the window is wider than lock_window_lsb
+        (down to one toggle), so that a wider window in auto mode does
+        not make the decisions less frequent
+        """
+        steps = (self.lock_window_lsb - self.lock_window_min_lsb)//2
+        return sync_toggle_count >> min(4, 2*steps)
+    #f adapt_lock_window
+    def adapt_lock_window(self, unexpected, locked):
+        """
+        Narrow or widen the lock window in auto mode after a lock decision
+
+        An unexpected toggle, or a phase lock with the upper timer value
+        bits not matching (so the slave is a whole window out), widens
+        the window a step; lock_window_narrow_decisions consecutive
+        locked decisions narrow it a step, down to lock_window_lsb
+        """
+        if not self.lock_window_auto: return
+        lsb = self.lock_window_lsb
+        if unexpected or not locked:
+            self.locked_decisions = 0
+            if lsb<lock_window_lsbs[-1]: self.set_lock_window(lsb+2)
+            return
+        self.locked_decisions += 1
+        if self.locked_decisions>=lock_window_narrow_decisions:
+            self.locked_decisions = 0
+            if lsb>self.lock_window_min_lsb: self.set_lock_window(lsb-2)
+            pass
+        pass
+    #f quarter_of
+    def quarter_of(self, value):
+        return (value >> self.lock_window_lsb) & 3
+    #f next_crossing
+    @staticmethod
+    def next_crossing(master, lsb):
+        """
+        Find the next edge of a master c_timer_track where the timer
+        value moves from the first to the second quarter window of lsb,
+        and return the master edge that registers it
+        """
+        (quarter_window, window) = (1<<lsb, 4<<lsb)
+        while True:
+            value = master.model.value
+            boundary = (value & ~(window-1)) + quarter_window
+            if boundary<=value: boundary += window
+            edge = master.edge_reaching(boundary)
+            last_quarter = (master.value_at(edge-1)>>lsb) & 3
+            if (((master.value_at(edge)>>lsb) & 3)==1) and (last_quarter==0):
+                return edge+1
+            pass
+        pass
+    #f next_master_toggle
+    def next_master_toggle(self):
+        """
+        Find the next master toggle of the current window, and return the master edge that registers it
+        """
+        return self.next_crossing(self.master, self.lock_window_lsb)
+    #f synchronize_slave
+    def synchronize_slave(self, master_sync_edge):
+        """
+        Add the slave synchronize for a master synchronize at master_sync_edge
+
+        The master raises its synchronize request on the first crossing
+        of lock_window_lsb that it registers after the synchronize, and
+        drops it on the next; the slave synchronizes two edges after it
+        sees that, to the master top value it sees with it. The crossings
+        are found on a copy of the master, which is not advanced.
+        """
+        master = copy.deepcopy(self.master)
+        lsb = self.lock_window_min_lsb
+        while self.next_crossing(master, lsb)<=master_sync_edge: pass
+        c = self.slave.first_edge_after(master.time_of_edge(self.next_crossing(master, lsb)))+1
+        top_value = master.value_at_time(self.slave.time_of_edge(c)) & ~((4<<lsb)-1)
+        self.slave.add_event(c+2, synchronize=3, synchronize_value=top_value|(1<<lsb))
+        pass
+    #f toggle
+    def toggle(self):
+        """
+        Handle the next master toggle; return a decision dictionary if the slave FSM made a lock decision
+        """
+        master_edge = self.next_master_toggle()
+        master_time = self.master.time_of_edge(master_edge)
+
+        # Slave sees the toggle after its synchronizer, in slave cycle c
+        c = self.slave.first_edge_after(master_time)+1
+        ancient_window = self.quarter_of(self.slave.value_at(c-3))
+        last_window    = self.quarter_of(self.slave.value_at(c-2))
+        if last_window==0:
+            self.toggles["late"] += 1
+            pass
+        elif last_window==1:
+            if ancient_window!=0: self.toggles["early"] += 1
+            pass
+        else:
+            self.toggles["unexpected"] = True
+            pass
+        self.toggles["seen"] += 1
+        self.time = self.slave.time_of_edge(c)
+        if self.toggles["seen"]!=self.toggles_required(): return None
+
+        # Lock decision in slave cycle c+1
+        decision_time = self.slave.time_of_edge(c+1)
+        master_value = self.master.value_at_time(decision_time)
+        slave_value  = self.slave.value_at(c+1)
+        (early, late) = (self.toggles["early"], self.toggles["late"])
+        toggle_diff = (early-late) & ((1<<toggle_count_width)-1)
+        toggles_close_enough = ((toggle_diff>>2)&7) in (0,7)
+        if self.toggles_required()!=sync_toggle_count: toggles_close_enough = (early==late)
+        request = None
+        if self.toggles["unexpected"]:
+            self.phase_locked = False
+            self.locked = False
+            pass
+        else:
+            self.phase_locked = True
+            self.locked = ((master_value & self.top_value_mask)==(slave_value & self.top_value_mask))
+            if not toggles_close_enough:
+                request = "retard" if early>late else "advance"
+                pass
+            pass
+        if (request is not None) and self.lock_to_master:
+            self.slave.add_event(c+4, **{request:1})
+            pass
+        decision = {"time":decision_time, "master":master_value, "slave":slave_value,
+                    "early":early, "late":late, "unexpected":self.toggles["unexpected"],
+                    "locked":self.locked, "request":request, "lock_window_lsb":self.lock_window_lsb}
+        self.decisions.append(decision)
+        self.adapt_lock_window(self.toggles["unexpected"], self.locked)
+        self.toggles = {"seen":0, "early":0, "late":0, "unexpected":False}
+        return decision
+    #f run
+    def run(self, max_time, settle_decisions=None):
+        """
+        Run until max_time, or until locked for settle_decisions consecutive lock decisions
+
+        Returns a dictionary with the time to lock (the time of the
+        decision from which the slave remained locked, or None), and the
+        steady-state error (master-slave timer value at each lock
+        decision from then on); adjustments is the number of advance or
+        retard requests, which are only applied with lock_to_master
+        """
+        locked_decisions = 0
+        while self.time<max_time:
+            decision = self.toggle()
+            if decision is None: continue
+            locked_decisions = (locked_decisions+1) if decision["locked"] else 0
+            if (settle_decisions is not None) and (locked_decisions>=settle_decisions): break
+            pass
+        return self.results()
+    #f results
+    def results(self):
+        time_to_lock = None
+        errors = []
+        for d in self.decisions:
+            if not d["locked"]:
+                time_to_lock = None
+                errors = []
+                continue
+            if time_to_lock is None: time_to_lock=d["time"]
+            errors.append(d["master"]-d["slave"])
+            pass
+        results = {"locked":self.locked,
+                   "time_to_lock":time_to_lock,
+                   "time":self.time,
+                   "decisions":len(self.decisions),
+                   "adjustments":len([d for d in self.decisions if d["request"] is not None]),
+                   "final_lock_window_lsb":self.lock_window_lsb,
+                   "max_error":None,
+                   "mean_error":None,
+        }
+        if len(errors)>0:
+            results["max_error"]  = max([abs(e) for e in errors])
+            results["mean_error"] = sum(errors)/float(len(errors))
+            pass
+        return results
+    pass
+
+#a Functions
+#f clock_timer_async_lock
+def clock_timer_async_lock(config):
+    """
+    Run a c_clock_timer_async_model for a configuration dictionary
+
+    The keys max_time and settle_decisions are for run(); the rest are
+    for the model. The result is the configuration updated with the
+    results of run(). This is a module-level function so that it can be
+    used with sweep.sweep
+    """
+    config = dict(config)
+    max_time = config.pop("max_time")
+    settle_decisions = config.pop("settle_decisions", None)
+    model = c_clock_timer_async_model(**config)
+    results = dict(config, max_time=max_time)
+    results.update(model.run(max_time, settle_decisions=settle_decisions))
+    return results
+
+#f lock_window_sweep
+def lock_window_sweep(slave_configurations, lsbs=lock_window_lsbs, processes=None, **kwargs):
+    """
+    Run clock_timer_async_lock for every slave configuration (a
+    dictionary of model arguments such as slave_period and slave_ns)
+    with each lock_window_lsb, over a process pool; kwargs (which must
+    include max_time) apply to every configuration
+
+    Returns the list of results, in the order slave configuration then lsb
+    """
+    configurations = [dict(kwargs, lock_window_lsb=lsb, **c) for c in slave_configurations for lsb in lsbs]
+    return sweep(clock_timer_async_lock, configurations, processes=processes)
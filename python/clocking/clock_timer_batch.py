@@ -0,0 +1,253 @@
+#a Copyright
+#
+#  This file 'clock_timer_batch.py' copyright Gavin J Stark 2017-20
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+#a Imports
+import numpy as np
+from .clock_timer_model import c_clock_timer_as_sec_nsec_model
+
+#a Types
+#t t_adder_bonus_dtype
+# Signed and wider than the hardware fields, as the scalar functions do not
+# clamp: a bonus fraction that rounds to 1/1 gives a bonus_sub of -1, and
+# periods of 256ns or more give integer adders that do not fit in 8 bits
+t_adder_bonus_dtype = np.dtype([("integer_adder",    np.int32),
+                                ("fractional_adder", np.int32),
+                                ("bonus_add",        np.int32),
+                                ("bonus_sub",        np.int32),
+                                ("achieved_period",  np.float64),
+                                ("ppm_error",        np.float64),
+])
+
+#t t_timer_sec_nsec_dtype
+t_timer_sec_nsec_dtype = np.dtype([("valid", np.uint8),
+                                   ("sec",   np.uint64),
+                                   ("nsec",  np.uint32),
+])
+
+#a Functions
+#f find_closest_ratio_batch
+def find_closest_ratio_batch(f, max):
+    """
+    Array version of find_closest_ratio
+
+    Returns (n, d) integer arrays; n is 0 where find_closest_ratio would return None
+    """
+    f = np.asarray(f, dtype=np.float64).ravel()
+    tolerance = 1.0/max/3
+    def ratio_compare(f, n, d):
+        diff = f*d - n
+        return np.where(np.abs(diff)<tolerance, 0, np.where(diff<0, -1, 1))
+    def first_k_reaching(h0, h1, threshold, k_limit):
+        k = np.where(h1>0, (threshold-h0+h1-1)//np.where(h1>0,h1,1), k_limit)
+        k = np.where(h0+h1>=threshold, 1, k)
+        return np.minimum(k, k_limit)
+    above_n = np.zeros(len(f), dtype=np.int64)
+    above_d = np.ones(len(f),  dtype=np.int64)
+    below_n = np.ones(len(f),  dtype=np.int64)
+    below_d = np.zeros(len(f), dtype=np.int64)
+    result_n = np.zeros(len(f), dtype=np.int64)
+    result_d = np.zeros(len(f), dtype=np.int64)
+    active = np.arange(len(f))
+    while len(active)>0:
+        fa = f[active]
+        (an, ad, bn, bd) = (above_n[active], above_d[active], below_n[active], below_d[active])
+
+        # Out of range or matching first mediant completes the search
+        (mn, md) = (an+bn, ad+bd)
+        out_of_range = ((mn-1)>=max) | ((md-mn-1)>=max)
+        c = ratio_compare(fa, mn, md)
+        matched = (c==0) & ~out_of_range
+        result_n[active[matched]] = mn[matched]
+        result_d[active[matched]] = md[matched]
+        running = ~out_of_range & ~matched
+        done = active[~running]
+        result_n[done] = np.where(matched[~running], result_n[done], above_n[done])
+        result_d[done] = np.where(matched[~running], result_d[done], above_d[done])
+        active = active[running]
+        if len(active)==0: break
+        (fa, c, an, ad, bn, bd) = (fa[running], c[running], an[running], ad[running], bn[running], bd[running])
+
+        # Mediants of the run are base + k*step for k>=1
+        right = (c==1)
+        base_n = np.where(right, an, bn)
+        base_d = np.where(right, ad, bd)
+        step_n = np.where(right, bn, an)
+        step_d = np.where(right, bd, ad)
+        k_limit = np.full(len(active), max+2, dtype=np.int64)
+        k_limit = first_k_reaching(base_n-1, step_n, max, k_limit)
+        k_limit = first_k_reaching(base_d-base_n-1, step_d-step_n, max, k_limit)
+
+        # Estimate first k whose mediant does not compare as c, then correct it
+        diff_base = fa*base_d - base_n
+        diff_step = fa*step_d - step_n
+        with np.errstate(divide="ignore", invalid="ignore"):
+            k_right = (diff_base-tolerance)/-diff_step
+            k_left  = (-tolerance-diff_base)/diff_step
+            pass
+        k = np.where(right, k_right, np.where(diff_step>0, k_left, np.inf))
+        k = np.trunc(np.minimum(np.nan_to_num(k, nan=np.inf), float(max+2))).astype(np.int64)+1
+        k = np.minimum(k_limit, np.maximum(2, k))
+        mediant_compare = lambda k:ratio_compare(fa, base_n+k*step_n, base_d+k*step_d)
+        while True:
+            step_back = (k>2) & (mediant_compare(k-1)!=c)
+            if not step_back.any(): break
+            k = k - step_back
+            pass
+        while True:
+            step_on = (k<k_limit) & (mediant_compare(k)==c)
+            if not step_on.any(): break
+            k = k + step_on
+            pass
+
+        # Mediants 1..k-1 all compared as c; k is out of range, or a match, or turns the walk
+        (pn, pd) = (base_n+(k-1)*step_n, base_d+(k-1)*step_d)
+        (kn, kd) = (base_n+k*step_n, base_d+k*step_d)
+        in_range = (k<k_limit)
+        ck = mediant_compare(k)
+        an = np.where(right, pn, np.where(in_range & (ck!=0), kn, an))
+        ad = np.where(right, pd, np.where(in_range & (ck!=0), kd, ad))
+        bn = np.where(right, np.where(in_range & (ck!=0), kn, bn), pn)
+        bd = np.where(right, np.where(in_range & (ck!=0), kd, bd), pd)
+        (above_n[active], above_d[active], below_n[active], below_d[active]) = (an, ad, bn, bd)
+
+        matched = in_range & (ck==0)
+        result_n[active[matched]] = kn[matched]
+        result_d[active[matched]] = kd[matched]
+        done = active[~in_range]
+        result_n[done] = above_n[done]
+        result_d[done] = above_d[done]
+        active = active[in_range & ~matched]
+        pass
+    return (result_n, result_d)
+
+#f dda_of_ratio_batch
+def dda_of_ratio_batch(n, d):
+    """
+    Array version of dda_of_ratio; a zero numerator (None) gives (0,0)
+    """
+    dda_add = np.where(n==0, 0, n-1)
+    dda_sub = np.where(n==0, 0, d-2-(n-1))
+    return (dda_add, dda_sub)
+
+#f clock_timer_period_batch
+def clock_timer_period_batch(adders, bonuses, periods=None):
+    """
+    Array version of clock_timer_period
+
+    adders is an array of (integer, fractional) pairs and bonuses one of
+    (add, sub) pairs; the ppm_error is relative to periods if given, else NaN
+    """
+    adders  = np.asarray(adders,  dtype=np.int64).reshape(-1,2)
+    bonuses = np.asarray(bonuses, dtype=np.int64).reshape(-1,2)
+    result = np.zeros(len(adders), dtype=t_adder_bonus_dtype)
+    result["integer_adder"]    = adders[:,0]
+    result["fractional_adder"] = adders[:,1]
+    result["bonus_add"]        = bonuses[:,0]
+    result["bonus_sub"]        = bonuses[:,1]
+    ns_times_16 = adders[:,0]*16 + adders[:,1]
+    no_bonus = (bonuses[:,0]==0) & (bonuses[:,1]==0)
+    bonus = np.where(no_bonus, 0., (bonuses[:,0]+1.) / np.where(no_bonus, 2, bonuses[:,0] + bonuses[:,1] + 2))
+    result["achieved_period"] = (ns_times_16 + bonus) / 16.0
+    if periods is None:
+        result["ppm_error"] = np.nan
+        pass
+    else:
+        periods = np.asarray(periods, dtype=np.float64).ravel()
+        result["ppm_error"] = (result["achieved_period"] - periods) / periods * 1E6
+        pass
+    return result
+
+#f clock_timer_adder_bonus_batch
+def clock_timer_adder_bonus_batch(periods):
+    """
+    Array version of clock_timer_adder_bonus, for an array of periods in ns
+
+    Returns a structured array of t_adder_bonus_dtype, including the
+    achieved period (as clock_timer_period) and its error in ppm
+
+    The results match the scalar functions bit for bit, as the same
+    floating point operations are performed in the same order
+    """
+    periods = np.asarray(periods, dtype=np.float64).ravel()
+    ns_times_16 = (16.0*periods+1E-16)
+    adder = np.trunc(ns_times_16).astype(np.int64)
+    bonus = ns_times_16 - adder
+    (n, d) = find_closest_ratio_batch(bonus, 256)
+    (dda_add, dda_sub) = dda_of_ratio_batch(n, d)
+    return clock_timer_period_batch(np.stack((adder // 16, adder % 16), axis=1),
+                                    np.stack((dda_add, dda_sub), axis=1),
+                                    periods)
+
+#f timer_sec_nsec_of_values
+def timer_sec_nsec_of_values(values):
+    """
+    Return the t_timer_sec_nsec_dtype array that a tracking
+    clock_timer_as_sec_nsec produces for an array of timer values (in
+    the cycle after each value)
+    """
+    values = np.asarray(values, dtype=np.uint64).ravel()
+    result = np.zeros(len(values), dtype=t_timer_sec_nsec_dtype)
+    (result["sec"], result["nsec"]) = np.divmod(values, np.uint64(10**9))
+    result["valid"] = 1
+    return result
+
+#f clock_timer_as_sec_nsec_batch
+def clock_timer_as_sec_nsec_batch(values, reset_counter=0, enable_counter=1, synchronize=0, model=None):
+    """
+    Array version of c_clock_timer_as_sec_nsec_model
+
+    values is an array of timer values, one per clock cycle, with the
+    reset_counter, enable_counter and synchronize timer controls for
+    the same cycles (each an array or a constant). Returns a
+    t_timer_sec_nsec_dtype array of the output in the cycle after each
+    value, bit for bit as the hardware.
+
+    The model (a c_clock_timer_as_sec_nsec_model, by default one just
+    out of reset) is stepped a cycle at a time only until it is
+    tracking the timer; from then on, until a control change or a
+    timer value that does not move forward by less than a second, the
+    output is the sec/nsec of the previous timer value, and that is
+    calculated for the whole run at once. The model is left in the
+    state after the last value.
+    """
+    values = np.asarray(values, dtype=np.uint64).ravel()
+    n = len(values)
+    reset_counter  = np.broadcast_to(np.asarray(reset_counter,  dtype=np.int64), (n,))
+    enable_counter = np.broadcast_to(np.asarray(enable_counter, dtype=np.int64), (n,))
+    synchronize    = np.broadcast_to(np.asarray(synchronize,    dtype=np.int64), (n,))
+    if model is None: model=c_clock_timer_as_sec_nsec_model()
+    result = np.zeros(n, dtype=t_timer_sec_nsec_dtype)
+
+    # Cycles that break a run of tracking
+    disabled = (reset_counter!=0) | (enable_counter==0) | (synchronize!=0)
+    not_forward = np.zeros(n, dtype=bool)
+    not_forward[1:] = (values[1:]<values[:-1]) | ((values[1:]-values[:-1])>=np.uint64(10**9))
+    breaks = np.flatnonzero(disabled | not_forward)
+
+    i = 0
+    while i<n:
+        if (i>0) and not disabled[i] and not not_forward[i] and model.is_tracking(int(values[i-1])):
+            j = breaks[np.searchsorted(breaks, i)] if (breaks.size>0) and (breaks[-1]>=i) else n
+            result[i:j] = timer_sec_nsec_of_values(values[i:j])
+            model.set_tracking(int(values[j-1]))
+            i = j
+            continue
+        model.step({"reset_counter":int(reset_counter[i]), "enable_counter":int(enable_counter[i]), "synchronize":int(synchronize[i])},
+                   int(values[i]))
+        result[i] = (model.valid, model.sec, model.nsec)
+        i += 1
+        pass
+    return result
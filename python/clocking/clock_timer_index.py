@@ -0,0 +1,163 @@
+#a Copyright
+#
+#  This file 'clock_timer_index.py' copyright Gavin J Stark 2017-20
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Imports
+import os
+import bisect
+import pickle
+from .clock_timer import dda_of_ratio, clock_timer_period
+
+#a Globals
+index_version = 1
+default_cache_filename = os.path.join(os.path.expanduser("~"), ".cache", "atcf_clocking",
+                                      "clock_timer_period_index_v%d.pickle"%index_version)
+
+#a Classes
+#c c_clock_timer_period_index
+class c_clock_timer_period_index(object):
+    """
+    Index of every period achievable by a clock_timer, sorted by period
+
+    A period is (adder + bonus)/16, where adder is the 12-bit integer
+    and fractional adder (0 to 4095) and bonus is 0 or one of the bonus
+    DDA fractions (add+1)/(add+sub+2). So the sorted index is held as
+    the sorted table of distinct bonus fractions, which is the same for
+    every adder; a query bisects that table for the one or few adder
+    values that can be in range.
+
+    Where more than one DDA configuration gives the same bonus fraction
+    the one with the shortest DDA cycle (smallest add+sub) is indexed;
+    bonus fraction 1/2 is (1,1), as (0,0) disables the bonus.
+    """
+    max_adder = 255*16+15
+    #f __init__
+    def __init__(self, fractions=None):
+        if fractions is None: fractions=self.build_fractions()
+        self.fractions = fractions
+        self.fraction_values = [f for (f,bonus) in fractions]
+        pass
+    #f build_fractions - classmethod
+    @classmethod
+    def build_fractions(cls):
+        """
+        Build the sorted list of (bonus fraction, (add, sub)) for the 8-bit bonus DDA
+        """
+        fractions = {0.0:(0,0)}
+        for d in range(2, 256+256+3):
+            for n in range(1, d):
+                bonus = dda_of_ratio((n,d))
+                if (bonus[0]>255) or (bonus[1]>255) or (bonus[1]<0): continue
+                if bonus==(0,0): bonus=(1,1)
+                f = (bonus[0]+1.) / (bonus[0] + bonus[1] + 2)
+                if f not in fractions: fractions[f]=bonus
+                pass
+            pass
+        return sorted(fractions.items())
+    #f load - classmethod
+    @classmethod
+    def load(cls, filename=default_cache_filename):
+        """
+        Load the index from the cache file, building and saving it if required
+        """
+        try:
+            with open(filename,"rb") as f:
+                (version, fractions) = pickle.load(f)
+                pass
+            if version==index_version: return cls(fractions)
+            pass
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+            pass
+        index = cls()
+        index.save(filename)
+        return index
+    #f save
+    def save(self, filename):
+        """
+        Save the index to a cache file; failure to do so is not an error
+        """
+        try:
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            tmp_filename = "%s.%d"%(filename, os.getpid())
+            with open(tmp_filename,"wb") as f:
+                pickle.dump((index_version, self.fractions), f)
+                pass
+            os.replace(tmp_filename, filename)
+            pass
+        except OSError:
+            pass
+        pass
+    #f config_of
+    def config_of(self, adder, i):
+        """
+        Return (period, adder, bonus) for an adder value (0 to 4095) and fraction index
+        """
+        bonus = self.fractions[i][1]
+        adder = (adder//16, adder%16)
+        return (clock_timer_period(adder, bonus), adder, bonus)
+    #f nearest
+    def nearest(self, ns):
+        """
+        Return (period, adder, bonus) for the achievable period nearest to ns
+        """
+        adder = min(self.max_adder, max(0, int(ns*16)))
+        i = bisect.bisect_left(self.fraction_values, ns*16-adder)
+        candidates = []
+        for (a, j) in ((adder, i-1), (adder, i), (adder+1, 0), (adder-1, len(self.fractions)-1)):
+            if (a<0) or (a>self.max_adder) or (j<0) or (j>=len(self.fractions)): continue
+            if (a==0) and (j==0): continue
+            candidates.append(self.config_of(a, j))
+            pass
+        return min(candidates, key=lambda c:abs(c[0]-ns))
+    #f within_ppm
+    def within_ppm(self, ns, ppm):
+        """
+        Return a list of (period, adder, bonus) for every achievable period
+        within ppm parts per million of ns, sorted by period
+        """
+        ns_min = ns * (1-ppm*1E-6)
+        ns_max = ns * (1+ppm*1E-6)
+        results = []
+        for adder in range(max(0, int(ns_min*16)), min(self.max_adder, int(ns_max*16))+1):
+            i_min = bisect.bisect_left(self.fraction_values, ns_min*16-adder)
+            i_max = bisect.bisect_right(self.fraction_values, ns_max*16-adder)
+            for i in range(max(0,i_min-1), min(len(self.fractions), i_max+1)):
+                if (adder==0) and (i==0): continue
+                config = self.config_of(adder, i)
+                if ns_min<=config[0]<=ns_max: results.append(config)
+                pass
+            pass
+        return results
+    #f __len__
+    def __len__(self):
+        return (self.max_adder+1)*len(self.fractions)-1
+    pass
+
+#a Functions
+_clock_timer_period_index = None
+#f clock_timer_period_index
+def clock_timer_period_index():
+    """
+    Return the period index, loading (or building) it on first use
+
+    The cache file can be set with the environment variable CLOCK_TIMER_PERIOD_INDEX
+    """
+    global _clock_timer_period_index
+    if _clock_timer_period_index is None:
+        filename = os.environ.get("CLOCK_TIMER_PERIOD_INDEX", default_cache_filename)
+        _clock_timer_period_index = c_clock_timer_period_index.load(filename)
+        pass
+    return _clock_timer_period_index
@@ -0,0 +1,704 @@
+#a Copyright
+#
+#  This file 'clock_timer_model.py' copyright Gavin J Stark 2017-20
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Imports
+import collections
+from .clock_timer import t_timer_control
+
+#a Classes
+#c c_timer_control
+class c_timer_control(object):
+    """
+    A t_timer_control value, with every field defaulting to zero
+    """
+    #f __init__
+    def __init__(self, timer_control=None, **kwargs):
+        for k in t_timer_control:
+            setattr(self, k, 0)
+            pass
+        if timer_control is not None:
+            if isinstance(timer_control, c_timer_control): timer_control=timer_control.as_dict()
+            for (k,v) in timer_control.items():
+                setattr(self, k, v)
+                pass
+            pass
+        for (k,v) in kwargs.items():
+            setattr(self, k, v)
+            pass
+        pass
+    #f as_dict
+    def as_dict(self):
+        return dict([(k,getattr(self,k)) for k in t_timer_control])
+    #f __repr__
+    def __repr__(self):
+        return "c_timer_control(%s)"%(", ".join(["%s=%d"%(k,v) for (k,v) in self.as_dict().items() if v!=0]))
+    pass
+
+#c c_clock_timer_model
+class c_clock_timer_model(object):
+    """
+    Bit-exact model of cdl/clock_timer.cdl
+
+    The state is that of t_timer_state in the CDL; step() performs one
+    clock edge, and advance() performs n clock edges with the same
+    timer control.
+
+    With a constant timer control the only state that evolves other
+    than the timer itself is the 9-bit bonus DDA accumulator, and that
+    is periodic (its period is at most 512); so advance() finds the
+    number of bonus 1/16ths that will be added from the DDA cycle and
+    adds n times the adder plus that in one go.
+    """
+    mask_32 = (1<<32)-1
+    mask_68 = (1<<68)-1
+    _dda_orbits = {}
+    #f __init__
+    def __init__(self):
+        self.reset()
+        pass
+    #f reset
+    def reset(self):
+        """
+        Asynchronous reset (reset_n low) of the model
+        """
+        self.bonus_subfraction_acc = 0
+        self.fraction         = 0
+        self.timer_lower      = 0
+        self.timer_upper      = 0
+        self.advance_state    = 0
+        self.retard_state     = 0
+        self.hold_adder       = 0
+        self.fractional_adder = 0
+        self.integer_adder    = 0
+        pass
+    #f copy
+    def copy(self):
+        model = self.__class__.__new__(self.__class__)
+        model.__dict__.update(self.__dict__)
+        return model
+    #f value property
+    @property
+    def value(self):
+        """
+        64-bit timer value (t_timer_value.value)
+        """
+        return (self.timer_upper<<32) | self.timer_lower
+    #f value_16ths property
+    @property
+    def value_16ths(self):
+        """
+        Timer value including the fraction, in 1/16ths of a timer unit
+        """
+        return (self.value<<4) | self.fraction
+    #f timer_value
+    def timer_value(self):
+        """
+        Return the t_timer_value outputs as a dictionary
+        """
+        return {"value":self.value, "irq":0, "locked":0, "fraction":self.fraction}
+    #f step
+    def step(self, timer_control=None):
+        """
+        Perform a single clock edge with the given timer control
+        """
+        self._step(c_timer_control(timer_control))
+        return self
+    #f _step
+    def _step(self, c):
+        # Bonus fraction logic
+        acc = self.bonus_subfraction_acc
+        fractional_bonus = 0 if (acc & 0x100) else 1
+        if c.enable_counter:
+            if acc & 0x100:
+                acc = (acc + c.bonus_subfraction_add + 1) & 0x1ff
+                pass
+            else:
+                acc = (acc + (0x100 | (~c.bonus_subfraction_sub & 0xff))) & 0x1ff
+                pass
+            pass
+        if c.reset_counter:
+            acc = 0
+            pass
+        if (c.bonus_subfraction_add==0) and (c.bonus_subfraction_sub==0):
+            acc = 0
+            fractional_bonus = 0
+            pass
+
+        # Advance and retard of the adder
+        fractional_half_adder = (c.fractional_adder>>1) | ((c.integer_adder&1)<<3)
+        fractional_one_and_half_adder = fractional_half_adder + c.fractional_adder
+        integer_half_adder = c.integer_adder>>1
+        integer_one_and_half_adder = (integer_half_adder + c.integer_adder + (fractional_one_and_half_adder>>4)) & 0xff
+        (fractional_adder, integer_adder, hold_adder) = (self.fractional_adder, self.integer_adder, self.hold_adder)
+        if (not self.hold_adder) or c.reset_counter or c.enable_counter:
+            (fractional_adder, integer_adder, hold_adder) = (c.fractional_adder, c.integer_adder, 1)
+            pass
+        if c.advance and not self.advance_state:
+            (fractional_adder, integer_adder, hold_adder) = (fractional_one_and_half_adder & 0xf, integer_one_and_half_adder, 0)
+            pass
+        elif c.retard and not self.retard_state:
+            (fractional_adder, integer_adder, hold_adder) = (fractional_half_adder, integer_half_adder, 0)
+            pass
+
+        # Tick / reset / synchronize the timer
+        fractional_sum = self.fraction + self.fractional_adder + fractional_bonus
+        lower_sum      = self.timer_lower + self.integer_adder + (fractional_sum>>4)
+        upper_sum      = (self.timer_upper + (lower_sum>>32)) & self.mask_32
+        if c.enable_counter:
+            self.fraction    = fractional_sum & 0xf
+            self.timer_lower = lower_sum & self.mask_32
+            self.timer_upper = upper_sum
+            pass
+        if c.reset_counter:
+            self.fraction    = 0
+            self.timer_lower = 0
+            self.timer_upper = 0
+            pass
+        if c.synchronize & 1:
+            self.timer_lower = c.synchronize_value & self.mask_32
+            self.fraction    = 0
+            pass
+        if c.synchronize & 2:
+            self.timer_upper = (c.synchronize_value>>32) & self.mask_32
+            self.fraction    = 0
+            pass
+        self.bonus_subfraction_acc = acc
+        (self.fractional_adder, self.integer_adder, self.hold_adder) = (fractional_adder, integer_adder, hold_adder)
+        self.advance_state = c.advance
+        self.retard_state  = c.retard
+        pass
+    #f _is_steady
+    def _is_steady(self, c):
+        """
+        Determine if a further step with control c leaves the adder state unchanged
+        """
+        if (self.advance_state != c.advance) or (self.retard_state != c.retard): return False
+        if not self.hold_adder: return False
+        if not (c.enable_counter or c.reset_counter): return True
+        return (self.fractional_adder==c.fractional_adder) and (self.integer_adder==c.integer_adder)
+    #f dda_advance - classmethod
+    @classmethod
+    def dda_advance(cls, acc, dda_add, dda_sub, n_cycles):
+        """
+        Return (number of bonus cycles, accumulator) for n_cycles of the
+        enabled bonus DDA starting with accumulator acc
+
+        The orbit of the accumulator from acc is found once (at most 512
+        states), and then any number of cycles is a lookup
+        """
+        if (dda_add==0) and (dda_sub==0): return (0,0)
+        key = (acc, dda_add, dda_sub)
+        if key not in cls._dda_orbits:
+            states = []
+            bonus_before = [0]
+            first_seen = {}
+            while acc not in first_seen:
+                first_seen[acc] = len(states)
+                states.append(acc)
+                if acc & 0x100:
+                    bonus_before.append(bonus_before[-1])
+                    acc = (acc + dda_add + 1) & 0x1ff
+                    pass
+                else:
+                    bonus_before.append(bonus_before[-1]+1)
+                    acc = (acc + (0x100 | (~dda_sub & 0xff))) & 0x1ff
+                    pass
+                pass
+            cls._dda_orbits[key] = (states, bonus_before, first_seen[acc])
+            pass
+        (states, bonus_before, cycle_start) = cls._dda_orbits[key]
+        if n_cycles<len(states):
+            return (bonus_before[n_cycles], states[n_cycles])
+        cycle_length = len(states) - cycle_start
+        cycle_bonus  = bonus_before[len(states)] - bonus_before[cycle_start]
+        (cycles, n) = divmod(n_cycles - cycle_start, cycle_length)
+        return (bonus_before[cycle_start+n] + cycles*cycle_bonus, states[cycle_start+n])
+    #f advance
+    def advance(self, n_cycles, timer_control=None):
+        """
+        Perform n_cycles clock edges with the same timer control
+
+        Edges are stepped individually only until the adder state is
+        steady (after at most two edges - one for an advance or retard
+        edge, one to reload the adder), and the remainder are performed
+        in one go
+        """
+        c = c_timer_control(timer_control)
+        stepped = False
+        while (n_cycles>0) and not (stepped and self._is_steady(c)):
+            self._step(c)
+            n_cycles -= 1
+            stepped = True
+            pass
+        if n_cycles==0: return self
+        # Reset, or not enabled, leaves timer and accumulator unchanged
+        # once one edge with the control has happened
+        if c.reset_counter or not c.enable_counter:
+            return self
+        (bonus, acc) = self.dda_advance(self.bonus_subfraction_acc, c.bonus_subfraction_add, c.bonus_subfraction_sub, n_cycles)
+        self.bonus_subfraction_acc = acc
+        adder_16ths = self.integer_adder*16 + self.fractional_adder
+        # Fractional carries when the bonus is added only if the fraction is 15
+        fraction_carries = bonus if (self.fractional_adder==15) else 0
+        if c.synchronize==0:
+            value_16ths = (self.value_16ths + n_cycles*adder_16ths + bonus) & self.mask_68
+            self.fraction    = value_16ths & 0xf
+            self.timer_lower = (value_16ths>>4) & self.mask_32
+            self.timer_upper = (value_16ths>>36) & self.mask_32
+            pass
+        elif c.synchronize==1:
+            carries = 0
+            if (self.timer_lower + self.integer_adder)>>32:
+                carries = n_cycles
+                pass
+            elif (self.timer_lower + self.integer_adder + 1)>>32:
+                carries = fraction_carries
+                pass
+            self.timer_upper = (self.timer_upper + carries) & self.mask_32
+            pass
+        elif c.synchronize==2:
+            self.timer_lower = (self.timer_lower + n_cycles*self.integer_adder + fraction_carries) & self.mask_32
+            pass
+        return self
+    #f value_after
+    def value_after(self, n_cycles, timer_control=None):
+        """
+        Return the timer value after n_cycles edges, without changing the model
+        """
+        return self.copy().advance(n_cycles, timer_control).value
+    #f cycles_until
+    def cycles_until(self, value, timer_control=None):
+        """
+        Return the smallest number of edges after which the timer value
+        is at least value, for an enabled timer that does not wrap
+
+        This is a binary search using advance(); for a simple enabled
+        timer the search starts from a few edges either side of the
+        estimate from the timer rate, else it is O(log n) advances
+        """
+        if self.value>=value: return 0
+        c = c_timer_control(timer_control)
+        (n_min, n_max) = (0, 1)
+        rate_16ths = c.integer_adder*16 + c.fractional_adder
+        if (c.bonus_subfraction_add!=0) or (c.bonus_subfraction_sub!=0):
+            rate_16ths += (c.bonus_subfraction_add+1.0) / (c.bonus_subfraction_add+c.bonus_subfraction_sub+2)
+            pass
+        if c.enable_counter and not c.reset_counter and (c.synchronize==0) and (rate_16ths>0):
+            estimate = int((value-self.value)*16/rate_16ths)
+            (n_min, n_max) = (max(0, estimate-4), estimate+4)
+            if (n_min>0) and (self.value_after(n_min, timer_control)>=value):
+                (n_min, n_max) = (0, 1)
+                pass
+            pass
+        while self.value_after(n_max, timer_control)<value:
+            (n_min, n_max) = (n_max, n_max*2)
+            if n_max>(1<<68): raise Exception("Timer will not reach %d"%value)
+            pass
+        while n_max-n_min>1:
+            n = (n_min+n_max)//2
+            if self.value_after(n, timer_control)>=value:
+                n_max = n
+                pass
+            else:
+                n_min = n
+                pass
+            pass
+        return n_max
+    pass
+
+#c c_clock_timer_compare_model
+class c_clock_timer_compare_model(object):
+    """
+    Bit-exact model of cdl/clock_timer_compare.cdl
+
+    step() performs one clock edge given the timer control and compare
+    request for the cycle before it; timer_value() and
+    compare_response() are then the outputs for the cycle after it.
+    The timer itself is a c_clock_timer_model, whose value is one
+    cycle ahead of the timer value output.
+    """
+    #f __init__
+    def __init__(self, compare_count=4):
+        self.compare_count = compare_count
+        self.timer = c_clock_timer_model()
+        self.reset()
+        pass
+    #f reset
+    def reset(self):
+        """
+        Asynchronous reset (reset_n low) of the model
+        """
+        self.timer.reset()
+        self.compare_values = [0]*self.compare_count
+        self.armed          = 0
+        self.hits           = 0
+        self.timer_value_r  = 0
+        self.timer_fraction_r = 0
+        pass
+    #f value property
+    @property
+    def value(self):
+        """
+        64-bit timer value output (t_timer_value.value)
+        """
+        return self.timer_value_r
+    #f irq property
+    @property
+    def irq(self):
+        return int(self.hits!=0)
+    #f timer_value
+    def timer_value(self):
+        """
+        Return the t_timer_value outputs as a dictionary
+        """
+        return {"value":self.timer_value_r, "irq":self.irq, "locked":0, "fraction":self.timer_fraction_r}
+    #f compare_response
+    def compare_response(self):
+        """
+        Return the t_timer_compare_response outputs as a dictionary
+        """
+        return {"hits":self.hits, "armed":self.armed}
+    #f reached
+    def reached(self):
+        """
+        Mask of armed compare registers that the clock_timer value is at or beyond
+        """
+        reached = 0
+        for i in range(self.compare_count):
+            if ((self.armed>>i)&1) and (self.timer.value>=self.compare_values[i]):
+                reached |= 1<<i
+                pass
+            pass
+        return reached
+    #f step
+    def step(self, timer_control=None, compare_request=None):
+        """
+        Perform a single clock edge with the given timer control and compare request
+        """
+        if compare_request is None: compare_request = {}
+        reached = self.reached()
+        self.hits   = (self.hits & ~compare_request.get("clear_hits",0)) | reached
+        self.armed &= ~reached
+        select = compare_request.get("select",0)
+        if compare_request.get("write",0) and (select<self.compare_count):
+            self.compare_values[select] = compare_request.get("value",0)
+            if compare_request.get("disarm",0):
+                self.armed &= ~(1<<select)
+                pass
+            else:
+                self.armed |= 1<<select
+                pass
+            self.hits &= ~(1<<select)
+            pass
+        self.timer_value_r    = self.timer.value
+        self.timer_fraction_r = self.timer.fraction
+        self.timer.step(timer_control)
+        return self
+    #f cycles_until_irq
+    def cycles_until_irq(self, timer_control=None):
+        """
+        Return the number of edges with a constant timer control (and no
+        compare requests) after which irq is asserted, or None if no
+        compare register is armed
+
+        The hit is registered on the edge after the clock_timer value
+        reaches the compare value, which is when the timer value output
+        reaches it
+        """
+        if self.hits!=0: return 0
+        cycles = None
+        for i in range(self.compare_count):
+            if not ((self.armed>>i)&1): continue
+            n = self.timer.cycles_until(self.compare_values[i], timer_control)+1
+            if (cycles is None) or (n<cycles): cycles=n
+            pass
+        return cycles
+    pass
+
+#c c_clock_timer_capture_model
+class c_clock_timer_capture_model(object):
+    """
+    Bit-exact model of cdl/clock_timer_capture.cdl
+
+    step() performs one clock edge given the timer value, event inputs
+    and capture request for the cycle before it; capture_response() is
+    then the output for the cycle after it. The tech_sync_bit event
+    synchronizers are modelled as sync_delay flops.
+    """
+    sync_delay = 2
+    #f __init__
+    def __init__(self, capture_events=2, fifo_depth=8):
+        self.capture_events = capture_events
+        self.fifo_depth     = fifo_depth
+        self.reset()
+        pass
+    #f reset
+    def reset(self):
+        """
+        Asynchronous reset (reset_n low) of the model
+        """
+        self.sync        = [0]*self.sync_delay
+        self.events_last = 0
+        self.fifo        = collections.deque()
+        self.overflows   = 0
+        pass
+    #f capture_response
+    def capture_response(self):
+        """
+        Return the t_timer_capture_response outputs as a dictionary; the
+        capture fields are zero if the FIFO is empty
+        """
+        (events, value, fraction) = (0,0,0)
+        if self.fifo: (events, value, fraction) = self.fifo[0]
+        return {"valid":int(len(self.fifo)>0), "events":events, "value":value, "fraction":fraction, "overflows":self.overflows}
+    #f step
+    def step(self, timer_value=None, events=0, capture_request=None):
+        """
+        Perform a single clock edge given the timer value (a dictionary
+        with value and fraction), event inputs and capture request
+        """
+        if timer_value is None: timer_value = {}
+        if capture_request is None: capture_request = {}
+        events_sync = self.sync[-1]
+        rising = events_sync & ~self.events_last
+        pop  = capture_request.get("pop",0) and (len(self.fifo)>0)
+        push = (rising!=0) and ((len(self.fifo)<self.fifo_depth) or pop)
+        overflow = (rising!=0) and not push
+        if pop: self.fifo.popleft()
+        if push: self.fifo.append((rising, timer_value.get("value",0), timer_value.get("fraction",0)))
+        if overflow and (self.overflows<255): self.overflows += 1
+        if capture_request.get("clear_overflows",0): self.overflows = int(overflow)
+        self.events_last = events_sync
+        self.sync = [events & ((1<<self.capture_events)-1)] + self.sync[:-1]
+        return self
+    #f run
+    def run(self, timer_values, events, pops):
+        """
+        Step the model once for each of a sequence of timer values (as
+        from timer_value() of a timer model), event inputs and pops; return
+        the list of (events, value, fraction) captures popped
+        """
+        popped = []
+        for (timer_value, e, pop) in zip(timer_values, events, pops):
+            if pop and self.fifo: popped.append(self.fifo[0])
+            self.step(timer_value, e, {"pop":pop})
+            pass
+        return popped
+    pass
+
+#c c_clock_timer_as_sec_nsec_model
+class c_clock_timer_as_sec_nsec_model(object):
+    """
+    Bit-exact model of cdl/clock_timer_as_sec_nsec.cdl
+
+    step() performs one clock edge given the timer control and timer
+    value inputs for the cycle before it, and timer_sec_nsec() is then
+    the output for the cycle after it.
+
+    After a reset, disable or synchronize the divider restarts
+    start_delay cycles after the timer is enabled again, takes
+    divider_steps+1 cycles to divide the timer value by 10**9, and
+    the tracking logic takes two further cycles to settle. Valid is
+    low until the divider completes; note that it is then high for
+    those two cycles, with the nsec (and sec, if a second boundary has
+    been passed since the divider started) not yet correct.
+
+    divider_bits_per_step is the module's constant of the same name:
+    the divider produces that many quotient bits per step (1, 2 or 4,
+    for clock_timer_as_sec_nsec, _r4 and _r16), so divider_steps is
+    35, 18 or 9.
+    """
+    start_delay       = 3
+    quotient_width    = 35
+    accumulator_width = 56
+    billion_shf_9     = 0x1dcd65
+    mask_23 = (1<<23)-1
+    mask_30 = (1<<30)-1
+    mask_32 = (1<<32)-1
+    mask_35 = (1<<35)-1
+    mask_55 = (1<<55)-1
+    mask_56 = (1<<56)-1
+    #f __init__
+    def __init__(self, divider_bits_per_step=1):
+        self.divider_bits_per_step = divider_bits_per_step
+        self.divider_steps = (self.quotient_width+divider_bits_per_step-1) // divider_bits_per_step
+        self.divider_top_shift = divider_bits_per_step*(self.divider_steps-1)
+        self.reset()
+        pass
+    #f invalid_cycles
+    def invalid_cycles(self):
+        """
+        Number of cycles from a synchronize (or the first cycle of
+        enable after a reset or disable) to the output becoming valid
+        """
+        return self.start_delay + self.divider_steps + 3
+    #f reset
+    def reset(self):
+        """
+        Asynchronous reset (reset_n low) of the model
+        """
+        self.current_second_timer_value = 0
+        self.next_second_timer_value    = 0
+        self.next_second_valid = 0
+        self.valid = 0
+        self.sec   = 0
+        self.nsec  = 0
+        self.enabled   = 0
+        self.ready     = 0
+        self.fsm_state = "idle"
+        self.divide_start_sr   = 0
+        self.accumulator       = 0
+        self.billion_shf_n     = 0
+        self.quotient          = 0
+        self.one_shf_n         = 0
+        self.init_value_second = 0
+        self.completed         = 0
+        pass
+    #f copy
+    def copy(self):
+        model = self.__class__.__new__(self.__class__)
+        model.__dict__.update(self.__dict__)
+        return model
+    #f timer_sec_nsec
+    def timer_sec_nsec(self):
+        """
+        Return the t_timer_sec_nsec output as a dictionary
+        """
+        return {"valid":self.valid, "sec":self.sec, "nsec":self.nsec}
+    #f step
+    def step(self, timer_control, value):
+        """
+        Perform a single clock edge with the given timer control (dictionary) and 64-bit timer value
+        """
+        reset_counter  = timer_control.get("reset_counter",0)
+        enable_counter = timer_control.get("enable_counter",0)
+        synchronize    = timer_control.get("synchronize",0)
+        track = {}
+        divider = {}
+
+        # Track logic
+        timer_minus_next_second    = ((value & self.mask_32) - (self.next_second_timer_value<<9)) & self.mask_32
+        timer_minus_current_second = ((value & self.mask_32) - (self.current_second_timer_value<<9)) & self.mask_32
+        next_second_timer_value    = (self.next_second_timer_value + self.billion_shf_9) & self.mask_23
+        timer_sec_since_epoch  = self.sec
+        timer_nsec_since_epoch = timer_minus_current_second & self.mask_30
+        passed_next_second = not (timer_minus_next_second>>31)
+        if passed_next_second:
+            timer_sec_since_epoch  = (self.sec+1) & self.mask_35
+            timer_nsec_since_epoch = timer_minus_next_second & self.mask_30
+            pass
+        if not self.next_second_valid:
+            track["next_second_timer_value"] = next_second_timer_value
+            track["next_second_valid"] = 1
+            pass
+        else:
+            if passed_next_second:
+                track["current_second_timer_value"] = self.next_second_timer_value
+                track["next_second_timer_value"]    = next_second_timer_value
+                pass
+            track["valid"] = 1
+            track["sec"]   = timer_sec_since_epoch
+            track["nsec"]  = timer_nsec_since_epoch
+            pass
+        if self.completed:
+            track["current_second_timer_value"] = self.init_value_second & self.mask_23
+            track["next_second_timer_value"]    = self.init_value_second & self.mask_23
+            track["sec"]                        = self.quotient
+            track["next_second_valid"]          = 0
+            pass
+        if not self.ready:
+            track["valid"] = 0
+            pass
+
+        # Divider logic - digit is the largest whose multiple of billion_shf_n does not exceed the accumulator
+        digit = min(self.accumulator // self.billion_shf_n, (1<<self.divider_bits_per_step)-1) if self.billion_shf_n else (1<<self.divider_bits_per_step)-1
+        digit_remainder = (self.accumulator - digit*self.billion_shf_n) & self.mask_56
+        if reset_counter or (not enable_counter) or (synchronize!=0):
+            divider["enabled"] = 0
+            divider["ready"]   = 0
+            pass
+        elif not self.enabled:
+            divider["enabled"] = 1
+            divider["divide_start_sr"] = 1<<(self.start_delay-1)
+            pass
+        elif self.divide_start_sr!=0:
+            divider["divide_start_sr"] = self.divide_start_sr>>1
+            pass
+        action = None
+        if self.fsm_state=="dividing":
+            action = "step"
+            if self.one_shf_n==0: action="division_done"
+            pass
+        elif self.fsm_state=="completed":
+            action = "idle"
+            pass
+        if self.divide_start_sr & 1:
+            action = "init"
+            pass
+        if action=="init":
+            divider["fsm_state"]         = "dividing"
+            divider["init_value_second"] = (value>>9) & self.mask_55
+            divider["accumulator"]       = (value>>9) & self.mask_55
+            divider["billion_shf_n"]     = self.billion_shf_9<<self.divider_top_shift
+            divider["quotient"]          = 0
+            divider["one_shf_n"]         = 1<<self.divider_top_shift
+            pass
+        elif action=="step":
+            divider["accumulator"]       = digit_remainder
+            divider["quotient"]          = ((self.quotient<<self.divider_bits_per_step) | digit) & self.mask_35
+            divider["billion_shf_n"]     = self.billion_shf_n>>self.divider_bits_per_step
+            divider["one_shf_n"]         = self.one_shf_n>>self.divider_bits_per_step
+            pass
+        elif action=="division_done":
+            divider["fsm_state"]         = "completed"
+            divider["init_value_second"] = (self.init_value_second - self.accumulator) & self.mask_56
+            divider["completed"]         = 1
+            divider["ready"]             = 1
+            pass
+        elif action=="idle":
+            divider["fsm_state"]         = "idle"
+            divider["completed"]         = 0
+            pass
+        self.__dict__.update(track)
+        self.__dict__.update(divider)
+        return self
+    #f is_tracking
+    def is_tracking(self, value):
+        """
+        Determine if the model has settled to tracking the timer, with
+        the output the sec/nsec of value (the last timer value) and the
+        divider idle
+        """
+        (sec, nsec) = divmod(value, 10**9)
+        current_second = ((value-nsec)>>9) & self.mask_23
+        return ((self.valid, self.sec, self.nsec)==(1, sec, nsec) and
+                self.next_second_valid and
+                (self.current_second_timer_value==current_second) and
+                (self.next_second_timer_value==((current_second + self.billion_shf_9) & self.mask_23)) and
+                self.enabled and self.ready and (self.divide_start_sr==0) and
+                (self.fsm_state=="idle") and not self.completed)
+    #f set_tracking
+    def set_tracking(self, value):
+        """
+        Set the state as is_tracking(value) would require, given that the model is already tracking
+        """
+        (sec, nsec) = divmod(value, 10**9)
+        (self.sec, self.nsec) = (sec, nsec)
+        self.current_second_timer_value = ((value-nsec)>>9) & self.mask_23
+        self.next_second_timer_value    = (self.current_second_timer_value + self.billion_shf_9) & self.mask_23
+        pass
+    pass
@@ -16,13 +16,13 @@
 #
 
 #t t_phase_measure_request
-t_phase_measure_request = {"valid":1}
+t_phase_measure_request = {"valid":1, "search_step_log2":3}
 
 #t t_phase_measure_response
 t_phase_measure_response = {"ack":1, "abort":1, "valid":1, "delay":9, "initial_delay":9, "initial_value":1}
 
 #t t_eye_track_request
-t_eye_track_request = {"enable":1, "seek_enable":1, "track_enable":1, "measure":1, "phase_width":9, "min_eye_width":9}
+t_eye_track_request = {"enable":1, "measure":1, "seek_enable":1, "track_enable":1, "phase_width":9, "min_eye_width":9, "early_quality":1, "fast_seek":1}
 
 #t t_eye_track_response
 t_eye_track_response = {"measure_ack":1, "locked":1, "eye_data_valid":1, "data_delay":9, "eye_width":9, "eye_center":9}
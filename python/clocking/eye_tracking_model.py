@@ -0,0 +1,839 @@
+#a Copyright
+#
+#  This file 'eye_tracking_model.py' copyright Gavin J Stark 2017-20
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Imports
+import math
+import numpy as np
+from .sweep import sweep
+
+#a Globals - as clocking_eye_tracking.cdl
+qwidth                       = 10
+qmask                        = (1<<qwidth)-1
+eye_data_count_stabilize     = 32
+eye_data_count_running       = ((1<<qwidth)//8)-5
+quality_good_threshold       = 1<<(qwidth-3)
+quality_early_good_threshold = 3<<(qwidth-4)
+quality_completing_ticks     = 2
+delay_mask                   = 511
+sync_stages                  = 2 # tech_sync_bit
+
+bit_delay_op_none = 0
+bit_delay_op_load = 1
+bit_delay_op_inc  = 2
+bit_delay_op_dec  = 3
+
+popcount4 = [bin(i).count("1") for i in range(16)]
+
+#a Channel
+#c c_eye_channel
+class c_eye_channel(object):
+    """
+    The data channel of the eye tracking test: eyes of eye_width taps
+    every phase_width taps (centred on eye_center), with data quality
+    falling away outside the eye
+
+    The channel data is derived from a pseudo-random sequence (started
+    at seed, which should be at least 32 bits as small values decay to
+    zero) that advances once per cycle of data fed; element i of the
+    sequence is the random data used for the i'th cycle. A noise of 0
+    gives the channel of the original test; a larger noise reduces the
+    data quality everywhere.
+    """
+    default_seed = 0xf1723622
+    #f __init__
+    def __init__(self, phase_width, eye_center, eye_width, noise=0.0, seed=default_seed):
+        self.phase_width = phase_width
+        self.eye_center = eye_center
+        self.eye_width = eye_width
+        self.noise = noise
+        self.seed = seed
+        self.randoms = [seed]
+        self.random_array = None
+        pass
+    #f next_random
+    @staticmethod
+    def next_random(random_data):
+        return (random_data>>4) | ((random_data*0xfedcaf81) & 0xf00000000000)
+    #f random_sequence
+    def random_sequence(self, start, count):
+        """
+        Return elements start to start+count-1 of the random sequence as a uint64 array
+        """
+        if len(self.randoms)<start+count:
+            (r, randoms, next_random) = (self.randoms[-1], self.randoms, self.next_random)
+            extend = max(start+count-len(randoms), len(randoms))
+            for i in range(extend):
+                r = next_random(r)
+                randoms.append(r)
+                pass
+            self.random_array = None
+            pass
+        if self.random_array is None:
+            self.random_array = np.array(self.randoms, dtype=np.uint64)
+            pass
+        return self.random_array[start:start+count]
+    #f random_at
+    def random_at(self, index):
+        if index>=len(self.randoms): self.random_sequence(index, 1)
+        return self.randoms[index]
+    #f find_data_quality
+    def find_data_quality(self, delay):
+        phases = (delay - self.eye_center + 4*self.phase_width + self.phase_width//2) // self.phase_width
+        dist = (delay - self.eye_center + self.phase_width) % self.phase_width
+        if dist>self.phase_width//2: # -pw/2 to +pw/2
+            dist -= self.phase_width
+            pass
+        dist = abs(dist) # 0 to +pw/2
+        err = dist - self.eye_width//2
+        if err<=0:
+            quality=1
+            pass
+        else:
+            quality = math.pow(err,-0.3)
+            pass
+        return (phases,quality*(1.0-self.noise))
+    #f data_of_quality
+    def data_of_quality(self, quality, random_data, step=17):
+        (phases, quality) = quality
+        data = random_data >> phases
+        if quality>0.99:
+            data = data & 0x1f
+        elif (quality>0.75):
+            if ((data>>step)&7)==7: data = data>>1
+            pass
+        elif (quality>0.5):
+            if ((data>>step)&3)==3: data = data>>1
+            pass
+        else:
+            data = data ^ (data>>step)
+            pass
+        return data
+    #f data_of_quality_array
+    def data_of_quality_array(self, quality, randoms, step=17):
+        """
+        data_of_quality for an array of random data
+        """
+        (phases, quality) = quality
+        data = randoms >> np.uint64(phases)
+        step = np.uint64(step)
+        one = np.uint64(1)
+        if quality>0.99:
+            return data & np.uint64(0x1f)
+        elif (quality>0.75):
+            return np.where(((data>>step)&np.uint64(7))==7, data>>one, data)
+        elif (quality>0.5):
+            return np.where(((data>>step)&np.uint64(3))==3, data>>one, data)
+        return data ^ (data>>step)
+    #f data_in
+    def data_in(self, data_delay, tracking_delay, index):
+        """
+        The (data_p_in, data_n_in) driven for the cycle using random element index
+        """
+        random_data = self.random_at(index)
+        data_p = self.data_of_quality(self.find_data_quality(data_delay),     random_data, step=17)
+        data_n = self.data_of_quality(self.find_data_quality(tracking_delay), random_data, step=23)
+        return (data_p&0xf, (data_n^0xf)&0xf)
+    #f data_in_array
+    def data_in_array(self, data_delay, tracking_delay, start, count):
+        """
+        Arrays of the (data_p_in, data_n_in) driven for count cycles from random element start
+        """
+        randoms = self.random_sequence(start, count)
+        data_p = self.data_of_quality_array(self.find_data_quality(data_delay),     randoms, step=17)
+        data_n = self.data_of_quality_array(self.find_data_quality(tracking_delay), randoms, step=23)
+        return ((data_p & np.uint64(0xf)).astype(np.int64), ((data_n ^ np.uint64(0xf)) & np.uint64(0xf)).astype(np.int64))
+    pass
+
+#c c_eye_stimulus
+class c_eye_stimulus(object):
+    """
+    Precomputed data_p_in and data_n_in of a channel, for replay by a testbench
+
+    The data for a (data_delay, tracking_delay) pair is computed with
+    NumPy a chunk of the random sequence at a time, and cached; delay
+    pairs with the same channel quality share buffers. The data is
+    identical to c_eye_channel.data_in, cycle by cycle.
+    """
+    #f __init__
+    def __init__(self, channel, chunk_size=1024):
+        self.channel = channel
+        self.chunk_size = chunk_size
+        self.quality_of_delays = {}
+        self.buffers = {}
+        pass
+    #f chunk
+    def chunk(self, data_delay, tracking_delay, chunk):
+        """
+        Buffers (data_p_in, data_n_in) as lists for the delay pair, for a chunk of the random sequence
+        """
+        delays = (data_delay, tracking_delay)
+        if delays not in self.quality_of_delays:
+            self.quality_of_delays[delays] = (self.channel.find_data_quality(data_delay), self.channel.find_data_quality(tracking_delay))
+            pass
+        key = (self.quality_of_delays[delays], chunk)
+        if key not in self.buffers:
+            randoms = self.channel.random_sequence(chunk*self.chunk_size, self.chunk_size)
+            data_p = self.channel.data_of_quality_array(key[0][0], randoms, step=17) & np.uint64(0xf)
+            data_n = (self.channel.data_of_quality_array(key[0][1], randoms, step=23) ^ np.uint64(0xf)) & np.uint64(0xf)
+            self.buffers[key] = (data_p.tolist(), data_n.tolist())
+            pass
+        return self.buffers[key]
+    #f data_in
+    def data_in(self, data_delay, tracking_delay, start, count):
+        """
+        Lists of the (data_p_in, data_n_in) driven for count cycles from random element start
+        """
+        (data_p, data_n) = ([], [])
+        while count>0:
+            (chunk, offset) = divmod(start, self.chunk_size)
+            n = min(count, self.chunk_size-offset)
+            (chunk_p, chunk_n) = self.chunk(data_delay, tracking_delay, chunk)
+            data_p += chunk_p[offset:offset+n]
+            data_n += chunk_n[offset:offset+n]
+            (start, count) = (start+n, count-n)
+            pass
+        return (data_p, data_n)
+    pass
+
+#a Testbench environment
+#c c_eye_tracking_environment
+class c_eye_tracking_environment(object):
+    """
+    The testbench around clocking_eye_tracking in the eye tracking test
+    (feed_data_after_delay): after start_cycles, wait for a delay
+    operation, apply it, wait 10 cycles and acknowledge it, then feed
+    channel data for feed_cycles cycles (or until eye data is valid),
+    holding the last data after that
+
+    measure is requested once the first feed completes.
+    """
+    #f __init__
+    def __init__(self, channel, feed_cycles=200, ack_delay=10, start_cycles=10):
+        self.channel = channel
+        self.feed_cycles = feed_cycles
+        self.ack_delay = ack_delay
+        (self.mode, self.count) = ("start", start_cycles)
+        if start_cycles==0: self.mode="poll"
+        self.random_index = 0
+        self.data_delay = 0
+        self.tracking_delay = 0
+        (self.data_p_in, self.data_n_in, self.op_ack) = (0, 0, 0)
+        self.valid_seen = False
+        self.measure = 0
+        pass
+    #f drive
+    def drive(self, model):
+        """
+        Set data_p_in, data_n_in and op_ack for the next clock edge of the model
+        """
+        if (self.mode=="poll") and (model.delay_config_op!=bit_delay_op_none):
+            op = model.delay_config_op
+            delay_value = self.tracking_delay if model.delay_config_select else self.data_delay
+            if op==bit_delay_op_load:  delay_value = model.delay_config_value
+            elif op==bit_delay_op_dec: delay_value -= 1
+            elif op==bit_delay_op_inc: delay_value += 1
+            if model.delay_config_select:
+                self.tracking_delay = delay_value
+                pass
+            else:
+                self.data_delay = delay_value
+                pass
+            (self.mode, self.count) = ("pre_ack", self.ack_delay)
+            pass
+        self.op_ack = 1 if self.mode=="ack" else 0
+        if self.mode=="feed":
+            (self.data_p_in, self.data_n_in) = self.channel.data_in(self.data_delay, self.tracking_delay, self.random_index)
+            self.random_index += 1
+            self.valid_seen = model.eye_data_valid
+            pass
+        pass
+    #f advance
+    def advance(self):
+        """
+        Advance after a clock edge of the model
+        """
+        if self.mode=="start":
+            self.count -= 1
+            if self.count==0: self.mode="poll"
+            pass
+        elif self.mode=="pre_ack":
+            self.count -= 1
+            if self.count==0: self.mode="ack"
+            pass
+        elif self.mode=="ack":
+            (self.mode, self.count) = ("feed", 0)
+            pass
+        elif self.mode=="feed":
+            self.count += 1
+            if self.valid_seen or (self.count==self.feed_cycles):
+                self.mode = "poll"
+                self.measure = 1
+                pass
+            pass
+        pass
+    #f data_in_array
+    def data_in_array(self, cycles):
+        """
+        The data driven over the next cycles clock edges, given no delay
+        operation and no valid eye data; returns (data_p_in, data_n_in, fed)
+        where fed is the number of cycles of channel data
+        """
+        fed = 0
+        if self.mode=="feed": fed=min(cycles, self.feed_cycles-self.count)
+        (data_p, data_n) = (np.full(cycles, self.data_p_in, dtype=np.int64), np.full(cycles, self.data_n_in, dtype=np.int64))
+        if fed>0:
+            (data_p[:fed], data_n[:fed]) = self.channel.data_in_array(self.data_delay, self.tracking_delay, self.random_index, fed)
+            data_p[fed:] = data_p[fed-1]
+            data_n[fed:] = data_n[fed-1]
+            pass
+        return (data_p, data_n, fed)
+    #f quiet_cycles
+    def quiet_cycles(self):
+        """
+        Number of clock edges until the environment next acknowledges or
+        looks for a delay operation (other than just feeding data)
+        """
+        if self.mode=="feed": return self.feed_cycles-self.count
+        if self.mode in ("start", "pre_ack"): return self.count
+        return 0
+    #f skip_quiet
+    def skip_quiet(self, cycles):
+        """
+        Advance by cycles clock edges (up to quiet_cycles) for which the data is not used
+        """
+        if self.mode=="feed":
+            self.random_index += cycles
+            (self.data_p_in, self.data_n_in) = self.channel.data_in(self.data_delay, self.tracking_delay, self.random_index-1)
+            self.count += cycles
+            self.valid_seen = False
+            if self.count==self.feed_cycles:
+                self.mode = "poll"
+                self.measure = 1
+                pass
+            pass
+        else:
+            self.count -= cycles
+            if self.count==0: self.mode = "poll" if self.mode=="start" else "ack"
+            pass
+        pass
+    #f skip
+    def skip(self, cycles, data_p, data_n, fed):
+        """
+        Advance by cycles clock edges for which the data was given by data_in_array
+        """
+        if cycles==0: return
+        (self.data_p_in, self.data_n_in) = (int(data_p[cycles-1]), int(data_n[cycles-1]))
+        if self.mode=="feed":
+            fed = min(fed, cycles)
+            self.random_index += fed
+            self.count += fed
+            if self.count==self.feed_cycles:
+                self.mode = "poll"
+                self.measure = 1
+                pass
+            pass
+        self.valid_seen = False
+        pass
+    pass
+
+#a Model
+#c c_eye_tracking_model
+class c_eye_tracking_model(object):
+    """
+    Bit-exact model of clocking_eye_tracking with data_clk the same as clk
+
+    step() performs one clock edge for both state machines, with the
+    state named as in the CDL. The delay configuration and response
+    outputs are the attributes delay_config_* and eye_data_valid,
+    eye_width, eye_center and data_delay.
+
+    run() runs the model with a c_eye_tracking_environment; with
+    fast_forward, when the eye data state machine starts a quality
+    measurement its whole stabilize and running count is performed with
+    NumPy, and cycles where only the environment changes (waiting for a
+    delay operation acknowledge) are skipped; this gives identical state
+    to stepping each cycle.
+    """
+    #f __init__
+    def __init__(self, phase_width, min_eye_width=16, early_quality=0, fast_seek=0,
+                 enable=1, seek_enable=1, track_enable=1, measure=0):
+        self.phase_width   = phase_width
+        self.min_eye_width = min_eye_width
+        self.early_quality_request = early_quality
+        self.fast_seek     = fast_seek
+        self.enable        = enable
+        self.seek_enable   = seek_enable
+        self.track_enable  = track_enable
+        self.measure       = measure
+        self.reset()
+        pass
+    #f reset
+    def reset(self):
+        # eye_data_state
+        self.counter = 0
+        self.data_fsm = "idle"
+        self.clock_enable = 0
+        self.last_req_toggle = 0
+        self.requested = 0
+        self.result_toggle = 0
+        self.data_p = 0
+        self.data_n = 0
+        self.matching_edges = 0
+        self.mismatching_edges = 0
+        self.quality = 0
+        self.early_quality = 0
+        # eye_track_state
+        self.track_fsm = "inactive"
+        self.last_result_toggle = 0
+        self.quality_valid = 0
+        self.center = 0
+        self.x = 0
+        self.dx = 0
+        self.direction = 0
+        self.seek_dx = 0
+        self.left_edge = 0
+        self.right_edge = 0
+        self.delay_config_op = 0
+        self.delay_config_select = 0
+        self.delay_config_value = 0
+        self.eye_data_req_toggle = 0
+        self.measure_ack = 0
+        self.locked = 0
+        self.eye_data_valid = 0
+        self.data_delay = 0
+        self.eye_width = 0
+        self.eye_center = 0
+        # synchronizers, oldest stage last
+        self.edrt = [0]*sync_stages
+        self.ert  = [0]*sync_stages
+        self.cycle = 0
+        pass
+    #f good_quality
+    def good_quality(self):
+        return (self.quality>=quality_good_threshold) and (self.quality<(1<<(qwidth-1)))
+    #f early_decision
+    def early_decision(self):
+        quality = self.quality
+        if quality & (1<<(qwidth-1)): quality -= (1<<qwidth)
+        if quality>=quality_early_good_threshold: return True
+        return (quality + 4*self.counter + 4*quality_completing_ticks) < quality_good_threshold
+    #f step
+    def step(self, data_p_in, data_n_in, op_ack):
+        """
+        One clock edge
+        """
+        #b Eye data combs
+        data_action = "count"
+        if self.data_fsm=="idle":
+            data_action = "init"
+            pass
+        elif self.data_fsm=="stabilize":
+            if self.counter==0: data_action="start_run"
+            pass
+        elif self.data_fsm=="running":
+            if self.early_quality and self.early_decision(): data_action="complete"
+            if self.counter==0: data_action="complete"
+            pass
+        else:
+            data_action = "idle"
+            pass
+        activate = self.requested
+        good_quality = self.good_quality()
+        (dp, dn) = (self.data_p, self.data_n)
+        p_edge = ((dp>>1) ^ dp) & 0xf
+        p_rise = p_edge & (dp>>1)
+        p_fall = p_edge & ~(dp>>1)
+        n_edge = ((dn>>1) ^ dn) & 0xf
+        n_rise = n_edge & (dn>>1)
+        n_fall = n_edge & ~(dn>>1)
+        matching_edges    = (n_fall & p_rise) | (n_rise & p_fall)
+        mismatching_edges = (n_edge | p_edge) & ~matching_edges & 0xf
+        quality_delta = popcount4[self.matching_edges] - popcount4[self.mismatching_edges]
+        edrt_q = self.edrt[-1]
+        ert_q  = self.ert[-1]
+
+        #b Eye track combs
+        width  = (self.right_edge - self.left_edge) & delay_mask
+        center = ((self.right_edge + self.left_edge)>>1) & delay_mask
+        track_action = "none"
+        fsm = self.track_fsm
+        if fsm=="inactive":
+            if self.enable: track_action="activate"
+            pass
+        elif fsm=="idle":
+            if self.measure: track_action="find_eye_left_edge"
+            pass
+        elif fsm=="wait_data_delay":
+            if op_ack: track_action="idle"
+            pass
+        elif fsm=="delay_request":
+            track_action = "request_delay"
+            if self.dx==0:
+                track_action = "find_eye_right_edge" if self.direction==0 else "eye_found"
+                pass
+            pass
+        elif fsm=="wait_tracking_delay":
+            if op_ack: track_action="check_edge_found"
+            pass
+        elif fsm=="check_edge_found":
+            track_action = "request_quality"
+            pass
+        elif fsm=="wait_quality":
+            if self.quality_valid:
+                track_action = "accept_delta" if good_quality else "reject_delta"
+                pass
+            pass
+        elif fsm=="eye_found":
+            track_action = "report_result"
+            pass
+        elif fsm=="complete":
+            track_action = "idle"
+            if (self.min_eye_width>width) and self.seek_enable:
+                track_action = "move_center"
+                pass
+            elif (center!=self.center) and self.track_enable:
+                track_action = "jump_center" if self.fast_seek else "tweak_center"
+                pass
+            if not self.enable: track_action="inactivate"
+            pass
+
+        #b Eye data state
+        eye_data_req_toggle = self.eye_data_req_toggle
+        result_toggle = self.result_toggle
+        if self.clock_enable:
+            if data_action=="init":
+                (self.data_fsm, self.counter) = ("stabilize", eye_data_count_stabilize)
+                self.early_quality = self.early_quality_request
+                pass
+            elif data_action=="start_run":
+                (self.data_fsm, self.counter) = ("running", eye_data_count_running)
+                pass
+            elif data_action=="complete":
+                self.data_fsm = "completing"
+                self.result_toggle ^= 1
+                pass
+            elif data_action=="count":
+                self.counter -= 1
+                pass
+            else:
+                self.data_fsm = "idle"
+                pass
+            self.data_p = ((data_p_in&0xf)<<1) | ((dp>>4)&1)
+            self.data_n = ((data_n_in&0xf)<<1) | ((dn>>4)&1)
+            self.matching_edges    = matching_edges
+            self.mismatching_edges = mismatching_edges
+            if data_action=="start_run":
+                self.quality = 0
+                pass
+            else:
+                self.quality = (self.quality + quality_delta) & qmask
+                pass
+            pass
+        if activate:
+            self.clock_enable = 1
+            self.requested = 0
+            pass
+        if data_action=="idle":
+            self.clock_enable = 0
+            pass
+        if self.last_req_toggle!=edrt_q: self.requested=1
+        self.last_req_toggle = edrt_q
+
+        #b Eye track state
+        self.eye_data_valid = 0
+        pw = self.phase_width
+        if track_action=="activate":
+            self.track_fsm = "wait_data_delay"
+            (self.delay_config_select, self.delay_config_op) = (0, bit_delay_op_load)
+            self.delay_config_value = (pw + (pw>>2)) & delay_mask
+            self.center = self.delay_config_value
+            self.seek_dx = pw>>1
+            pass
+        elif track_action=="idle":
+            self.delay_config_op = bit_delay_op_none
+            self.track_fsm = "idle"
+            pass
+        elif track_action=="find_eye_left_edge":
+            self.track_fsm = "delay_request"
+            (self.x, self.dx, self.direction) = (self.center, pw, 0)
+            self.measure_ack = 1
+            pass
+        elif track_action=="find_eye_right_edge":
+            self.track_fsm = "delay_request"
+            self.left_edge = self.x
+            (self.x, self.dx, self.direction) = (self.center, pw, 1)
+            pass
+        elif track_action=="request_delay":
+            (self.delay_config_op, self.delay_config_select) = (bit_delay_op_load, 1)
+            if self.direction==1:
+                self.delay_config_value = (self.x + (self.dx>>1)) & delay_mask
+                pass
+            else:
+                self.delay_config_value = (self.x - (self.dx>>1)) & delay_mask
+                pass
+            self.track_fsm = "wait_tracking_delay"
+            pass
+        elif track_action=="check_edge_found":
+            self.track_fsm = "check_edge_found"
+            self.delay_config_op = bit_delay_op_none
+            pass
+        elif track_action=="request_quality":
+            self.track_fsm = "wait_quality"
+            self.eye_data_req_toggle ^= 1
+            pass
+        elif track_action=="reject_delta":
+            self.dx = self.dx>>1
+            self.track_fsm = "delay_request"
+            pass
+        elif track_action=="accept_delta":
+            self.x = self.delay_config_value
+            self.dx = self.dx>>1
+            self.track_fsm = "delay_request"
+            pass
+        elif track_action=="eye_found":
+            self.track_fsm = "eye_found"
+            self.right_edge = self.x
+            pass
+        elif track_action=="report_result":
+            self.track_fsm = "complete"
+            self.eye_data_valid = 1
+            (self.data_delay, self.eye_center, self.eye_width, self.locked) = (self.center, center, width, 1)
+            pass
+        elif track_action=="inactivate":
+            self.track_fsm = "inactive"
+            self.locked = 0
+            pass
+        elif track_action=="tweak_center":
+            self.seek_dx = pw>>1
+            self.delay_config_select = 0
+            if center>self.center:
+                self.delay_config_op = bit_delay_op_inc
+                self.center = (self.center+1) & delay_mask
+                pass
+            else:
+                self.delay_config_op = bit_delay_op_dec
+                self.center = (self.center-1) & delay_mask
+                pass
+            self.track_fsm = "wait_data_delay"
+            pass
+        elif track_action=="move_center":
+            (self.delay_config_select, self.delay_config_op) = (0, bit_delay_op_load)
+            step = 16
+            if self.fast_seek:
+                step = self.seek_dx
+                if (width!=0) and (self.seek_dx>1): self.seek_dx = self.seek_dx>>1
+                pass
+            new_center = (self.center + step) & delay_mask
+            if self.center & (1<<8): new_center = (pw + (pw>>2)) & delay_mask
+            (self.delay_config_value, self.center) = (new_center, new_center)
+            self.track_fsm = "wait_data_delay"
+            pass
+        elif track_action=="jump_center":
+            self.seek_dx = pw>>1
+            (self.delay_config_select, self.delay_config_op) = (0, bit_delay_op_load)
+            (self.delay_config_value, self.center) = (center, center)
+            self.track_fsm = "wait_data_delay"
+            pass
+        self.quality_valid = 1 if (self.last_result_toggle!=ert_q) else 0
+        self.last_result_toggle = ert_q
+
+        #b Synchronizers
+        self.edrt = [eye_data_req_toggle] + self.edrt[:-1]
+        self.ert  = [result_toggle]       + self.ert[:-1]
+        self.cycle += 1
+        pass
+    #f can_fast_forward
+    def can_fast_forward(self, environment):
+        """
+        Return True if the eye data state machine has started a quality
+        measurement with nothing else happening, and the environment is
+        just feeding data (or holding it)
+        """
+        if (self.data_fsm!="stabilize") or (not self.clock_enable) or self.requested: return False
+        if (self.track_fsm!="wait_quality") or self.quality_valid or self.eye_data_valid: return False
+        if self.delay_config_op!=bit_delay_op_none: return False
+        if any([s!=self.eye_data_req_toggle for s in self.edrt]) or (self.last_req_toggle!=self.eye_data_req_toggle): return False
+        if any([s!=self.result_toggle for s in self.ert]) or (self.last_result_toggle!=self.result_toggle): return False
+        return environment.mode in ("feed", "poll")
+    #f fast_forward
+    def fast_forward(self, environment):
+        """
+        Perform the clock edges of a quality measurement up to (but not
+        including) the edge at which it completes; returns the number of edges
+        """
+        start_run = self.counter
+        n = start_run + eye_data_count_running + 2
+        (data_p_in, data_n_in, fed) = environment.data_in_array(n)
+        data_p = np.empty(n+1, dtype=np.int64)
+        data_n = np.empty(n+1, dtype=np.int64)
+        (data_p[0], data_n[0]) = (self.data_p, self.data_n)
+        data_p[1:] = (data_p_in<<1)
+        data_n[1:] = (data_n_in<<1)
+        data_p[1] |= (self.data_p>>4)&1
+        data_n[1] |= (self.data_n>>4)&1
+        data_p[2:] |= (data_p_in[:-1]>>3)&1
+        data_n[2:] |= (data_n_in[:-1]>>3)&1
+        p_edge = ((data_p>>1) ^ data_p) & 0xf
+        n_edge = ((data_n>>1) ^ data_n) & 0xf
+        p_rise = p_edge & (data_p>>1)
+        n_rise = n_edge & (data_n>>1)
+        p_fall = p_edge & ~(data_p>>1)
+        n_fall = n_edge & ~(data_n>>1)
+        matching_edges    = (n_fall & p_rise) | (n_rise & p_fall)
+        mismatching_edges = (n_edge | p_edge) & ~matching_edges & 0xf
+        # Registered (mis)matching edges before each edge
+        matching    = np.concatenate(([self.matching_edges],    matching_edges[:-1]))
+        mismatching = np.concatenate(([self.mismatching_edges], mismatching_edges[:-1]))
+        popcount = np.array(popcount4, dtype=np.int64)
+        delta = popcount[matching] - popcount[mismatching]
+        # Running quality at edges start_run+1 onwards (reset at edge start_run)
+        running = np.concatenate(([0], np.cumsum(delta[start_run+1:n])))
+        counters = eye_data_count_running - np.arange(len(running))
+        complete = (counters<=0)
+        if self.early_quality:
+            complete = complete | (running>=quality_early_good_threshold)
+            complete = complete | ((running + 4*counters + 4*quality_completing_ticks) < quality_good_threshold)
+            pass
+        j = int(np.argmax(complete))
+        edges = start_run+1+j
+        self.data_fsm = "running"
+        self.counter  = int(counters[j])
+        self.quality  = int(running[j]) & qmask
+        (self.data_p, self.data_n) = (int(data_p[edges]), int(data_n[edges]))
+        (self.matching_edges, self.mismatching_edges) = (int(matching[edges]), int(mismatching[edges]))
+        environment.skip(edges, data_p_in, data_n_in, fed)
+        self.cycle += edges
+        return edges
+    #f quiet_cycles
+    def quiet_cycles(self, environment):
+        """
+        Return the number of clock edges for which nothing but the
+        environment changes: the eye data state machine is stopped, and
+        the eye track state machine is waiting for a delay operation
+        acknowledge that the environment will not give in that time
+        """
+        if self.clock_enable or self.requested or self.quality_valid: return 0
+        if self.track_fsm not in ("wait_data_delay", "wait_tracking_delay"): return 0
+        if any([s!=self.eye_data_req_toggle for s in self.edrt]) or (self.last_req_toggle!=self.eye_data_req_toggle): return 0
+        if any([s!=self.result_toggle for s in self.ert]) or (self.last_result_toggle!=self.result_toggle): return 0
+        return environment.quiet_cycles()
+    #f skip_quiet
+    def skip_quiet(self, environment, cycles):
+        """
+        Perform cycles clock edges (up to quiet_cycles)
+        """
+        environment.skip_quiet(cycles)
+        self.eye_data_valid = 0
+        self.cycle += cycles
+        pass
+    #f run
+    def run(self, environment, max_cycles, measurements=None, stop_on_lock=True, fast_forward=True):
+        """
+        Run with an environment for up to max_cycles, stopping at lock
+        (if stop_on_lock) or after a number of measurements
+
+        Lock is the first valid eye data with an eye at least
+        min_eye_width wide centred within a tap of the data delay.
+        Returns a dictionary of results, with 'eye_data' the (cycle,
+        eye_width, eye_center) of each valid eye data; times are in cycles.
+        """
+        first_lock = None
+        num_measurements = 0
+        eye_data = []
+        while self.cycle<max_cycles:
+            if fast_forward:
+                if self.can_fast_forward(environment):
+                    self.fast_forward(environment)
+                    continue
+                quiet_cycles = min(self.quiet_cycles(environment), max_cycles-self.cycle)
+                if quiet_cycles>0:
+                    self.skip_quiet(environment, quiet_cycles)
+                    continue
+                pass
+            environment.drive(self)
+            self.measure = environment.measure
+            self.step(environment.data_p_in, environment.data_n_in, environment.op_ack)
+            environment.advance()
+            if self.eye_data_valid:
+                num_measurements += 1
+                eye_data.append((self.cycle, self.eye_width, self.eye_center))
+                if ((first_lock is None) and
+                    (self.eye_width>=self.min_eye_width) and
+                    (abs(self.eye_center-environment.data_delay)<=1)):
+                    first_lock = self.cycle
+                    if stop_on_lock: break
+                    pass
+                if (measurements is not None) and (num_measurements>=measurements): break
+                pass
+            pass
+        return {"locked":first_lock is not None,
+                "first_lock_cycles":first_lock,
+                "measurements":num_measurements,
+                "cycles":self.cycle,
+                "eye_width":self.eye_width,
+                "eye_center":self.eye_center,
+                "data_delay":environment.data_delay,
+                "eye_data":eye_data,
+        }
+    pass
+
+#a Functions
+#f eye_tracking_lock
+def eye_tracking_lock(profile):
+    """
+    Run the eye tracking model for a channel profile, a dictionary of
+    phase_width, eye_center, eye_width, noise and seed (for the channel),
+    min_eye_width, early_quality and fast_seek (for the request), and
+    max_cycles; returns the results of c_eye_tracking_model.run, with
+    the profile as 'profile'
+    """
+    channel = c_eye_channel(profile["phase_width"], profile["eye_center"], profile["eye_width"],
+                            noise=profile.get("noise",0.0), seed=profile.get("seed", c_eye_channel.default_seed))
+    model = c_eye_tracking_model(profile["phase_width"],
+                                 min_eye_width=profile.get("min_eye_width",16),
+                                 early_quality=profile.get("early_quality",0),
+                                 fast_seek=profile.get("fast_seek",0))
+    environment = c_eye_tracking_environment(channel)
+    results = model.run(environment, profile.get("max_cycles", 350*1000))
+    results["profile"] = profile
+    return results
+
+#f eye_tracking_sweep
+def eye_tracking_sweep(profiles, processes=None):
+    """
+    Run eye_tracking_lock for every profile over a process pool
+    """
+    return sweep(eye_tracking_lock, profiles, processes=processes)
+
+#f lock_statistics
+def lock_statistics(results, bins=10):
+    """
+    Summarize eye_tracking_lock results: the lock probability, and the
+    distribution (percentiles and a histogram) of cycles to first lock
+    """
+    times = np.array([r["first_lock_cycles"] for r in results if r["locked"]], dtype=np.float64)
+    statistics = {"profiles":len(results),
+                  "lock_probability":(len(times)/len(results)) if len(results)>0 else 0.0,
+    }
+    if len(times)>0:
+        for (name, percentile) in (("min",0), ("p10",10), ("p50",50), ("p90",90), ("max",100)):
+            statistics[name] = float(np.percentile(times, percentile))
+            pass
+        statistics["mean"] = float(times.mean())
+        statistics["histogram"] = np.histogram(times, bins=bins)
+        pass
+    return statistics
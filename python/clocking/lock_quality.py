@@ -0,0 +1,215 @@
+#a Copyright
+#
+#  This file 'lock_quality.py' copyright Gavin J Stark 2017-20
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Imports
+import math
+import numpy as np
+
+#a Classes
+#c c_lock_quality
+class c_lock_quality(object):
+    """
+    Single-pass analysis of the phase error of a slave timer against its
+    master, from samples of (master-slave) taken every tau0 (in timer
+    units, ns for the testbenches)
+
+    Samples are added singly or as arrays (from a simulation, or from a
+    trace); they are processed in blocks of block_samples, and only the
+    last 3<<max_log2 samples are kept between blocks, so memory is
+    bounded whatever the length of the run. The buffer of samples
+    pending processing grows (by doubling) only as samples are added,
+    so an analyzer of a short run is cheap to create.
+
+    The results are the mean, standard deviation and extremes of the
+    error, a histogram of it (in bins of bin_width, from -hist_limit to
+    hist_limit, with counts of those outside), and for observation
+    intervals tau of (1<<k)*tau0 for k up to max_log2:
+
+    MTIE - the largest peak-to-peak error in any window of tau (of
+    (1<<k)+1 samples)
+
+    ADEV - the overlapping Allan deviation, from second differences of
+    the error at tau (a fractional frequency, as the error and tau are
+    in the same units)
+
+    TDEV - the time deviation, from the second differences of averages
+    of the error over tau (in the units of the error)
+
+    All are exact (not estimates from decimated data); a curve value is
+    NaN if the run is too short for that tau.
+    """
+    #f __init__
+    def __init__(self, tau0=1.0, max_log2=16, hist_limit=64, bin_width=1, block_samples=1<<20):
+        self.tau0 = tau0
+        self.max_log2 = max_log2
+        self.hist_limit = hist_limit
+        self.bin_width = bin_width
+        self.hist_bins = 2*int(math.ceil(hist_limit/float(bin_width)))
+        self.histogram = np.zeros(self.hist_bins, dtype=np.int64)
+        self.underflow = 0
+        self.overflow  = 0
+        self.samples = 0
+        self.sum    = 0.0
+        self.sum_sq = 0.0
+        self.min = None
+        self.max = None
+        self.mtie     = np.full(max_log2+1, np.nan)
+        self.adev_sum = np.zeros(max_log2+1)
+        self.adev_n   = np.zeros(max_log2+1, dtype=np.int64)
+        self.tdev_sum = np.zeros(max_log2+1)
+        self.tdev_n   = np.zeros(max_log2+1, dtype=np.int64)
+        self.tail_samples = 3<<max_log2
+        self.tail = np.zeros(0)
+        self.block_samples = block_samples
+        self.pending = np.zeros(0)
+        self.pending_samples = 0
+        pass
+    #f add
+    def add(self, errors):
+        """
+        Add one error sample, or an array of them
+        """
+        errors = np.atleast_1d(np.asarray(errors, dtype=np.float64))
+        n = self.block_samples
+        while len(errors)>0:
+            if (self.pending_samples==0) and (len(errors)>=n):
+                self._process(errors[:n])
+                errors = errors[n:]
+                continue
+            k = min(len(errors), n-self.pending_samples)
+            if self.pending_samples+k>len(self.pending):
+                pending = np.zeros(min(n, max(1024, 2*len(self.pending), self.pending_samples+k)))
+                pending[:self.pending_samples] = self.pending[:self.pending_samples]
+                self.pending = pending
+                pass
+            self.pending[self.pending_samples:self.pending_samples+k] = errors[:k]
+            self.pending_samples += k
+            errors = errors[k:]
+            if self.pending_samples==n: self.flush()
+            pass
+        pass
+    #f add_values
+    def add_values(self, master, slave):
+        """
+        Add samples of master and slave 64-bit timer values (such as
+        from a trace), whose difference is small even if the values wrap
+        """
+        master = np.asarray(master, dtype=np.uint64).view(np.int64)
+        slave  = np.asarray(slave,  dtype=np.uint64).view(np.int64)
+        self.add(master-slave)
+        pass
+    #f flush
+    def flush(self):
+        """
+        Process the pending samples
+        """
+        if self.pending_samples==0: return
+        self._process(self.pending[:self.pending_samples])
+        self.pending_samples = 0
+        pass
+    #f _process
+    def _process(self, x):
+        """
+        Process a block of samples, with the tail of those before it
+        """
+        self.samples += len(x)
+        self.sum     += float(np.sum(x))
+        self.sum_sq  += float(np.dot(x, x))
+        (x_min, x_max) = (float(np.min(x)), float(np.max(x)))
+        self.min = x_min if self.min is None else min(self.min, x_min)
+        self.max = x_max if self.max is None else max(self.max, x_max)
+        bins = np.floor(x/self.bin_width).astype(np.int64) + self.hist_bins//2
+        self.underflow += int(np.count_nonzero(bins<0))
+        self.overflow  += int(np.count_nonzero(bins>=self.hist_bins))
+        bins = bins[(bins>=0) & (bins<self.hist_bins)]
+        self.histogram += np.bincount(bins, minlength=self.hist_bins)
+
+        b = np.concatenate((self.tail, x))
+        (t, l) = (len(self.tail), len(b))
+        c = np.concatenate(([0.0], np.cumsum(b)))
+        (window_max, window_min) = (b, b)
+        for k in range(self.max_log2+1):
+            n = 1<<k
+            if l<n+1: break
+            if k>0:
+                h = n//2
+                window_max = np.maximum(window_max[:-h], window_max[h:])
+                window_min = np.minimum(window_min[:-h], window_min[h:])
+                pass
+            # MTIE windows of n+1 samples ending at or after t
+            s = max(0, t-n)
+            peak_to_peak = np.max(np.maximum(window_max[s:l-n], b[s+n:]) - np.minimum(window_min[s:l-n], b[s+n:]))
+            self.mtie[k] = peak_to_peak if np.isnan(self.mtie[k]) else max(self.mtie[k], peak_to_peak)
+            # Second differences x[i+2n]-2x[i+n]+x[i] ending at or after t
+            s = max(0, t-2*n)
+            if l-2*n>s:
+                d = b[s+2*n:] - 2*b[s+n:l-n] + b[s:l-2*n]
+                self.adev_sum[k] += float(np.dot(d, d))
+                self.adev_n[k]   += len(d)
+                pass
+            # Sums of n second differences, from cumulative sums, ending at or after t
+            s = max(0, t-3*n+1)
+            if l-3*n+1>s:
+                d = c[s+3*n:] - 3*c[s+2*n:l-n+1] + 3*c[s+n:l-2*n+1] - c[s:l-3*n+1]
+                self.tdev_sum[k] += float(np.dot(d, d))
+                self.tdev_n[k]   += len(d)
+                pass
+            pass
+        self.tail = b[-self.tail_samples:].copy()
+        pass
+    #f results
+    def results(self):
+        """
+        Return a dictionary of the results so far
+        """
+        self.flush()
+        n = 1<<np.arange(self.max_log2+1)
+        taus = n*self.tau0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            adev = np.sqrt(self.adev_sum/(2*(taus**2)*self.adev_n))
+            tdev = np.sqrt(self.tdev_sum/(6*(n**2.0)*self.tdev_n))
+            pass
+        adev[self.adev_n==0] = np.nan
+        tdev[self.tdev_n==0] = np.nan
+        mean = self.sum/self.samples if self.samples>0 else np.nan
+        std  = math.sqrt(max(0.0, self.sum_sq/self.samples-mean*mean)) if self.samples>0 else np.nan
+        max_abs = max(abs(self.min), abs(self.max)) if self.samples>0 else np.nan
+        return {"samples":self.samples, "mean":mean, "std":std,
+                "min":self.min, "max":self.max, "max_abs":max_abs,
+                "histogram":self.histogram.copy(),
+                "bin_edges":(np.arange(self.hist_bins+1)-self.hist_bins//2)*self.bin_width,
+                "underflow":self.underflow, "overflow":self.overflow,
+                "taus":taus, "mtie":self.mtie.copy(), "adev":adev, "tdev":tdev,
+        }
+    #f report
+    def report(self):
+        """
+        Return a list of lines reporting the results
+        """
+        r = self.results()
+        if r["samples"]==0: return ["No samples"]
+        lines = ["%d samples: mean %.3f std %.3f min %g max %g"%(r["samples"], r["mean"], r["std"], r["min"], r["max"])]
+        used = np.nonzero(r["histogram"])[0]
+        lines.append("Histogram: %s, %d below, %d above"%
+                     (", ".join(["%g:%d"%(r["bin_edges"][i], r["histogram"][i]) for i in used]), r["underflow"], r["overflow"]))
+        lines.append("%12s %12s %12s %12s"%("tau", "MTIE", "ADEV", "TDEV"))
+        for (tau, mtie, adev, tdev) in zip(r["taus"], r["mtie"], r["adev"], r["tdev"]):
+            if np.isnan(mtie): break
+            lines.append("%12g %12g %12.4e %12.4g"%(tau, mtie, adev, tdev))
+            pass
+        return lines
+    pass
@@ -0,0 +1,159 @@
+#a Copyright
+#
+#  This file 'phase_measure_model.py' copyright Gavin J Stark 2017-20
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Imports
+
+#a Globals
+max_delay = 511
+
+#a Classes
+#c c_clock_sampler
+class c_clock_sampler(object):
+    """
+    The delayed, synchronized clock seen by clocking_phase_measure
+
+    A call with a delay returns (stable, value) for the delay capture
+    at that delay. The clock has a high and a low phase of phase_width
+    taps (the clock is high from offset taps onwards), and for jitter
+    taps either side of an edge the captured data is not stable.
+    """
+    #f __init__
+    def __init__(self, phase_width, offset=0, jitter=2):
+        self.phase_width = phase_width
+        self.offset = offset
+        self.jitter = jitter
+        pass
+    #f __call__
+    def __call__(self, delay):
+        position = (delay - self.offset) % (2*self.phase_width)
+        edge_distance = min([abs(position-e) for e in (0, self.phase_width, 2*self.phase_width)])
+        if edge_distance<self.jitter: return (False, 0)
+        return (True, 1 if position<self.phase_width else 0)
+    #f narrowest_stable
+    def narrowest_stable(self):
+        return self.phase_width - 2*self.jitter + 1
+    pass
+
+#c c_table_sampler
+class c_table_sampler(object):
+    """
+    A sampler from a dictionary of delay to stable value; the capture
+    at any other delay is not stable (as in the phase measure simulation test)
+    """
+    #f __init__
+    def __init__(self, stable_values):
+        self.stable_values = stable_values
+        pass
+    #f __call__
+    def __call__(self, delay):
+        if delay in self.stable_values: return (True, self.stable_values[delay])
+        return (False, 0)
+    pass
+
+#a Functions
+#f phase_measure
+def phase_measure(sample, step_log2=0):
+    """
+    Model of a clocking_phase_measure measurement, delay program by delay program
+
+    sample(delay) is (stable, value) for a delay capture. Returns a
+    dictionary with abort, initial_value, initial_delay and delay (as
+    in t_phase_measure_response), and 'delays', the delays programmed.
+
+    A measurement finds the first delay at which the capture is not
+    stable (the first edge), the first stable delay after that, and the
+    first delay after that which is stable with the inverse value.
+
+    With step_log2 of 0 every delay is tried in turn. Otherwise each
+    search moves in steps of 2^step_log2 taps until the capture
+    satisfies it, then bisects back to the first delay that does. The
+    results are the same provided no stable region of the clock is
+    narrower than the step (so a step cannot skip a whole region).
+    The first-edge search is also satisfied by a stable capture of the
+    other value (an edge with no unstable taps); it then carries on
+    from there, as stepping one tap at a time would.
+
+    A first edge or stable value found at the maximum delay is followed
+    by a search starting from the delay wrapped round to zero, with or
+    without a search step (the first step then brackets a wrapped range
+    of delays, which is bisected modulo 512); but no edge found by the
+    maximum delay, or a stable inverse value found there by the edge
+    search, aborts the measurement.
+    """
+    step = 1<<step_log2
+    delays = []
+    (low, low_valid, low_value) = (0, False, 0)
+    (high, high_stable, high_value, refining) = (0, False, 0, False)
+    (phase, initial_value, initial_delay) = ("edge", 0, 0)
+    delay = 0
+    def coarse_next(d):
+        if d==max_delay: return (d+step) & max_delay
+        return min(d+step, max_delay)
+    def bisect(low, high):
+        return (low + (((high-low) & max_delay)>>1)) & max_delay
+    while True:
+        delays.append(delay)
+        (stable, value) = sample(delay)
+        if phase=="edge":     satisfied = (not stable) or (low_valid and (value!=low_value))
+        elif phase=="stable": satisfied = stable
+        else:                 satisfied = stable and (value!=initial_value)
+        found = None
+        if satisfied:
+            if ((delay-low) & max_delay)<=1:
+                found = (delay, stable, value)
+                pass
+            else:
+                (high, high_stable, high_value, refining) = (delay, stable, value, True)
+                delay = bisect(low, delay)
+                pass
+            pass
+        elif refining and (((high-delay) & max_delay)==1):
+            found = (high, high_stable, high_value)
+            pass
+        elif refining:
+            (low, low_valid, low_value) = (delay, True, value)
+            delay = bisect(delay, high)
+            pass
+        elif delay==max_delay:
+            return {"abort":1, "delays":delays}
+        else:
+            (low, low_valid, low_value) = (delay, True, value)
+            delay = coarse_next(delay)
+            pass
+        if found is None: continue
+        (found_delay, found_stable, found_value) = found
+        if phase=="inverse":
+            return {"abort":0, "initial_value":initial_value, "initial_delay":initial_delay,
+                    "delay":(found_delay-initial_delay) & max_delay, "delays":delays}
+        if (found_delay==max_delay) and (phase=="edge") and found_stable:
+            return {"abort":1, "delays":delays}
+        if phase=="edge":
+            if found_stable:
+                (low, low_valid, low_value) = (found_delay, True, found_value)
+                pass
+            else:
+                (low, phase) = (found_delay, "stable")
+                pass
+            pass
+        else:
+            (initial_value, initial_delay) = (found_value, found_delay)
+            (low, phase) = (found_delay, "inverse")
+            pass
+        refining = False
+        delay = coarse_next(found_delay)
+        pass
+    pass
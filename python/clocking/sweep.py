@@ -0,0 +1,40 @@
+#a Copyright
+#
+#  This file 'sweep.py' copyright Gavin J Stark 2017-20
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Imports
+import multiprocessing
+
+#a Functions
+#f sweep
+def sweep(fn, configurations, processes=None, chunksize=1):
+    """
+    Return [fn(c) for c in configurations], with the calls fanned out
+    over a pool of processes (by default one per CPU)
+
+    fn must be a module-level function, and configurations and results
+    must be picklable. The chunksize defaults to 1 as the time for a
+    configuration can vary a lot (for example, with a lock window).
+    With one process, or one configuration, no pool is used.
+    """
+    configurations = list(configurations)
+    if processes is None: processes=multiprocessing.cpu_count()
+    processes = min(processes, len(configurations))
+    if processes<=1:
+        return [fn(c) for c in configurations]
+    with multiprocessing.Pool(processes) as pool:
+        return pool.map(fn, configurations, chunksize)
+    pass
@@ -0,0 +1,189 @@
+#a Copyright
+#
+#  This file 'testbench.py' copyright Gavin J Stark 2017-20
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Imports
+import os
+import json
+from .bitfields import c_bitfield_codec
+
+#a Functions
+#f record_results
+def record_results(record, filename=None):
+    """
+    Append a record of the results of a test (a dictionary) as a line
+    of JSON to filename - by default that given by the environment
+    variable CDL_TEST_RESULTS - so that results such as cycles to lock
+    can be tracked across runs; if neither is given nothing is recorded
+    """
+    if filename is None: filename=os.environ.get("CDL_TEST_RESULTS")
+    if filename is None: return
+    with open(filename, "a") as f:
+        f.write(json.dumps(record)+"\n")
+        pass
+    pass
+
+#a Classes
+#c c_struct_signals
+class c_struct_signals(object):
+    """
+    The signals of a structure port of a test harness, driven or sampled
+    as a whole
+
+    A HardwareThDut with a port 'prefix' of a structure descriptor
+    gives the test harness one signal per field, named prefix__field;
+    this class finds those handles once, and drives or samples them
+    all from a dictionary or a packed int (packed as c_bitfield_codec).
+
+    Driving records the values driven, and fields that are unchanged
+    are not driven again; use force=True to drive every field.
+    """
+    #f __init__
+    def __init__(self, th, prefix, descriptor):
+        self.prefix = prefix
+        self.codec = c_bitfield_codec(prefix, descriptor)
+        self.field_names = list(descriptor.keys())
+        self.signals = [getattr(th, "%s__%s"%(prefix, f)) for f in self.field_names]
+        self.signal_of_field = dict(zip(self.field_names, self.signals))
+        self.driven = {}
+        pass
+    #f drive
+    def drive(self, values=None, force=False, **kwargs):
+        """
+        Drive fields from a dictionary and/or keyword arguments, or all
+        the fields from a packed int; returns the number of signals driven
+        """
+        if isinstance(values, int): values=self.codec.unpack(values)
+        if values is None: values={}
+        if len(kwargs)>0: values=dict(values, **kwargs)
+        driven = self.driven
+        n = 0
+        for (f, v) in values.items():
+            if (not force) and (driven.get(f)==v): continue
+            self.signal_of_field[f].drive(v)
+            driven[f] = v
+            n += 1
+            pass
+        return n
+    #f sample
+    def sample(self):
+        """
+        Sample all the fields to a dictionary
+        """
+        return dict([(f, s.value()) for (f, s) in zip(self.field_names, self.signals)])
+    #f sample_fields
+    def sample_fields(self, *field_names):
+        """
+        Sample some fields, returning a tuple of values
+        """
+        return tuple([self.signal_of_field[f].value() for f in field_names])
+    #f sample_int
+    def sample_int(self):
+        """
+        Sample all the fields to a packed int
+        """
+        return self.codec.pack(self.sample())
+    #f __getitem__
+    def __getitem__(self, field_name):
+        """
+        Signal handle for a field
+        """
+        return self.signal_of_field[field_name]
+    pass
+
+#c c_th_waits
+class c_th_waits(object):
+    """
+    Waits for a test harness, counting the bfm_wait calls (each a
+    return to the simulation, and a callback into Python when it
+    completes) and the cycles waited
+
+    wait_until and wait_for_edge check a condition every poll cycles
+    (every cycle by default, which is required to see a single-cycle
+    pulse). A holdoff is a number of cycles for which the caller knows
+    the condition cannot become true (such as a fixed latency in the
+    hardware); it is waited in a single bfm_wait.
+    """
+    #f __init__
+    def __init__(self, th):
+        self.th = th
+        self.calls = 0
+        self.cycles = 0
+        pass
+    #f wait
+    def wait(self, cycles):
+        """
+        bfm_wait for a number of cycles
+        """
+        if cycles<=0: return
+        self.th.bfm_wait(cycles)
+        self.calls += 1
+        self.cycles += cycles
+        pass
+    #f wait_until
+    def wait_until(self, predicate, timeout=None, holdoff=0, poll=1, each_cycle=None):
+        """
+        Wait until predicate() is true, returning the number of cycles
+        waited, or None if timeout cycles pass first
+
+        If each_cycle is given it is called before every cycle waited
+        (for example to drive a changing input), and poll must be 1.
+        """
+        cycles = 0
+        if holdoff>0:
+            if timeout is not None: holdoff=min(holdoff, timeout)
+            self.wait(holdoff)
+            cycles = holdoff
+            pass
+        while not predicate():
+            if (timeout is not None) and (cycles>=timeout): return None
+            n = poll
+            if timeout is not None: n=min(n, timeout-cycles)
+            if each_cycle is not None: each_cycle()
+            self.wait(n)
+            cycles += n
+            pass
+        return cycles
+    #f wait_for_edge
+    def wait_for_edge(self, signal, edge="rising", timeout=None, holdoff=0, poll=1):
+        """
+        Wait for a rising, falling or any edge of a signal (as a boolean),
+        returning the number of cycles waited, or None on timeout
+
+        The signal is first sampled after the holdoff.
+        """
+        if holdoff>0:
+            if timeout is not None: holdoff=min(holdoff, timeout)
+            self.wait(holdoff)
+            pass
+        last = [bool(signal.value())]
+        def edge_seen():
+            value = bool(signal.value())
+            seen = (value!=last[0]) and ((edge=="any") or (value==(edge=="rising")))
+            last[0] = value
+            return seen
+        if timeout is not None: timeout-=holdoff
+        cycles = self.wait_until(edge_seen, timeout=timeout, poll=poll)
+        if cycles is None: return None
+        return cycles+holdoff
+    #f callbacks_per_cycle
+    def callbacks_per_cycle(self):
+        if self.cycles==0: return 0.0
+        return self.calls/float(self.cycles)
+    #f report
+    def report(self):
+        return "%d bfm_wait calls for %d cycles, %.3f Python callbacks per cycle"%(self.calls, self.cycles, self.callbacks_per_cycle())
+    pass
@@ -0,0 +1,195 @@
+#a Copyright
+#
+#  This file 'trace.py' copyright Gavin J Stark 2017-20
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Imports
+import json
+import numpy as np
+from .bitfields import c_bitfield_codec
+
+#a Constants
+trace_magic = b"cdltrc01"
+
+#a Functions
+#f trace_dtype
+def trace_dtype(ports):
+    """
+    Record dtype for a list of (prefix, descriptor) ports
+
+    A record is a uint64 'cycle' followed by one field per port: a
+    structured field (with the dtype of c_bitfield_codec) for a
+    structure descriptor, or an unsigned int for a bit port (whose
+    descriptor is its width, as in HardwareThDut dut_inputs)
+    """
+    dtypes = [("cycle", np.uint64)]
+    for (prefix, descriptor) in ports:
+        if isinstance(descriptor, int):
+            dtypes.append((prefix, c_bitfield_codec(prefix, {prefix:descriptor}).dtype[0]))
+            pass
+        else:
+            dtypes.append((prefix, c_bitfield_codec(prefix, descriptor).dtype))
+            pass
+        pass
+    return np.dtype(dtypes)
+
+#f trace_load
+def trace_load(filename, mode="r"):
+    """
+    Load a trace file written by c_trace as a NumPy memmap of records
+
+    The header is read to find the ports (and hence the dtype); the
+    records are not parsed. A partial record at the end of the file
+    (from a trace that was not closed) is ignored.
+    """
+    with open(filename, "rb") as f:
+        header = f.read(16)
+        if header[:8]!=trace_magic: raise Exception("File %s is not a trace file"%filename)
+        header_length = int.from_bytes(header[8:16], "little")
+        header = json.loads(f.read(header_length).decode("utf8"))
+        f.seek(0, 2)
+        file_length = f.tell()
+        pass
+    ports = [(prefix, descriptor if isinstance(descriptor, int) else dict(descriptor)) for (prefix, descriptor) in header["ports"]]
+    dtype = trace_dtype(ports)
+    offset = 16+header_length
+    n = (file_length-offset)//dtype.itemsize
+    if n==0: return np.zeros(0, dtype=dtype)
+    return np.memmap(filename, dtype=dtype, mode=mode, offset=offset, shape=(n,))
+
+#a Classes
+#c c_trace
+class c_trace(object):
+    """
+    Capture of signals of a test harness, sampled every 'every' cycles
+    (or whenever the caller calls sample), as fixed-width records of
+    trace_dtype(ports)
+
+    The cycles waited with wait are counted from when the trace is
+    created, and samples are taken at each multiple of 'every' however
+    the waits fall, so that the samples are evenly spaced.
+
+    With a filename the records are buffered in blocks of
+    block_records and appended to the file, after a header giving the
+    ports; the file is loaded back with trace_load. Without a filename
+    the last ring_records records are kept in memory, so that a long
+    run takes bounded memory.
+
+    With on_change a record is only kept if a sampled value differs
+    from that of the last record kept; the cycle of each record is
+    kept, so the trace is still complete if sampled every cycle.
+    """
+    #f __init__
+    def __init__(self, th, ports, filename=None, every=1, on_change=False, ring_records=1<<16, block_records=4096):
+        self.th = th
+        self.ports = [(prefix, descriptor) for (prefix, descriptor) in ports]
+        self.dtype = trace_dtype(self.ports)
+        self.every = every
+        self.on_change = on_change
+        self.samplers = []
+        for (prefix, descriptor) in self.ports:
+            if isinstance(descriptor, int):
+                self.samplers.append(getattr(th, prefix).value)
+                pass
+            else:
+                signals = [getattr(th, "%s__%s"%(prefix, f)) for f in descriptor]
+                self.samplers.append(lambda signals=signals:tuple([s.value() for s in signals]))
+                pass
+            pass
+        self.cycle = 0
+        self.last = None
+        self.records = 0
+        self.file = None
+        self.filename = filename
+        if filename is not None:
+            header = json.dumps({"ports":[(prefix, descriptor if isinstance(descriptor, int) else list(descriptor.items()))
+                                          for (prefix, descriptor) in self.ports]}).encode("utf8")
+            header = header + b" "*((-len(header))%8)
+            self.file = open(filename, "wb")
+            self.file.write(trace_magic + len(header).to_bytes(8, "little") + header)
+            self.buffer = np.zeros(block_records, dtype=self.dtype)
+            pass
+        else:
+            self.buffer = np.zeros(ring_records, dtype=self.dtype)
+            pass
+        self.buffered = 0
+        pass
+    #f sample
+    def sample(self, cycle=None):
+        """
+        Sample the signals, at cycle (by default the cycle counted by wait);
+        returns True if a record was kept
+        """
+        if cycle is None: cycle=self.cycle
+        values = tuple([sampler() for sampler in self.samplers])
+        if self.on_change and (values==self.last): return False
+        self.last = values
+        if self.file is not None:
+            self.buffer[self.buffered] = (cycle,)+values
+            self.buffered += 1
+            if self.buffered==len(self.buffer): self.flush()
+            pass
+        else:
+            self.buffer[self.records%len(self.buffer)] = (cycle,)+values
+            pass
+        self.records += 1
+        return True
+    #f wait
+    def wait(self, cycles):
+        """
+        bfm_wait for a number of cycles, sampling at every multiple of 'every' cycles
+        """
+        while cycles>0:
+            n = min(cycles, self.every-(self.cycle%self.every))
+            self.th.bfm_wait(n)
+            self.cycle += n
+            cycles -= n
+            if (self.cycle%self.every)==0: self.sample()
+            pass
+        pass
+    #f flush
+    def flush(self):
+        """
+        Append the buffered records to the file
+        """
+        if (self.file is None) or (self.buffered==0): return
+        self.file.write(self.buffer[:self.buffered].tobytes())
+        self.file.flush()
+        self.buffered = 0
+        pass
+    #f close
+    def close(self):
+        """
+        Flush and close the file
+        """
+        if self.file is None: return
+        self.flush()
+        self.file.close()
+        self.file = None
+        pass
+    #f trace
+    def trace(self):
+        """
+        Return the records kept, in order - the whole file (as a memmap)
+        if there is one, or the last ring_records records
+        """
+        if self.filename is not None:
+            self.flush()
+            return trace_load(self.filename)
+        n = len(self.buffer)
+        if self.records<=n: return self.buffer[:self.records].copy()
+        start = self.records%n
+        return np.concatenate((self.buffer[start:], self.buffer[:start]))
+    pass
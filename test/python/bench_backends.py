@@ -0,0 +1,133 @@
+#a Copyright
+#
+#  This file 'bench_backends.py' copyright Gavin J Stark 2017-20
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Run the same test_clock_timer tests on each simulation backend of
+tb_clock_timer - the native CDL simulation, and the Verilated build
+(cwv__tb_clock_timer, built if verilator is available) - recording
+for each test its wall time, the time spent in Python (outside
+bfm_wait and bfm_wait_until_test_done), and the cycles run by the
+simulation engine (its global cycle count) and hence simulated cycles
+per second
+
+The records are appended, one JSON object per line, to the file given
+by the environment variable CDL_BENCH_RESULTS (bench_backends.jsonl by
+default), so that runs of different backends, builds or testbench
+changes can be compared.
+"""
+
+#a Imports
+import os
+import time
+import shutil
+from cdl.sim     import TestCase
+import test_clock_timer
+from test_clock_timer import clock_timer_test_hw
+from regress.clocking.testbench import record_results
+
+#a Globals
+bench_tests = ("master_0", "sec_nsec_window", "compare", "capture",
+               "master_slave_0", "master_slave_1", "master_slave_2", "master_slave_3",
+               "master_slave_4", "master_slave_5", "master_slave_6", "master_slave_7")
+
+#a Test classes
+#c c_backend_bench
+class c_backend_bench(object):
+    """
+    Mixin for a test exec file class that times its run, and the
+    simulation within it, and records the results
+    """
+    backend = None
+    test_name = None
+    #f bench_wait
+    def bench_wait(self, wait, cycles):
+        """
+        Call a wait of the harness, timing it unless it is within
+        another (as bfm_wait_until_test_done may call bfm_wait)
+        """
+        outermost = (self.bench_depth==0)
+        self.bench_depth += 1
+        t0 = time.perf_counter()
+        wait(cycles)
+        self.bench_depth -= 1
+        if outermost: self.bench_sim_time += time.perf_counter()-t0
+        pass
+    #f bfm_wait
+    def bfm_wait(self, cycles):
+        self.bench_wait(super().bfm_wait, cycles)
+        pass
+    #f bfm_wait_until_test_done
+    def bfm_wait_until_test_done(self, cycles):
+        self.bench_wait(super().bfm_wait_until_test_done, cycles)
+        pass
+    #f run
+    def run(self):
+        (self.bench_sim_time, self.bench_depth) = (0.0, 0)
+        start_cycle = self.global_cycle()
+        t0 = time.perf_counter()
+        super().run()
+        wall_time = time.perf_counter()-t0
+        cycles = self.global_cycle()-start_cycle
+        record = {"backend":self.backend, "test":self.test_name, "time":time.time(),
+                  "wall_time":round(wall_time, 4),
+                  "python_time":round(wall_time-self.bench_sim_time, 4),
+                  "cycles":cycles,
+                  "cycles_per_second":round(cycles/wall_time, 1) if wall_time>0 else None,
+        }
+        print("%-10s %-16s: %8.2fs, %8.2fs in Python, %10d cycles, %10.0f cycles/s"%
+              (self.backend, self.test_name, wall_time, record["python_time"], cycles,
+               record["cycles_per_second"] or 0))
+        record_results(record, os.environ.get("CDL_BENCH_RESULTS", "bench_backends.jsonl"))
+        pass
+    pass
+
+#a Hardware classes
+#c clock_timer_verilated_test_hw
+class clock_timer_verilated_test_hw(clock_timer_test_hw):
+    """
+    The clock_timer testbench as the Verilated build
+    """
+    module_name = "cwv__tb_clock_timer"
+    pass
+
+#a Useful functions
+#f backend_tests
+def backend_tests(backend):
+    """
+    The _tests of test_clock_timer.clock_timer for the bench_tests, with
+    exec file classes that record their results for the backend
+    """
+    tests = {}
+    for name in bench_tests:
+        (exec_file, cycles, kwargs) = test_clock_timer.clock_timer._tests[name]
+        bench_class = type("%s_%s"%(exec_file.__name__, backend), (c_backend_bench, exec_file),
+                           {"backend":backend, "test_name":name})
+        tests[name] = (bench_class, cycles, kwargs)
+        pass
+    return tests
+
+#a Simulation benchmark classes
+#c clock_timer_native_bench
+class clock_timer_native_bench(TestCase):
+    hw = clock_timer_test_hw
+    _tests = backend_tests("native")
+    pass
+
+#c clock_timer_verilated_bench
+class clock_timer_verilated_bench(TestCase):
+    hw = clock_timer_verilated_test_hw
+    _tests = backend_tests("verilated") if shutil.which("verilator") is not None else {}
+    pass
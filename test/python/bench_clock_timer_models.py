@@ -0,0 +1,184 @@
+#a Copyright
+#
+#  This file 'bench_clock_timer_models.py' copyright Gavin J Stark 2017-20
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Imports
+import time
+import unittest
+from regress.clocking.clock_timer import find_closest_ratio, find_closest_ratio_by_mediants
+from regress.clocking.clock_timer import clock_timer_adder_bonus, clock_timer_period
+from regress.clocking.clock_timer_batch import clock_timer_adder_bonus_batch, clock_timer_as_sec_nsec_batch
+from regress.clocking.clock_timer_index import clock_timer_period_index
+from regress.clocking.clock_timer_model import c_clock_timer_model, c_clock_timer_as_sec_nsec_model
+from regress.clocking.lock_quality import c_lock_quality
+
+#a Useful functions
+#f time_per_call
+def time_per_call(fn, args_list, repeats=5):
+    """
+    Best-of-repeats time in seconds for one call of fn, averaged over args_list
+    """
+    best = None
+    for r in range(repeats):
+        t0 = time.perf_counter()
+        for args in args_list:
+            fn(*args)
+            pass
+        t = (time.perf_counter()-t0)/len(args_list)
+        if (best is None) or (t<best): best=t
+        pass
+    return best
+
+#a Benchmark classes
+#c clock_timer_ratio_bench
+class clock_timer_ratio_bench(unittest.TestCase):
+    """
+    Compare find_closest_ratio with the mediant walk it replaces
+
+    The worst cases for the mediant walk are bonus fractions near 0 or 1,
+    which take up to 256 mediants before the DDA range is exceeded
+    """
+    cases = {"worst":   [0.0, 1/255.0, 1/300.0, 1.0-1/255.0, 1.0-1/300.0],
+             "typical": [(i+0.5)/64 for i in range(64)],
+    }
+    #f test_speedup
+    def test_speedup(self):
+        for (name, fractions) in self.cases.items():
+            args_list = [(f,256) for f in fractions]
+            t_mediants = time_per_call(find_closest_ratio_by_mediants, args_list)
+            t_cf       = time_per_call(find_closest_ratio, args_list)
+            print("find_closest_ratio %-8s: mediant walk %8.2fus, continued fraction %8.2fus, speed-up %6.1fx"%
+                  (name, t_mediants*1E6, t_cf*1E6, t_mediants/t_cf))
+            if name=="worst":
+                self.assertLess(t_cf, t_mediants)
+                pass
+            pass
+        pass
+    pass
+
+#c clock_timer_batch_bench
+class clock_timer_batch_bench(unittest.TestCase):
+    """
+    Compare the batch adder/bonus calculation with a loop over the scalar functions,
+    for a sweep of PLL outputs and dividers
+    """
+    #f test_speedup
+    def test_speedup(self):
+        periods = [1000.0*divider/pll_mhz for pll_mhz in range(800, 1600, 8) for divider in range(1, 101)]
+        t0 = time.perf_counter()
+        for ns in periods:
+            (adder, bonus) = clock_timer_adder_bonus(ns)
+            clock_timer_period(adder, bonus)
+            pass
+        t_scalar = time.perf_counter()-t0
+        t0 = time.perf_counter()
+        clock_timer_adder_bonus_batch(periods)
+        t_batch = time.perf_counter()-t0
+        print("clock_timer_adder_bonus for %d periods: scalar %.3fs, batch %.3fs, speed-up %.1fx"%
+              (len(periods), t_scalar, t_batch, t_scalar/t_batch))
+        self.assertLess(t_batch, t_scalar)
+        pass
+    pass
+
+#c clock_timer_index_bench
+class clock_timer_index_bench(unittest.TestCase):
+    """
+    Time nearest-period queries on the period index against clock_timer_adder_bonus
+    """
+    #f test_queries
+    def test_queries(self):
+        t0 = time.perf_counter()
+        index = clock_timer_period_index()
+        t_load = time.perf_counter()-t0
+        periods = [1000.0/(mhz+0.37) for mhz in range(4, 1000)]
+        t_search = time_per_call(clock_timer_adder_bonus, [(ns,) for ns in periods], repeats=1)
+        t_nearest = time_per_call(index.nearest, [(ns,) for ns in periods], repeats=1)
+        t_within = time_per_call(index.within_ppm, [(ns,10) for ns in periods], repeats=1)
+        print("clock_timer_period_index: load %.3fs, nearest %.2fus, within 10ppm %.2fus, clock_timer_adder_bonus %.2fus"%
+              (t_load, t_nearest*1E6, t_within*1E6, t_search*1E6))
+        pass
+    pass
+
+#c clock_timer_model_bench
+class clock_timer_model_bench(unittest.TestCase):
+    """
+    Time advancing the clock_timer model by an hour of 6.4ns cycles against stepping it
+    """
+    #f test_advance
+    def test_advance(self):
+        (adder, bonus) = clock_timer_adder_bonus(6.4)
+        control = {"enable_counter":1, "integer_adder":adder[0], "fractional_adder":adder[1],
+                   "bonus_subfraction_add":bonus[0], "bonus_subfraction_sub":bonus[1]}
+        model = c_clock_timer_model()
+        hour_of_cycles = 3600*1000*1000*1000*10//64
+        t_advance = time_per_call(lambda:model.copy().advance(hour_of_cycles, control), [()])
+        t_step    = time_per_call(lambda:model.copy().step(control), [()]*10000)
+        print("clock_timer_model: advance one hour %.2fus, step %.2fus per cycle (an hour of steps %.1f days)"%
+              (t_advance*1E6, t_step*1E6, t_step*hour_of_cycles/86400))
+        self.assertLess(t_advance, t_step*1000)
+        pass
+    pass
+
+#c clock_timer_sec_nsec_bench
+class clock_timer_sec_nsec_bench(unittest.TestCase):
+    """
+    Time converting a million 6.4ns timer samples to sec/nsec, in batch and with the scalar model
+    """
+    #f test_batch
+    def test_batch(self):
+        import numpy as np
+        values = (np.arange(1000*1000, dtype=np.uint64)*np.uint64(64))//np.uint64(10) + np.uint64(0xfeedbeef*(10**9))
+        synchronize = np.zeros(len(values), dtype=np.int64)
+        synchronize[0] = 3
+        t0 = time.perf_counter()
+        clock_timer_as_sec_nsec_batch(values, synchronize=synchronize)
+        t_batch = time.perf_counter()-t0
+        model = c_clock_timer_as_sec_nsec_model()
+        t0 = time.perf_counter()
+        for v in values[:10000].tolist():
+            model.step({"enable_counter":1}, v)
+            pass
+        t_scalar = (time.perf_counter()-t0)*len(values)/10000
+        print("clock_timer_as_sec_nsec for %d samples: batch %.3fs, scalar model (estimated) %.1fs"%
+              (len(values), t_batch, t_scalar))
+        self.assertLess(t_batch, t_scalar)
+        pass
+    pass
+
+#c lock_quality_bench
+class lock_quality_bench(unittest.TestCase):
+    """
+    Time the streaming lock quality analysis of ten million samples, in
+    blocks as from a trace, and estimate the time for 500 million
+    """
+    #f test_throughput
+    def test_throughput(self):
+        import numpy as np
+        rng = np.random.default_rng(1)
+        block = rng.integers(-2, 3, size=1<<20).astype(np.float64)
+        lq = c_lock_quality(tau0=10.0, max_log2=16)
+        samples = 10*1000*1000
+        t0 = time.perf_counter()
+        for i in range(samples//len(block)): lq.add(block)
+        lq.add(block[:samples%len(block)])
+        r = lq.results()
+        t = time.perf_counter()-t0
+        print("lock_quality for %d samples: %.2fs, %.1fM samples/s, 500M samples %.0fs; tail of %d samples"%
+              (r["samples"], t, r["samples"]/t/1E6, t*50, len(lq.tail)))
+        self.assertEqual(r["samples"], samples)
+        self.assertEqual(len(lq.tail), 3<<16)
+        pass
+    pass
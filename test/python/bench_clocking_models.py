@@ -0,0 +1,108 @@
+#a Copyright
+#
+#  This file 'bench_clocking_models.py' copyright Gavin J Stark 2017-20
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Imports
+import time
+import unittest
+from regress.clocking.eye_tracking_model import c_eye_channel, c_eye_stimulus, c_eye_tracking_environment, c_eye_tracking_model
+from regress.clocking.eye_tracking_model import eye_tracking_sweep, lock_statistics
+
+#a Benchmark classes
+#c eye_tracking_model_bench
+class eye_tracking_model_bench(unittest.TestCase):
+    """
+    Time the eye tracking model, and sweep it over channel profiles
+    (phase width, eye width, noise and min_eye_width) for each of the
+    request modes, reporting the lock probability and the distribution
+    of cycles to first lock
+    """
+    modes = {"default":{}, "early_quality":{"early_quality":1}, "fast":{"early_quality":1, "fast_seek":1}}
+    #f test_model
+    def test_model(self):
+        times = {}
+        for fast_forward in (False, True):
+            channel = c_eye_channel(73, int(73*2.2), 73//2)
+            model = c_eye_tracking_model(73)
+            t0 = time.perf_counter()
+            model.run(c_eye_tracking_environment(channel), 50*1000, stop_on_lock=False, fast_forward=fast_forward)
+            times[fast_forward] = (time.perf_counter()-t0)/model.cycle
+            pass
+        print("eye tracking model: %.2fus per cycle stepping, %.2fus per cycle with fast-forward"%
+              (times[False]*1E6, times[True]*1E6))
+        self.assertLess(times[True], times[False])
+        pass
+    #f test_stimulus
+    def test_stimulus(self):
+        """
+        Time generating the data for 750 feeds of 200 cycles (about the
+        eye tracking simulation test) per cycle, and from the stimulus buffers
+        """
+        feeds = [(91+(i%5), 91+(((i*7)%37)-18), 200*i) for i in range(750)]
+        channel = c_eye_channel(73, int(73*2.2), 73//2)
+        channel.random_sequence(0, 200*len(feeds)+1024)
+        t0 = time.perf_counter()
+        for (data_delay, tracking_delay, start) in feeds[:75]:
+            data_quality     = channel.find_data_quality(data_delay)
+            tracking_quality = channel.find_data_quality(tracking_delay)
+            for i in range(200):
+                random_data = channel.randoms[start+i]
+                data_p = channel.data_of_quality(data_quality,     random_data, step=17)
+                data_n = channel.data_of_quality(tracking_quality, random_data, step=23)
+                (data_p&0xf, data_n^0xf)
+                pass
+            pass
+        t_cycle = (time.perf_counter()-t0)/(75*200)
+        stimulus = c_eye_stimulus(channel)
+        times = []
+        for r in range(2):
+            t0 = time.perf_counter()
+            for (data_delay, tracking_delay, start) in feeds:
+                (data_p, data_n) = stimulus.data_in(data_delay, tracking_delay, start, 200)
+                for i in range(200):
+                    (data_p[i], data_n[i])
+                    pass
+                pass
+            times.append((time.perf_counter()-t0)/(len(feeds)*200))
+            pass
+        print("eye tracking stimulus: %.2fus per cycle generated per cycle, %.3fus per cycle from %d buffers (%.3fus once built)"%
+              (t_cycle*1E6, times[0]*1E6, len(stimulus.buffers), times[1]*1E6))
+        self.assertLess(times[0], t_cycle)
+        pass
+    #f test_sweep
+    def test_sweep(self):
+        profiles = []
+        for phase_width in (60, 73, 90):
+            for eye_fraction in (4, 3, 2):
+                for noise in (0.0, 0.2, 0.4):
+                    for min_eye_width in (8, 16, 24):
+                        profiles.append({"phase_width":phase_width, "eye_center":int(phase_width*2.2),
+                                         "eye_width":phase_width//eye_fraction, "noise":noise,
+                                         "min_eye_width":min_eye_width, "max_cycles":100*1000})
+                        pass
+                    pass
+                pass
+            pass
+        for (name, mode) in self.modes.items():
+            t0 = time.perf_counter()
+            results = eye_tracking_sweep([dict(p, **mode) for p in profiles])
+            t = time.perf_counter()-t0
+            s = lock_statistics(results)
+            print("eye tracking %-14s: %d profiles in %.1fs, lock probability %.2f, cycles to lock p10 %d p50 %d p90 %d max %d"%
+                  (name, s["profiles"], t, s["lock_probability"], s.get("p10",-1), s.get("p50",-1), s.get("p90",-1), s.get("max",-1)))
+            pass
+        pass
+    pass
@@ -0,0 +1,176 @@
+#a Copyright
+#
+#  This file 'bench_testbench.py' copyright Gavin J Stark 2017-20
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Imports
+import time
+from regress.clocking.clock_timer import clock_timer_adder_bonus
+from cdl.sim     import ThExecFile
+from cdl.sim     import TestCase
+from regress.clocking.clock_timer import t_timer_control, t_timer_value, t_timer_sec_nsec
+from regress.clocking.testbench import c_struct_signals
+from test_clock_timer import clock_timer_test_hw, clock_timer_multi_test_hw
+
+#a Test classes
+#c c_testbench_overhead_bench
+class c_testbench_overhead_bench(ThExecFile):
+    """
+    Measure the Python-side time per simulated cycle of driving and
+    sampling the timer control and value structures, field by field
+    (as the tests used to) and through c_struct_signals
+    """
+    cycles = 5000
+    #f time_cycles
+    def time_cycles(self, fn):
+        """
+        Time self.cycles of fn(i) followed by bfm_wait(1); return seconds per cycle
+        """
+        t0 = time.perf_counter()
+        for i in range(self.cycles):
+            fn(i)
+            self.bfm_wait(1)
+            pass
+        return (time.perf_counter()-t0)/self.cycles
+    #f run
+    def run(self):
+        control = c_struct_signals(self, "master_timer_control", t_timer_control)
+        value   = c_struct_signals(self, "master_timer_value",   t_timer_value)
+        sec_nsec = c_struct_signals(self, "master_timer_sec_nsec", t_timer_sec_nsec)
+        fields = list(t_timer_control.keys())
+        def nothing(i):
+            pass
+        def per_field_drive(i):
+            for f in fields:
+                getattr(self, "master_timer_control__%s"%f).drive(0)
+                pass
+            getattr(self, "master_timer_control__integer_adder").drive(1+(i&1))
+            pass
+        def struct_drive_changing(i):
+            control.drive(integer_adder=1+(i&1))
+            pass
+        def struct_drive_unchanged(i):
+            control.drive(integer_adder=1)
+            pass
+        def per_field_sample(i):
+            self.master_timer_value__value.value()
+            for f in ("valid", "sec", "nsec"):
+                getattr(self, "master_timer_sec_nsec__%s"%f).value()
+                pass
+            pass
+        def struct_sample(i):
+            value["value"].value()
+            sec_nsec.sample_fields("valid", "sec", "nsec")
+            pass
+        self.bfm_wait(10)
+        control.drive(dict([(f,0) for f in fields]), force=True)
+        control.drive(integer_adder=1, enable_counter=1)
+        baseline = self.time_cycles(nothing)
+        print("bfm_wait(1) alone: %8.2fus per cycle"%(baseline*1E6))
+        for (name, fn) in (("per-field drive",           per_field_drive),
+                           ("struct drive (changing)",   struct_drive_changing),
+                           ("struct drive (unchanged)",  struct_drive_unchanged),
+                           ("per-field sample",          per_field_sample),
+                           ("struct sample",             struct_sample),
+                           ):
+            t = self.time_cycles(fn)
+            print("%-25s: %8.2fus per cycle, %8.2fus Python overhead per cycle"%(name, t*1E6, (t-baseline)*1E6))
+            pass
+        self.passtest("Completed")
+        pass
+    pass
+
+#c c_multi_slave_scaling_bench
+class c_multi_slave_scaling_bench(ThExecFile):
+    """
+    Measure the simulation time per master clock cycle of the
+    tb_clock_timer_multi testbench with len(slave_periods) slaves
+    locked to the master, to see how it scales with the number of slaves
+    """
+    cycles = 20*1000
+    slave_periods = (16,)
+    #f run
+    def run(self):
+        master_control = c_struct_signals(self, "master_timer_control", t_timer_control)
+        master_control.drive(integer_adder=1, reset_counter=1)
+        for (i, period) in enumerate(self.slave_periods):
+            (adder, bonus) = clock_timer_adder_bonus(period/10.0)
+            c_struct_signals(self, "slave_timer_control_%d"%i, t_timer_control).drive(integer_adder=adder[0],
+                                                                                      fractional_adder=adder[1],
+                                                                                      bonus_subfraction_add=bonus[0],
+                                                                                      bonus_subfraction_sub=bonus[1],
+                                                                                      lock_window_auto=1,
+                                                                                      enable_counter=1)
+            pass
+        self.bfm_wait(100)
+        master_control.drive(reset_counter=0, enable_counter=1, lock_to_master=1)
+        self.bfm_wait(1000)
+        t0 = time.perf_counter()
+        self.bfm_wait(self.cycles)
+        t = (time.perf_counter()-t0)/self.cycles
+        print("%d slaves (periods %s): %8.2fus per master cycle"%(len(self.slave_periods), str(self.slave_periods), t*1E6))
+        self.passtest("Completed")
+        pass
+    pass
+
+#c c_multi_slave_scaling_bench_1
+class c_multi_slave_scaling_bench_1(c_multi_slave_scaling_bench):
+    slave_periods = (16,)
+    pass
+
+#c c_multi_slave_scaling_bench_2
+class c_multi_slave_scaling_bench_2(c_multi_slave_scaling_bench):
+    slave_periods = (16, 100)
+    pass
+
+#c c_multi_slave_scaling_bench_4
+class c_multi_slave_scaling_bench_4(c_multi_slave_scaling_bench):
+    slave_periods = (16, 40, 100, 250)
+    pass
+
+#c c_multi_slave_scaling_bench_8
+class c_multi_slave_scaling_bench_8(c_multi_slave_scaling_bench):
+    slave_periods = (16, 20, 32, 40, 64, 100, 160, 250)
+    pass
+
+#c c_multi_slave_scaling_bench_12
+class c_multi_slave_scaling_bench_12(c_multi_slave_scaling_bench):
+    slave_periods = (16, 20, 25, 32, 40, 50, 64, 80, 100, 160, 250, 400)
+    pass
+
+#c c_multi_slave_scaling_bench_16
+class c_multi_slave_scaling_bench_16(c_multi_slave_scaling_bench):
+    slave_periods = (12, 16, 20, 25, 32, 40, 50, 64, 80, 100, 128, 160, 200, 250, 320, 400)
+    pass
+
+#a Simulation benchmark classes
+#c testbench_bench
+class testbench_bench(TestCase):
+    hw = clock_timer_test_hw
+    _tests = {"overhead": (c_testbench_overhead_bench, 40*1000*10, {}),
+    }
+    pass
+
+#c multi_slave_bench
+class multi_slave_bench(TestCase):
+    hw = clock_timer_multi_test_hw
+    _tests = {"scaling_1": (c_multi_slave_scaling_bench_1, 25*1000*10, {"slave_periods":c_multi_slave_scaling_bench_1.slave_periods}),
+              "scaling_2": (c_multi_slave_scaling_bench_2, 25*1000*10, {"slave_periods":c_multi_slave_scaling_bench_2.slave_periods}),
+              "scaling_4": (c_multi_slave_scaling_bench_4, 25*1000*10, {"slave_periods":c_multi_slave_scaling_bench_4.slave_periods}),
+              "scaling_8": (c_multi_slave_scaling_bench_8, 25*1000*10, {"slave_periods":c_multi_slave_scaling_bench_8.slave_periods}),
+              "scaling_12": (c_multi_slave_scaling_bench_12, 25*1000*10, {"slave_periods":c_multi_slave_scaling_bench_12.slave_periods}),
+              "scaling_16": (c_multi_slave_scaling_bench_16, 25*1000*10, {"slave_periods":c_multi_slave_scaling_bench_16.slave_periods}),
+    }
+    pass
@@ -0,0 +1,137 @@
+#a Copyright
+#
+#  This file 'test_bitfields.py' copyright Gavin J Stark 2017-20
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Imports
+import random
+import unittest
+import numpy as np
+from regress.clocking.bitfields import c_bitfield_codec
+from regress.clocking.bitfields import timer_control_codec, timer_value_codec, timer_sec_nsec_codec
+from regress.clocking.bitfields import timer_compare_request_codec, timer_compare_response_codec
+from regress.clocking.bitfields import timer_capture_request_codec, timer_capture_response_codec
+from regress.clocking.bitfields import phase_measure_request_codec, phase_measure_response_codec
+from regress.clocking.bitfields import eye_track_request_codec, eye_track_response_codec
+from regress.clocking.clock_timer import t_timer_control
+from regress.clocking.testbench import c_struct_signals
+
+#a Test classes
+#c bitfields
+class bitfields(unittest.TestCase):
+    """
+    Check the bit-field codecs, scalar against bulk
+    """
+    codecs = (timer_control_codec, timer_value_codec, timer_sec_nsec_codec,
+              timer_compare_request_codec, timer_compare_response_codec,
+              timer_capture_request_codec, timer_capture_response_codec,
+              phase_measure_request_codec, phase_measure_response_codec,
+              eye_track_request_codec, eye_track_response_codec)
+    #f random_records
+    def random_records(self, codec, n, rng):
+        records = []
+        for i in range(n):
+            records.append(dict([(f, rng.randrange(mask+1)) for (f, lsb, width, mask) in codec.fields]))
+            pass
+        return records
+    #f test_layout
+    def test_layout(self):
+        """
+        Fields are in CDL header order from bit 0
+        """
+        self.assertEqual(timer_value_codec.width, 70)
+        self.assertEqual(timer_value_codec.pack(value=1<<63, irq=1), (1<<63)|(1<<64))
+        self.assertEqual(timer_value_codec.lsb_of("locked"), 65)
+        self.assertEqual(timer_value_codec.lsb_of("fraction"), 66)
+        self.assertEqual(timer_control_codec.width, 103)
+        self.assertEqual(timer_control_codec.lsb_of("synchronize_value"), 10)
+        self.assertEqual(timer_sec_nsec_codec.pack(valid=1, sec=2, nsec=3), 1 | (2<<1) | (3<<36))
+        self.assertEqual(eye_track_request_codec.pack(measure=1), 2)
+        self.assertEqual(eye_track_response_codec.unpack(7<<3)["data_delay"], 7)
+        self.assertRaises(ValueError, timer_value_codec.pack, irq=2)
+        pass
+    #f test_scalar
+    def test_scalar(self):
+        rng = random.Random(6)
+        for codec in self.codecs:
+            for values in self.random_records(codec, 100, rng):
+                data = codec.pack(values)
+                self.assertEqual(codec.unpack(data), values)
+                self.assertEqual(codec.unpack_bytes(codec.pack_bytes(values)), values)
+                self.assertEqual(codec.pack_bytes(values), data.to_bytes(codec.num_bytes, "little"))
+                pass
+            pass
+        pass
+    #f test_bulk
+    def test_bulk(self):
+        rng = random.Random(7)
+        for codec in self.codecs:
+            values = self.random_records(codec, 500, rng)
+            data = b"".join([codec.pack_bytes(v) for v in values])
+            records = codec.unpack_array(data)
+            for (v, r) in zip(values, records):
+                self.assertEqual(v, dict([(f, int(r[f])) for f in codec.dtype.names]), codec.name)
+                pass
+            self.assertEqual(codec.pack_array(records).tobytes(), data, codec.name)
+            self.assertEqual(codec.pack_ints(records), [codec.pack(v) for v in values], codec.name)
+            out = codec.empty(len(values))
+            self.assertIs(codec.unpack_array(np.frombuffer(data, dtype=np.uint8).reshape(-1, codec.num_bytes), out=out), out)
+            self.assertEqual(out.tobytes(), records.tobytes())
+            pass
+        pass
+    #f test_uint64
+    def test_uint64(self):
+        codec = c_bitfield_codec("t_test", {"a":3, "b":60, "c":1})
+        packed = np.array([codec.pack(a=5, b=(1<<60)-2, c=1), codec.pack(a=1)], dtype=np.uint64)
+        records = codec.unpack_array(packed)
+        self.assertEqual(records.tolist(), [(5, (1<<60)-2, 1), (1, 0, 0)])
+        pass
+    pass
+
+#c struct_signals
+class struct_signals(unittest.TestCase):
+    """
+    Check c_struct_signals against a harness of recording signals
+    """
+    #c c_signal
+    class c_signal(object):
+        def __init__(self): (self.v, self.drives) = (0, 0)
+        def drive(self, v): (self.v, self.drives) = (v, self.drives+1)
+        def value(self): return self.v
+        pass
+    #c c_harness
+    class c_harness(object):
+        def __init__(self, prefix, descriptor, signal_class):
+            for f in descriptor: setattr(self, "%s__%s"%(prefix,f), signal_class())
+            pass
+        pass
+    #f test_drive_sample
+    def test_drive_sample(self):
+        th = self.c_harness("ctl", t_timer_control, self.c_signal)
+        s = c_struct_signals(th, "ctl", t_timer_control)
+        self.assertEqual(s.drive(integer_adder=3, enable_counter=1), 2)
+        self.assertEqual(s.drive({"integer_adder":3}, enable_counter=1), 0)
+        self.assertEqual(s.drive({"integer_adder":3}, force=True), 1)
+        self.assertEqual(th.ctl__integer_adder.drives, 2)
+        self.assertEqual(s.sample_fields("integer_adder", "enable_counter"), (3, 1))
+        packed = s.sample_int()
+        self.assertEqual(s.codec.unpack(packed), s.sample())
+        self.assertEqual(s.drive(packed), len(t_timer_control)-2)
+        self.assertEqual(s.drive(packed), 0)
+        self.assertEqual(s.drive(s.codec.pack(integer_adder=2)), 2)
+        self.assertEqual(s.sample_fields("integer_adder", "enable_counter"), (2, 0))
+        self.assertIs(s["fractional_adder"], th.ctl__fractional_adder)
+        pass
+    pass
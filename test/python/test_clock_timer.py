@@ -18,13 +18,41 @@
 #a Imports
 # import structs
 import math
+import random
+import numpy as np
 from cdl.sim     import ThExecFile
 from cdl.sim     import HardwareThDut
 from cdl.sim     import TestCase
 from regress.clocking.clock_timer import t_timer_control, t_timer_value, t_timer_sec_nsec
+from regress.clocking.clock_timer import t_timer_compare_request, t_timer_compare_response
+from regress.clocking.clock_timer import t_timer_capture_request, t_timer_capture_response
 from regress.clocking.clock_timer import clock_timer_adder_bonus, clock_timer_period
+from regress.clocking.clock_timer_model import c_clock_timer_model, c_clock_timer_as_sec_nsec_model
+from regress.clocking.clock_timer_model import c_clock_timer_capture_model
+from regress.clocking.clock_timer_batch import timer_sec_nsec_of_values
+from regress.clocking.testbench import c_struct_signals, c_th_waits, record_results
+from regress.clocking.trace import c_trace
+from regress.clocking.lock_quality import c_lock_quality
 
 #a Useful functions
+#f lock_quality_failures
+def lock_quality_failures(lock_quality, max_diff, max_mtie):
+    """
+    Return a list of failures of the c_lock_quality of a master-slave
+    error after lock - any error beyond max_diff, or MTIE beyond max_mtie
+    """
+    failures = []
+    r = lock_quality.results()
+    beyond = (r["bin_edges"][:-1]<-max_diff) | (r["bin_edges"][:-1]>=max_diff+1)
+    if (r["max_abs"]>max_diff) or (r["histogram"][beyond].sum()+r["underflow"]+r["overflow"]>0):
+        failures.append("Master-slave error after lock beyond %d (min %d max %d)"%(max_diff, r["min"], r["max"]))
+        pass
+    mtie = r["mtie"][~np.isnan(r["mtie"])]
+    if (len(mtie)==0) or (mtie.max()>max_mtie):
+        failures.append("Master-slave MTIE after lock beyond %d (%s)"%(max_mtie, str(mtie.tolist())))
+        pass
+    return failures
+
 def find_fractions_for(ns):
     adder_ns = int(ns*16)
     print("adder (%d,%d"%(adder_ns%16, adder_ns//16))
@@ -47,32 +75,131 @@ class c_clock_timer_test_base(ThExecFile):
     (slave_adder, slave_bonus) = clock_timer_adder_bonus(1.6)
     slave_lock = False
     lock_window_lsb = 6
+    lock_window_auto = False
+    master_control_delay = 0
     hw_clk = "clk"
+    #f struct_signals
+    def struct_signals(self, prefix, descriptor):
+        """
+        Return the c_struct_signals for a port, creating it on first use
+        """
+        if not hasattr(self, "_struct_signals"): self._struct_signals={}
+        if prefix not in self._struct_signals:
+            self._struct_signals[prefix] = c_struct_signals(self, prefix, descriptor)
+            pass
+        return self._struct_signals[prefix]
+    #f drive_master_control
+    def drive_master_control(self, **kwargs):
+        """
+        Drive master timer control fields, and record them for the master model
+
+        The model is first brought up to date with the previous control,
+        so that the new control applies from the next edge
+        """
+        self.struct_signals("master_timer_control", t_timer_control).drive(kwargs)
+        self.master_model.advance(self.master_model_held, self.master_control)
+        self.master_model_held = 0
+        self.master_control.update(kwargs)
+        pass
+    #f drive_slave_control
+    def drive_slave_control(self, **kwargs):
+        """
+        Drive slave timer control fields
+        """
+        self.struct_signals("slave_timer_control", t_timer_control).drive(kwargs)
+        pass
+    #f model_wait
+    def model_wait(self, cycles):
+        """
+        Wait for cycles clock edges, advancing the master model by the same
+
+        The timer sees a drive master_control_delay edges after the
+        first edge following it (none, as the harness drives its outputs
+        before the edge that bfm_wait then waits for), so the model is
+        held back by that many edges, which it catches up on at the next
+        drive; master_0 checks this on the first edge after enable
+        """
+        self.bfm_wait(cycles)
+        self.master_model_held += cycles
+        if self.master_model_held>self.master_control_delay:
+            self.master_model.advance(self.master_model_held-self.master_control_delay, self.master_control)
+            self.master_model_held = self.master_control_delay
+            pass
+        pass
+    #f check_master_model
+    def check_master_model(self, master):
+        """
+        Check a master timer value is exactly that of the model
+        """
+        expected = self.master_model.value
+        if master!=expected:
+            self.failtest("Master clock %d does not match model %d (differs by %d)"%(master, expected, master-expected))
+            pass
+        pass
+    #f check_sec_nsec
+    def check_sec_nsec(self, name, changes_required=3, max_cycles=400, suffix="", wait=None):
+        """
+        Check the sec/nsec output for the 'master' or 'slave' timer exactly
+        (suffix selects a divider variant, such as '_r4')
+
+        The timer value and sec/nsec are sampled every (master) clock
+        cycle; whenever the timer value changes the sec/nsec must have
+        changed to that of the previous timer value. This requires the
+        timer clock to be no faster than the master clock.
+
+        Each cycle is waited for with wait (by default bfm_wait; model_wait
+        keeps the master model in step)
+        """
+        if wait is None: wait=self.bfm_wait
+        timer_value = self.struct_signals("%s_timer_value"%name, t_timer_value)["value"]
+        timer_sec_nsec = self.struct_signals("%s_timer_sec_nsec%s"%(name, suffix), t_timer_sec_nsec)
+        (last_value, changes) = (None, 0)
+        for i in range(max_cycles):
+            value = timer_value.value()
+            sec_nsec = timer_sec_nsec.sample_fields("valid", "sec", "nsec")
+            if (last_value is not None) and (value!=last_value):
+                expected = tuple(timer_sec_nsec_of_values([last_value])[0].tolist())
+                if sec_nsec!=expected:
+                    self.failtest("%s timer sec/nsec%s (valid,sec,nsec) %s should be %s for previous value %d"%
+                                  (name, suffix, str(sec_nsec), str(expected), last_value))
+                    pass
+                changes += 1
+                if changes>=changes_required: break
+                pass
+            last_value = value
+            wait(1)
+            pass
+        if changes<changes_required:
+            self.failtest("%s timer did not change %d times in %d cycles"%(name, changes_required, max_cycles))
+            pass
+        pass
     #f configure_master
     def configure_master(self, adder, bonus=(0,0)):
-        self.master_timer_control__bonus_subfraction_sub.drive(bonus[1])
-        self.master_timer_control__bonus_subfraction_add.drive(bonus[0])
-        self.master_timer_control__fractional_adder.drive(adder[1])
-        self.master_timer_control__integer_adder.drive(adder[0])
-        self.master_timer_control__reset_counter.drive(1)
-        self.master_timer_control__enable_counter.drive(0)
+        self.master_model = c_clock_timer_model()
+        (self.master_control, self.master_model_held) = ({}, 0)
+        self.drive_master_control(bonus_subfraction_sub=bonus[1],
+                                  bonus_subfraction_add=bonus[0],
+                                  fractional_adder=adder[1],
+                                  integer_adder=adder[0],
+                                  reset_counter=1,
+                                  enable_counter=0)
         print("Master configured for %fns %fMHz"%(clock_timer_period(adder, bonus),1000.0/clock_timer_period(adder, bonus)))
         pass
     #f configure_slave
     def configure_slave(self, adder, bonus=(0,0), lock=False):
-        self.slave_timer_control__bonus_subfraction_sub.drive(bonus[1])
-        self.slave_timer_control__bonus_subfraction_add.drive(bonus[0])
-        self.slave_timer_control__fractional_adder.drive(adder[1])
-        self.slave_timer_control__integer_adder.drive(adder[0])
-        self.slave_timer_control__reset_counter.drive(1)
-        self.slave_timer_control__enable_counter.drive(0)
+        self.drive_slave_control(bonus_subfraction_sub=bonus[1],
+                                 bonus_subfraction_add=bonus[0],
+                                 fractional_adder=adder[1],
+                                 integer_adder=adder[0],
+                                 reset_counter=1,
+                                 enable_counter=0)
         print("Slave configured for %fns %fMHz"%(clock_timer_period(adder, bonus),1000.0/clock_timer_period(adder, bonus)))
         if lock:
-            self.master_timer_control__lock_to_master.drive(1)
-            self.master_timer_control__lock_window_lsb.drive({4:0,6:1,8:2,10:3}[self.lock_window_lsb])
+            self.drive_master_control(lock_to_master=1, lock_window_lsb={4:0,6:1,8:2,10:3}[self.lock_window_lsb],
+                                      lock_window_auto=int(self.lock_window_auto))
             pass
         else:
-            self.master_timer_control__lock_to_master.drive(0)
+            self.drive_master_control(lock_to_master=0)
             pass
         pass
     pass
@@ -83,14 +210,14 @@ class c_clock_timer_test_master_0(c_clock_timer_test_base):
         self.sim_msg = self.sim_message()
         self.bfm_wait(100)
         self.configure_master( adder=self.master_adder )
-        self.bfm_wait(40)
-        self.master_timer_control__reset_counter.drive(0)
-        self.bfm_wait(40)
-        self.master_timer_control__enable_counter.drive(1)
-        self.bfm_wait(1000)
-        master = self.master_timer_value__value.value()
-        if (master<990) or (master>1010):
-            self.failtest("Master clock %d out of range 990 to 1010"%master)
+        self.model_wait(40)
+        self.drive_master_control(reset_counter=0)
+        self.model_wait(40)
+        self.drive_master_control(enable_counter=1)
+        self.model_wait(1)
+        self.check_master_model(self.master_timer_value__value.value())
+        self.model_wait(999)
+        self.check_master_model(self.master_timer_value__value.value())
         self.passtest("Test completed")
         pass
     pass
@@ -102,19 +229,16 @@ class c_clock_timer_test_master_sync_0(c_clock_timer_test_base):
         self.sim_msg = self.sim_message()
         self.bfm_wait(100)
         self.configure_master( adder=self.master_adder )
-        self.bfm_wait(40)
-        self.master_timer_control__reset_counter.drive(0)
-        self.bfm_wait(40)
-        self.master_timer_control__enable_counter.drive(1)
-        self.bfm_wait(100)
-        self.master_timer_control__synchronize.drive(3)
-        self.master_timer_control__synchronize_value.drive(0x123456789abcdef0)
-        self.bfm_wait(1)
-        self.master_timer_control__synchronize.drive(0)
-        self.bfm_wait(1000)
-        master = self.master_timer_value__value.value() - 0x123456789abcdef0
-        if (master<990) or (master>1010):
-            self.failtest("Master clock %d out of range 990 to 1010"%master)
+        self.model_wait(40)
+        self.drive_master_control(reset_counter=0)
+        self.model_wait(40)
+        self.drive_master_control(enable_counter=1)
+        self.model_wait(100)
+        self.drive_master_control(synchronize=3, synchronize_value=0x123456789abcdef0)
+        self.model_wait(1)
+        self.drive_master_control(synchronize=0)
+        self.model_wait(1000)
+        self.check_master_model(self.master_timer_value__value.value())
         self.passtest("Test completed")
         pass
     pass
@@ -126,19 +250,16 @@ class c_clock_timer_test_master_sync_1(c_clock_timer_test_base):
         self.sim_msg = self.sim_message()
         self.bfm_wait(100)
         self.configure_master( adder=self.master_adder )
-        self.bfm_wait(40)
-        self.master_timer_control__reset_counter.drive(0)
-        self.bfm_wait(40)
-        self.master_timer_control__enable_counter.drive(1)
-        self.bfm_wait(100)
-        self.master_timer_control__synchronize.drive(1)
-        self.master_timer_control__synchronize_value.drive(0x123456789abcdef0)
-        self.bfm_wait(1)
-        self.master_timer_control__synchronize.drive(0)
-        self.bfm_wait(1000)
-        master = self.master_timer_value__value.value() - 0x9abcdef0
-        if (master<990) or (master>1010):
-            self.failtest("Master clock %d out of range 990 to 1010"%master)
+        self.model_wait(40)
+        self.drive_master_control(reset_counter=0)
+        self.model_wait(40)
+        self.drive_master_control(enable_counter=1)
+        self.model_wait(100)
+        self.drive_master_control(synchronize=1, synchronize_value=0x123456789abcdef0)
+        self.model_wait(1)
+        self.drive_master_control(synchronize=0)
+        self.model_wait(1000)
+        self.check_master_model(self.master_timer_value__value.value())
         self.passtest("Test completed")
         pass
     pass
@@ -150,48 +271,224 @@ class c_clock_timer_test_master_sync_2(c_clock_timer_test_base):
         self.sim_msg = self.sim_message()
         self.bfm_wait(100)
         self.configure_master( adder=self.master_adder )
-        self.bfm_wait(40)
-        self.master_timer_control__reset_counter.drive(0)
-        self.bfm_wait(40)
-        self.master_timer_control__enable_counter.drive(1)
+        self.model_wait(40)
+        self.drive_master_control(reset_counter=0)
+        self.model_wait(40)
+        self.drive_master_control(enable_counter=1)
+        self.model_wait(100)
+        self.drive_master_control(synchronize=2, synchronize_value=0x123456789abcdef0)
+        self.model_wait(1)
+        self.drive_master_control(synchronize=0)
+        self.model_wait(1000)
+        self.check_master_model(self.master_timer_value__value.value())
+        self.passtest("Test completed")
+        pass
+    pass
+
+#c c_clock_timer_test_sec_nsec_window
+class c_clock_timer_test_sec_nsec_window(c_clock_timer_test_base):
+    """
+    Measure the window after a synchronize in which the master sec/nsec
+    is invalid, for the radix 2, 4 and 16 dividers of
+    clock_timer_as_sec_nsec, check them against the model, and check
+    that each then tracks the timer
+    """
+    dividers = {"":1, "_r4":2, "_r16":4}
+    #f run
+    def run(self):
+        self.sim_msg = self.sim_message()
         self.bfm_wait(100)
-        self.master_timer_control__synchronize.drive(2)
-        self.master_timer_control__synchronize_value.drive(0x123456789abcdef0)
-        self.bfm_wait(1)
-        self.master_timer_control__synchronize.drive(0)
-        self.bfm_wait(1000)
-        master = self.master_timer_value__value.value() - 0x1234567800000000
-        if (master<1090) or (master>1110):
-            self.failtest("Master clock %d out of range 1090 to 1110"%master)
+        self.configure_master( adder=(6,6), bonus=(1,2) )
+        self.model_wait(40)
+        self.drive_master_control(reset_counter=0)
+        self.model_wait(40)
+        self.drive_master_control(enable_counter=1)
+        self.model_wait(100)
+        valid = {}
+        for suffix in self.dividers:
+            valid[suffix] = self.struct_signals("master_timer_sec_nsec%s"%suffix, t_timer_sec_nsec)["valid"]
+            if valid[suffix].value()!=1:
+                self.failtest("Master sec/nsec%s not valid before synchronize"%suffix)
+                pass
+            pass
+        self.drive_master_control(synchronize=3, synchronize_value=5*(10**9)-100)
+        self.model_wait(1)
+        self.drive_master_control(synchronize=0)
+        windows = {}
+        for i in range(100):
+            for suffix in self.dividers:
+                if (suffix not in windows) and (valid[suffix].value()==1): windows[suffix]=i
+                pass
+            if len(windows)==len(self.dividers): break
+            self.model_wait(1)
+            pass
+        # The synchronize may be seen on the edge after that driven, so allow one cycle of slack
+        for (suffix, divider_bits_per_step) in self.dividers.items():
+            expected = c_clock_timer_as_sec_nsec_model(divider_bits_per_step=divider_bits_per_step).invalid_cycles()
+            if suffix not in windows:
+                self.failtest("Master sec/nsec%s did not become valid after synchronize"%suffix)
+                continue
+            print("Master sec/nsec%s invalid for %d cycles after synchronize (model %d)"%(suffix, windows[suffix], expected))
+            if abs(windows[suffix]-expected)>1:
+                self.failtest("Master sec/nsec%s invalid for %d cycles, model %d"%(suffix, windows[suffix], expected))
+                pass
+            if windows[suffix]-windows[""]!=expected-c_clock_timer_as_sec_nsec_model().invalid_cycles():
+                self.failtest("Master sec/nsec%s window does not differ from radix 2 divider by the model's"%suffix)
+                pass
+            pass
+        self.model_wait(10)
+        for suffix in self.dividers:
+            self.check_sec_nsec("master", suffix=suffix, wait=self.model_wait)
+            pass
+        self.check_master_model(self.master_timer_value__value.value())
         self.passtest("Test completed")
         pass
     pass
 
 #c c_clock_timer_test_master_slave_base
 class c_clock_timer_test_master_slave_base(c_clock_timer_test_base):
+    """
+    Run a master and slave timer, and check they are within max_diff
+
+    If the slave is locked to the master the test ends once the slave
+    has been locked, and within max_diff of the master, for lock_windows
+    consecutive lock windows (of 4<<lock_window_lsb ns); it fails if
+    that does not happen within max_lock_cycles master clock cycles.
+    The cycles to lock, and the worst difference after lock, are
+    reported and recorded (with record_results). The slave timer value
+    must be marked locked at the end of the test if, and only if, the
+    slave is locked to the master.
+
+    The master-slave error is analyzed with c_lock_quality for the whole
+    run and for the final period of lock; the test fails if, during that
+    period of lock, any error is beyond max_diff or the MTIE at any
+    observation interval is beyond max_mtie (by default twice max_diff).
+
+    The slave clock period is slave_period, which the hardware must be
+    given.
+
+    If trace_filename is set the master and slave timer values are
+    traced to it while waiting for lock (load it with trace_load)
+    """
+    trace_filename = None
     max_diff = 8
+    max_mtie = None
     master_sync = None
-    #f run
-    def run(self):
-        self.sim_msg = self.sim_message()
+    lock_windows = 32
+    max_lock_cycles = 480*1000
+    slave_period = 16
+    #f wait_for_lock
+    def wait_for_lock(self):
+        """
+        Monitor the slave until it has stayed locked for lock_windows windows
+
+        Returns (cycles_to_lock, worst_error) where cycles are master
+        clock cycles from the start of monitoring; the master-slave
+        difference is sampled eight times per lock window, and analyzed
+        in run_quality (all samples) and lock_quality (samples since lock)
+        """
+        window_cycles = int((4<<self.lock_window_lsb) / clock_timer_period(self.master_adder, self.master_bonus))
+        interval = max(1, window_cycles//8)
+        tau0 = interval*clock_timer_period(self.master_adder, self.master_bonus)
+        self.run_quality = c_lock_quality(tau0=tau0, max_log2=12, hist_limit=4*self.max_diff)
+        self.lock_quality = None
+        master_value = self.struct_signals("master_timer_value", t_timer_value)["value"]
+        slave_value  = self.struct_signals("slave_timer_value",  t_timer_value)
+        (cycles, locked_since, worst_error) = (0, None, 0)
+        trace = None
+        if self.trace_filename is not None:
+            trace = c_trace(self, (("master_timer_value", t_timer_value), ("slave_timer_value", t_timer_value)),
+                            filename=self.trace_filename)
+            pass
+        while cycles<self.max_lock_cycles:
+            if trace is not None: trace.sample(cycles)
+            (slave, locked) = slave_value.sample_fields("value", "locked")
+            error = master_value.value()-slave
+            diff = abs(error)
+            self.run_quality.add(error)
+            if locked and (diff<=self.max_diff):
+                if locked_since is None:
+                    (locked_since, worst_error) = (cycles, 0)
+                    self.lock_quality = c_lock_quality(tau0=tau0, max_log2=12, hist_limit=4*self.max_diff)
+                    pass
+                worst_error = max(worst_error, diff)
+                self.lock_quality.add(error)
+                if cycles-locked_since>=self.lock_windows*window_cycles:
+                    if trace is not None: trace.close()
+                    return (locked_since, worst_error)
+                pass
+            else:
+                locked_since = None
+                pass
+            self.bfm_wait(interval)
+            cycles += interval
+            pass
+        if trace is not None: trace.close()
+        self.failtest("Slave did not stay locked within %d of master for %d lock windows in %d cycles"%
+                      (self.max_diff, self.lock_windows, self.max_lock_cycles))
+        return (None, None)
+    #f check_lock_quality
+    def check_lock_quality(self):
+        """
+        Report the lock quality for the run and after lock, and check the latter
+        """
+        print("Master-slave error for the whole run:")
+        for l in self.run_quality.report(): print("  "+l)
+        if self.lock_quality is None: return
+        print("Master-slave error after lock:")
+        for l in self.lock_quality.report(): print("  "+l)
+        max_mtie = self.max_mtie
+        if max_mtie is None: max_mtie = 2*self.max_diff
+        for f in lock_quality_failures(self.lock_quality, self.max_diff, max_mtie):
+            self.failtest(f)
+            pass
+        pass
+    #f run_to_enable
+    def run_to_enable(self):
+        """
+        Configure the master and slave, and run them through reset to enable
+        """
         self.bfm_wait(100)
 
         self.configure_master( adder=self.master_adder, bonus=self.master_bonus )
         self.configure_slave( adder=self.slave_adder, bonus=self.slave_bonus, lock=self.slave_lock )
         self.bfm_wait(200)
-        self.slave_timer_control__reset_counter.drive(0)
-        self.master_timer_control__reset_counter.drive(0)
+        self.drive_slave_control(reset_counter=0)
+        self.drive_master_control(reset_counter=0)
         self.bfm_wait(200) # For a slow clock period
-        self.slave_timer_control__enable_counter.drive(1)
-        self.master_timer_control__enable_counter.drive(1)
+        self.drive_slave_control(enable_counter=1)
+        self.drive_master_control(enable_counter=1)
+        pass
+    #f run
+    def run(self):
+        self.sim_msg = self.sim_message()
+        self.run_to_enable()
+        self.run_from_enable()
+        pass
+    #f run_from_enable
+    def run_from_enable(self):
+        """
+        Synchronize the master if required, wait for lock (or the end of the test), and check the timers
+        """
         if self.master_sync is not None:
             self.bfm_wait(500)
-            self.master_timer_control__synchronize.drive(3)
-            self.master_timer_control__synchronize_value.drive(self.master_sync)
+            self.drive_master_control(synchronize=3, synchronize_value=self.master_sync)
             self.bfm_wait(1)
-            self.master_timer_control__synchronize.drive(0)
+            self.drive_master_control(synchronize=0)
+            pass
+        if self.slave_lock:
+            (self.cycles_to_lock, self.worst_lock_error) = self.wait_for_lock()
+            if self.cycles_to_lock is not None:
+                print("Slave locked after %d cycles, worst difference after lock %d"%(self.cycles_to_lock, self.worst_lock_error))
+                pass
+            record_results({"test":self.__class__.__name__, "slave_period":self.slave_period,
+                            "lock_window_lsb":self.lock_window_lsb, "lock_window_auto":self.lock_window_auto,
+                            "cycles_to_lock":self.cycles_to_lock, "worst_lock_error":self.worst_lock_error})
+            self.check_lock_quality()
+            pass
+        else:
+            self.bfm_wait_until_test_done(10+2*400) # Leave time for check_sec_nsec
             pass
-        self.bfm_wait_until_test_done(10)
         master = self.master_timer_value__value.value()
         slave = self.slave_timer_value__value.value()
         diff = abs(master-slave)
@@ -199,30 +496,11 @@ class c_clock_timer_test_master_slave_base(c_clock_timer_test_base):
         if diff>self.max_diff:
             self.failtest("Difference in times is more than %d (%d) (%08x to %08x) - should have locked"%
                           (self.max_diff, diff, master, slave))
-        master_sec  = self.master_timer_sec_nsec__sec.value()
-        master_nsec = self.master_timer_sec_nsec__nsec.value()
-        master_sec_nsec = master_sec*(10**9)+master_nsec
-        if master_nsec>10**9:
-            self.failtest("Master_nsec should be less than 1000,000,000 (%d)"%
-                          (master_nsec))
-            pass
-        diff = master - master_sec_nsec
-        if diff>2:
-            self.failtest("Difference in sec/nsec and actual timer is more than 2 (%d) (%08x to %08x)"%
-                          (diff, master, master_sec_nsec))
-            pass
-        slave_sec  = self.slave_timer_sec_nsec__sec.value()
-        slave_nsec = self.slave_timer_sec_nsec__nsec.value()
-        slave_sec_nsec = slave_sec*(10**9)+slave_nsec
-        if slave_nsec>10**9:
-            self.failtest("Slave_nsec should be less than 1000,000,000 (%d)"%
-                          (slave_nsec))
-            pass
-        diff = slave - slave_sec_nsec
-        if diff>self.slave_adder[0]+1:
-            self.failtest("Difference in sec/nsec and actual timer is more than %d (%d) (%08x to %08x)"%
-                          (self.slave_adder[0]+1, diff, slave, slave_sec_nsec))
+        if self.slave_timer_value__locked.value()!=int(self.slave_lock):
+            self.failtest("Slave timer value locked is %d with slave lock %d"%(self.slave_timer_value__locked.value(), self.slave_lock))
             pass
+        self.check_sec_nsec("master")
+        self.check_sec_nsec("slave")
         self.passtest("Test completed")
         pass
     pass
@@ -262,6 +540,7 @@ class c_clock_timer_test_master_slave_4(c_clock_timer_test_master_slave_base):
     master_sync = ((10**9)*0xfeedbeef) - 1000
     lock_window_lsb = 4
     max_diff = 2 # 600MHz
+    max_lock_cycles = 95*1000
     pass
 
 #c c_clock_timer_test_master_slave_5
@@ -271,6 +550,7 @@ class c_clock_timer_test_master_slave_5(c_clock_timer_test_master_slave_base):
     master_sync = ((10**9)*0xfeedbeee) - 1000
     lock_window_lsb = 6
     max_diff = 10 # 100MHz
+    slave_period = 100
     pass
 
 #c c_clock_timer_test_master_slave_6
@@ -280,9 +560,11 @@ class c_clock_timer_test_master_slave_6(c_clock_timer_test_master_slave_base):
     master_sync = 0xdeadbeefcafef00d
     lock_window_lsb = 8
     max_diff = 100 # 10MHz
+    slave_period = 1000
     # In theory this may not work - as the edge detection is too frequent
     # And indeed it does not, except that we have oversped the clock by 1/1600
     # and this helps catch up with the initial delay in synchronization
+    max_lock_cycles = 2480*1000
     pass
 
 #c c_clock_timer_test_master_slave_7
@@ -292,6 +574,637 @@ class c_clock_timer_test_master_slave_7(c_clock_timer_test_master_slave_base):
     master_sync = 0xdeadbeefcafef00d
     lock_window_lsb = 10
     max_diff = 100 # 10MHz
+    slave_period = 1000
+    max_lock_cycles = 2480*1000
+    pass
+
+#c c_clock_timer_test_master_slave_auto_4
+class c_clock_timer_test_master_slave_auto_4(c_clock_timer_test_master_slave_4):
+    lock_window_auto = True
+    pass
+
+#c c_clock_timer_test_master_slave_auto_5
+class c_clock_timer_test_master_slave_auto_5(c_clock_timer_test_master_slave_5):
+    lock_window_auto = True
+    pass
+
+#c c_clock_timer_test_master_slave_auto_6
+class c_clock_timer_test_master_slave_auto_6(c_clock_timer_test_master_slave_6):
+    """
+    The slave is more than a quarter window behind after the synchronize,
+    which a fixed lock window only recovers from by the slave clock
+    being fast; the auto lock window captures it from the start
+    """
+    lock_window_auto = True
+    max_lock_cycles = 480*1000
+    pass
+
+#c c_clock_timer_test_master_slave_auto_8
+class c_clock_timer_test_master_slave_auto_8(c_clock_timer_test_master_slave_6):
+    """
+    As master_slave_auto_6 but with a slow slave clock, which does not lock with the fixed lock window
+    """
+    (slave_adder, slave_bonus) = clock_timer_adder_bonus(99.9)
+    lock_window_auto = True
+    max_lock_cycles = 480*1000
+    pass
+#c c_clock_timer_test_compare
+class c_clock_timer_test_compare(c_clock_timer_test_base):
+    """
+    Check that the compare bank hits, and asserts irq, in exactly the
+    cycle that its timer value output is first at or beyond an armed
+    compare value; and that the value at which it hits is the first
+    of the model's values at or beyond it. This is checked for a
+    compare value that the timer steps over, one that a synchronize
+    jumps over, and one after the synchronize.
+
+    The master model is that of the clock_timer in the compare bank,
+    which is one cycle ahead of its output; the sequence of values is
+    the same, so the first value at or beyond a compare value is too.
+    """
+    master_adder = (6,6)
+    master_bonus = (1,2)
+    sync_value   = 1<<40
+    #f write_compare
+    def write_compare(self, select, value, expected):
+        """
+        Write a compare register, recording the value it should hit at
+        """
+        self.compares[select] = (value, expected)
+        self.compare_request.drive(write=1, select=select, value=value)
+        self.model_wait(1)
+        self.compare_request.drive(write=0)
+        pass
+    #f expected_hit
+    def expected_hit(self, value):
+        """
+        Return the first model timer value at or beyond value
+        """
+        return self.master_model.value_after(self.master_model.cycles_until(value, self.master_control), self.master_control)
+    #f wait_for_hits
+    def wait_for_hits(self, selects, max_cycles):
+        """
+        Wait for the compare registers selects to hit, checking every cycle
+        that each pending register has hit if and only if the timer value
+        is at or beyond its compare value, and that irq is the OR of the hits
+        """
+        pending = set(self.compares.keys())
+        for i in range(max_cycles):
+            (value, irq) = self.compare_timer_value.sample_fields("value", "irq")
+            hits = self.compare_response["hits"].value()
+            if irq!=int(hits!=0):
+                self.failtest("Compare irq %d with hits %x"%(irq, hits))
+                pass
+            for select in list(pending):
+                (compare, expected) = self.compares[select]
+                hit = (hits>>select)&1
+                if hit!=int(value>=compare):
+                    self.failtest("Compare %d of %d has hit %d with timer value %d"%(select, compare, hit, value))
+                    pass
+                if hit:
+                    if value!=expected:
+                        self.failtest("Compare %d of %d hit at timer value %d, model %d"%(select, compare, value, expected))
+                        pass
+                    pending.remove(select)
+                    del self.compares[select]
+                    pass
+                pass
+            if len(pending.intersection(selects))==0: return i
+            self.model_wait(1)
+            pass
+        self.failtest("Compares %s did not hit in %d cycles"%(str(sorted(pending.intersection(selects))), max_cycles))
+        return None
+    #f run
+    def run(self):
+        self.sim_msg = self.sim_message()
+        self.compare_request     = self.struct_signals("master_timer_compare_request", t_timer_compare_request)
+        self.compare_response    = self.struct_signals("master_timer_compare_response", t_timer_compare_response)
+        self.compare_timer_value = self.struct_signals("master_compare_timer_value", t_timer_value)
+        self.compares = {}
+        self.bfm_wait(100)
+        self.configure_master( adder=self.master_adder, bonus=self.master_bonus )
+        self.model_wait(40)
+        self.drive_master_control(reset_counter=0)
+        self.model_wait(40)
+        self.drive_master_control(enable_counter=1)
+        self.model_wait(100)
+
+        compare = self.master_model.value+2000
+        self.write_compare(0, compare, self.expected_hit(compare))
+        future = self.master_model.copy().advance(1000, self.master_control)
+        (compare, expected) = (future.value+1, future.value_after(1, self.master_control))
+        if expected<=compare:
+            self.failtest("Model does not step over %d"%compare)
+            pass
+        self.write_compare(1, compare, expected)
+        self.wait_for_hits((0,1), 1200)
+
+        self.write_compare(2, self.sync_value//2, self.sync_value)
+        self.model_wait(10)
+        self.drive_master_control(synchronize=3, synchronize_value=self.sync_value)
+        self.model_wait(1)
+        self.drive_master_control(synchronize=0)
+        self.wait_for_hits((2,), 10)
+
+        compare = self.master_model.value+1001
+        self.write_compare(3, compare, self.expected_hit(compare))
+        self.wait_for_hits((3,), 200)
+        if self.compare_response.sample_fields("hits", "armed")!=(15, 0):
+            self.failtest("Compare response (hits, armed) %s should be (15, 0)"%(str(self.compare_response.sample_fields("hits", "armed"))))
+            pass
+
+        self.compare_request.drive(clear_hits=15)
+        self.model_wait(1)
+        self.compare_request.drive(clear_hits=0)
+        self.model_wait(2)
+        if self.compare_timer_value["irq"].value()!=0:
+            self.failtest("Compare irq not cleared")
+            pass
+        self.check_master_model(self.master_timer_value__value.value())
+        self.passtest("Test completed")
+        pass
+    pass
+
+#c c_clock_timer_test_capture
+class c_clock_timer_test_capture(c_clock_timer_test_base):
+    """
+    Drive the capture event inputs with rising edges in most cycles,
+    popping the capture FIFO every cycle - the documented throughput -
+    and check that every capture is made, with the event masks of the
+    model, and a constant latency of timer value; then drive a burst
+    with no pops, and check the captures kept and lost are the model's
+
+    The master adder has no bonus so that the timer value (in 16ths)
+    at a constant latency differs by a multiple of the adder
+    """
+    master_adder = (6,6)
+    #f run_events
+    def run_events(self, events, pops):
+        """
+        Drive event inputs and pops for a cycle each; return the master
+        timer value of each cycle and the captures popped
+
+        A pop may be seen on the edge after that driven, so a capture
+        seen twice is recorded once (captures differ in timer value)
+        """
+        (values, captures) = ([], [])
+        for (e, pop) in zip(events, pops):
+            self.master_events.drive(e)
+            self.capture_request.drive(pop=pop)
+            (value, fraction) = self.master_timer.sample_fields("value", "fraction")
+            values.append({"value":value, "fraction":fraction})
+            (valid, capture_events, value, fraction) = self.capture_response.sample_fields("valid", "events", "value", "fraction")
+            if pop and valid:
+                capture = (capture_events, value, fraction)
+                if (len(captures)==0) or (captures[-1]!=capture): captures.append(capture)
+                pass
+            self.model_wait(1)
+            pass
+        return (values, captures)
+    #f check_captures
+    def check_captures(self, reason, values, events, pops, captures):
+        """
+        Check captures against the model run with the same values, events and pops
+        """
+        model = c_clock_timer_capture_model()
+        expected = model.run(values, events, pops)
+        overflows = self.capture_response["overflows"].value()
+        print("%s: %d captures (model %d), %d overflows (model %d)"%(reason, len(captures), len(expected), overflows, model.overflows))
+        if overflows!=model.overflows:
+            self.failtest("%s: %d overflows, model %d"%(reason, overflows, model.overflows))
+            pass
+        if [c[0] for c in captures]!=[c[0] for c in expected]:
+            self.failtest("%s: capture events %s, model %s"%(reason, str([c[0] for c in captures]), str([c[0] for c in expected])))
+            return
+        for (capture, model_capture) in zip(captures, expected):
+            latency = (capture[1]*16+capture[2]) - (model_capture[1]*16+model_capture[2])
+            if self.latency is None: self.latency=latency
+            if latency!=self.latency:
+                self.failtest("%s: capture %s latency %d from model %s differs from %d"%(reason, str(capture), latency, str(model_capture), self.latency))
+                return
+            pass
+        adder_16ths = self.master_adder[0]*16+self.master_adder[1]
+        if (self.latency is not None) and (self.latency%adder_16ths)!=0:
+            self.failtest("%s: capture latency %d is not a whole number of ticks"%(reason, self.latency))
+            pass
+        pass
+    #f run
+    def run(self):
+        self.sim_msg = self.sim_message()
+        self.capture_request  = self.struct_signals("master_timer_capture_request", t_timer_capture_request)
+        self.capture_response = self.struct_signals("master_timer_capture_response", t_timer_capture_response)
+        self.master_timer     = self.struct_signals("master_timer_value", t_timer_value)
+        self.latency = None
+        self.bfm_wait(100)
+        self.configure_master( adder=self.master_adder )
+        self.model_wait(40)
+        self.drive_master_control(reset_counter=0)
+        self.model_wait(40)
+        self.drive_master_control(enable_counter=1)
+        self.model_wait(100)
+
+        rng = random.Random(19)
+        events = []
+        for i in range(1000):
+            e = (i&1) | (((i>>1)&1)<<1)
+            if rng.random()<0.1: e = rng.randrange(4)
+            events.append(e)
+            pass
+        events += [0]*20
+        pops = [1]*len(events)
+        (values, captures) = self.run_events(events, pops)
+        self.check_captures("Throughput", values, events, pops, captures)
+
+        events = [(i>>1)&1 for i in range(2*12*2)] + [0]*30
+        pops   = [0]*(2*12*2+10) + [1]*20
+        (values, captures) = self.run_events(events, pops)
+        self.check_captures("Burst", values, events, pops, captures)
+
+        self.capture_request.drive(clear_overflows=1)
+        self.model_wait(1)
+        self.capture_request.drive(clear_overflows=0)
+        self.model_wait(1)
+        if self.capture_response["overflows"].value()!=0:
+            self.failtest("Capture overflows not cleared")
+            pass
+        print("Capture latency %d 16ths of a timer unit"%(self.latency))
+        self.passtest("Test completed")
+        pass
+    pass
+
+#c c_clock_timer_test_multi_slave_base
+class c_clock_timer_test_multi_slave_base(c_clock_timer_test_base):
+    """
+    Run a master timer with a slave timer locked to it in each of a
+    number of clock domains, using the tb_clock_timer_multi testbench
+    (one clock_timer_async_master shared by the clock_timer_async_slave
+    of each domain)
+
+    The slaves are given by slave_configs; by default there is one for
+    each of slave_periods, with its own adder, for its clock period
+    offset by slave_ppm (alternately fast and slow), and its own lock
+    window for the clock frequency (see clock_timer_async_slave.cdl),
+    with lock_window_auto, and a max_diff of its clock period in timer
+    units (at least 2).
+
+    The test ends once every slave has been locked, and within its
+    max_diff of the master, for lock_windows consecutive lock windows of
+    its own, or has not within its max_lock_cycles master clock cycles
+    (and failed). The error of each slave after lock is analyzed with
+    c_lock_quality, and must be within its max_diff, with MTIE within
+    its max_mtie. The cycles to lock, and the worst difference after
+    lock, are reported and recorded (with record_results) for each slave.
+
+    The slave clock periods must match those given to the hardware.
+    """
+    slave_periods = (16,)
+    slave_ppm = 100
+    master_sync = ((10**9)*0xfeedbeef) - 1000
+    lock_window_auto = True
+    lock_windows = 32
+    max_lock_cycles = 480*1000
+    #f lock_window_lsb_for
+    def lock_window_lsb_for(self, period):
+        """
+        Lock window lsb for a slave clock period (of master period 10 for 1ns)
+        """
+        mhz = 10*1000.0/period
+        if mhz>=250: return 4
+        if mhz>=64:  return 6
+        if mhz>=32:  return 8
+        return 10
+    #f slave_configs
+    def slave_configs(self):
+        """
+        Return a list of the configuration of each slave - a dictionary of
+        its name, clock period, adder and bonus, lock window lsb and auto,
+        max_diff, max_mtie and max_lock_cycles
+        """
+        configs = []
+        for (i, period) in enumerate(self.slave_periods):
+            ns = (period/10.0) * (1 + (1-2*(i&1))*self.slave_ppm*1E-6)
+            (adder, bonus) = clock_timer_adder_bonus(ns)
+            max_diff = max(2, int(math.ceil(period/10.0)))
+            configs.append({"name":"slave_%d"%i, "period":period, "adder":adder, "bonus":bonus,
+                            "lock_window_lsb":self.lock_window_lsb_for(period), "lock_window_auto":self.lock_window_auto,
+                            "max_diff":max_diff, "max_mtie":2*max_diff, "max_lock_cycles":self.max_lock_cycles})
+            pass
+        return configs
+    #f configure_slaves
+    def configure_slaves(self):
+        """
+        Configure each slave timer control, and lock the slaves to the master
+
+        The master synchronize request and value are shared by all the
+        slaves, so the master lock window is the widest of the slaves'
+        """
+        self.slaves = []
+        for (i, config) in enumerate(self.slave_configs()):
+            slave = dict(config,
+                         control=self.struct_signals("slave_timer_control_%d"%i, t_timer_control),
+                         value=self.struct_signals("slave_timer_value_%d"%i, t_timer_value))
+            (adder, bonus) = (slave["adder"], slave["bonus"])
+            slave["control"].drive(bonus_subfraction_sub=bonus[1],
+                                   bonus_subfraction_add=bonus[0],
+                                   fractional_adder=adder[1],
+                                   integer_adder=adder[0],
+                                   lock_window_lsb={4:0,6:1,8:2,10:3}[slave["lock_window_lsb"]],
+                                   lock_window_auto=int(slave["lock_window_auto"]),
+                                   reset_counter=1,
+                                   enable_counter=0)
+            self.slaves.append(slave)
+            pass
+        widest = max([slave["lock_window_lsb"] for slave in self.slaves])
+        self.drive_master_control(lock_to_master=1, lock_window_lsb={4:0,6:1,8:2,10:3}[widest])
+        pass
+    #f wait_for_locks
+    def wait_for_locks(self):
+        """
+        Monitor the slaves until each has stayed locked for lock_windows
+        of its lock windows, or has run for its max_lock_cycles
+
+        Each slave has 'cycles_to_lock' and 'worst_error' set (None if
+        it did not lock), where cycles are master clock cycles from the
+        start of monitoring, 'cycles_monitored' (until it locked or ran
+        out of cycles), and 'lock_quality' for its errors since lock;
+        the master-slave differences are sampled eight times per
+        narrowest lock window. Returns True if all the slaves locked.
+        """
+        master_period = clock_timer_period(self.master_adder, self.master_bonus)
+        for slave in self.slaves:
+            slave["window_cycles"] = int((4<<slave["lock_window_lsb"]) / master_period)
+            (slave["locked_since"], slave["cycles_to_lock"], slave["worst_error"]) = (None, None, None)
+            slave["lock_quality"] = None
+            pass
+        interval = max(1, min([slave["window_cycles"] for slave in self.slaves])//8)
+        tau0 = interval*master_period
+        master_value = self.struct_signals("master_timer_value", t_timer_value)["value"]
+        cycles = 0
+        while True:
+            master = master_value.value()
+            waiting = 0
+            for slave in self.slaves:
+                if slave["cycles_to_lock"] is not None: continue
+                slave["cycles_monitored"] = cycles
+                if cycles>=slave["max_lock_cycles"]: continue
+                waiting += 1
+                (value, locked) = slave["value"].sample_fields("value", "locked")
+                error = master-value
+                diff = abs(error)
+                if locked and (diff<=slave["max_diff"]):
+                    if slave["locked_since"] is None:
+                        (slave["locked_since"], slave["worst_error"]) = (cycles, 0)
+                        slave["lock_quality"] = c_lock_quality(tau0=tau0, max_log2=12, hist_limit=4*slave["max_diff"])
+                        pass
+                    slave["worst_error"] = max(slave["worst_error"], diff)
+                    slave["lock_quality"].add(error)
+                    if cycles-slave["locked_since"]>=self.lock_windows*slave["window_cycles"]:
+                        slave["cycles_to_lock"] = slave["locked_since"]
+                        pass
+                    pass
+                else:
+                    slave["locked_since"] = None
+                    pass
+                pass
+            if waiting==0: break
+            self.bfm_wait(interval)
+            cycles += interval
+            pass
+        for slave in self.slaves:
+            if slave["cycles_to_lock"] is None: slave["worst_error"]=None
+            pass
+        return len([slave for slave in self.slaves if slave["cycles_to_lock"] is None])==0
+    #f check_slaves
+    def check_slaves(self):
+        """
+        Check that every slave locked, and its lock quality after lock
+        """
+        for slave in self.slaves:
+            if slave["cycles_to_lock"] is None:
+                self.failtest("%s did not stay locked within %d of master for %d lock windows in %d cycles"%
+                              (slave["name"], slave["max_diff"], self.lock_windows, slave["max_lock_cycles"]))
+                continue
+            for f in lock_quality_failures(slave["lock_quality"], slave["max_diff"], slave["max_mtie"]):
+                self.failtest("%s: %s"%(slave["name"], f))
+                pass
+            pass
+        pass
+    #f report
+    def report(self):
+        """
+        Print, and record, the lock time and worst difference after lock of each slave
+        """
+        print("%d slaves:        name  period  lsb  auto  cycles to lock  worst difference"%len(self.slaves))
+        for slave in self.slaves:
+            record_results({"test":self.__class__.__name__, "slave":slave["name"], "slave_period":slave["period"],
+                            "lock_window_lsb":slave["lock_window_lsb"], "lock_window_auto":slave["lock_window_auto"],
+                            "cycles_to_lock":slave["cycles_to_lock"], "worst_lock_error":slave["worst_error"]})
+            if slave["cycles_to_lock"] is None:
+                print("%20s %7d %4d %5d  %14s  %16s"%(slave["name"], slave["period"], slave["lock_window_lsb"], slave["lock_window_auto"],
+                                                     "not locked", "-"))
+                continue
+            print("%20s %7d %4d %5d  %14d  %16d"%(slave["name"], slave["period"], slave["lock_window_lsb"], slave["lock_window_auto"],
+                                                 slave["cycles_to_lock"], slave["worst_error"]))
+            pass
+        locked = [slave for slave in self.slaves if slave["cycles_to_lock"] is not None]
+        if len(locked)>0:
+            print("%d slaves: last lock after %d cycles, worst difference after lock %d"%
+                  (len(self.slaves), max([s["cycles_to_lock"] for s in locked]), max([s["worst_error"] for s in locked])))
+            pass
+        pass
+    #f run
+    def run(self):
+        self.sim_msg = self.sim_message()
+        prefix = c_th_waits(self)
+        prefix.wait(100)
+
+        self.configure_master( adder=self.master_adder, bonus=self.master_bonus )
+        self.configure_slaves()
+        prefix.wait(200)
+        for slave in self.slaves: slave["control"].drive(reset_counter=0)
+        self.drive_master_control(reset_counter=0)
+        prefix.wait(200) # For a slow clock period
+        for slave in self.slaves: slave["control"].drive(enable_counter=1)
+        self.drive_master_control(enable_counter=1)
+        if self.master_sync is not None:
+            prefix.wait(500)
+            self.drive_master_control(synchronize=3, synchronize_value=self.master_sync)
+            prefix.wait(1)
+            self.drive_master_control(synchronize=0)
+            pass
+        self.prefix_cycles = prefix.cycles
+        self.wait_for_locks()
+        self.report()
+        self.check_slaves()
+        self.passtest("Test completed")
+        pass
+    pass
+
+#c c_clock_timer_test_shared_master_base
+class c_clock_timer_test_shared_master_base(c_clock_timer_test_multi_slave_base):
+    """
+    Run master_slave tests that share a master - its adder, bonus and
+    synchronize - as the slaves of one simulation of the
+    tb_clock_timer_multi testbench, so that the master, and the
+    configuration, reset and enable sequence, are simulated once
+    rather than once per test
+
+    Each of the branches (master_slave test classes, each locking its
+    slave to the master) is a slave with the configuration of that
+    test, and is checked as that test checks its lock, but not its
+    sec/nsec outputs; this is extra coverage of the shared master, and
+    the master_slave tests are still run on their own. The master cycles
+    simulated are reported and recorded with those of running the
+    branches as separate tests, each until its own lock.
+
+    The branches are not run from a snapshot of a shared prefix: the
+    simulation cannot be checkpointed, so the whole of each test is
+    simulated once, with the branches' slaves side by side.
+
+    A branch with lock_window_auto is compared with any branch with the
+    same slave clock, adder and lock window lsb but a fixed lock window:
+    it must lock sooner (or the fixed must not lock), and its worst
+    difference after lock must be within half a slave clock period (in
+    timer units, at least 1) of that of the fixed lock window.
+
+    The master lock window is the widest of those of the branches (see
+    configure_slaves), so a branch with a narrower lock window may take
+    up to one master window longer to synchronize than on its own.
+
+    The slave_periods must be those of the branches.
+    """
+    branches = ()
+    shared_attributes = ("master_adder", "master_bonus", "master_sync", "lock_windows")
+    #f slave_configs
+    def slave_configs(self):
+        """
+        Return a list of the configuration of the slave of each branch
+        """
+        configs = []
+        for b in self.branches:
+            max_mtie = b.max_mtie
+            if max_mtie is None: max_mtie = 2*b.max_diff
+            configs.append({"name":b.__name__.replace("c_clock_timer_test_", ""), "period":b.slave_period,
+                            "adder":b.slave_adder, "bonus":b.slave_bonus,
+                            "lock_window_lsb":b.lock_window_lsb, "lock_window_auto":b.lock_window_auto,
+                            "max_diff":b.max_diff, "max_mtie":max_mtie, "max_lock_cycles":b.max_lock_cycles})
+            pass
+        return configs
+    #f check_auto_lock_window
+    def check_auto_lock_window(self):
+        """
+        Check each slave with an auto lock window against those with the same configuration and a fixed lock window
+        """
+        same = ("period", "adder", "bonus", "lock_window_lsb")
+        for auto in self.slaves:
+            if not auto["lock_window_auto"]: continue
+            for fixed in self.slaves:
+                if fixed["lock_window_auto"]: continue
+                if [auto[k] for k in same]!=[fixed[k] for k in same]: continue
+                print("%s locked after %s cycles, %s after %s cycles"%(auto["name"], str(auto["cycles_to_lock"]), fixed["name"], str(fixed["cycles_to_lock"])))
+                if auto["cycles_to_lock"] is None: continue
+                if fixed["cycles_to_lock"] is None: continue
+                if auto["cycles_to_lock"]>=fixed["cycles_to_lock"]:
+                    self.failtest("%s locked after %d cycles, not sooner than %s after %d cycles"%
+                                  (auto["name"], auto["cycles_to_lock"], fixed["name"], fixed["cycles_to_lock"]))
+                    pass
+                tolerance = max(1, auto["period"]//20)
+                if abs(auto["worst_error"]-fixed["worst_error"])>tolerance:
+                    self.failtest("%s worst difference after lock %d does not match %d of %s (within %d)"%
+                                  (auto["name"], auto["worst_error"], fixed["worst_error"], fixed["name"], tolerance))
+                    pass
+                pass
+            pass
+        pass
+    #f report
+    def report(self):
+        """
+        Report the slaves, and the master cycles simulated, and those of the branches as separate tests
+        """
+        c_clock_timer_test_multi_slave_base.report(self)
+        simulated = self.prefix_cycles + max([slave["cycles_monitored"] for slave in self.slaves])
+        separate  = sum([self.prefix_cycles + slave["cycles_monitored"] for slave in self.slaves])
+        print("%d branches: %d master cycles simulated, %d as separate tests (%d saved)"%
+              (len(self.slaves), simulated, separate, separate-simulated))
+        record_results({"test":self.__class__.__name__, "branches":len(self.slaves),
+                        "cycles_simulated":simulated, "cycles_separate":separate, "cycles_saved":separate-simulated})
+        pass
+    #f run
+    def run(self):
+        for a in self.shared_attributes:
+            if len(set([repr(getattr(b, a)) for b in self.branches]))>1:
+                self.failtest("Branches do not share %s"%a)
+                return
+            setattr(self, a, getattr(self.branches[0], a))
+            pass
+        if len([b for b in self.branches if not b.slave_lock])>0:
+            self.failtest("Branches must lock the slave to the master")
+            return
+        c_clock_timer_test_multi_slave_base.run(self)
+        pass
+    #f check_slaves
+    def check_slaves(self):
+        """
+        Check the slaves as the branch tests would, and the auto lock windows against the fixed
+        """
+        c_clock_timer_test_multi_slave_base.check_slaves(self)
+        self.check_auto_lock_window()
+        pass
+    pass
+
+#c c_clock_timer_test_shared_master_2_3
+class c_clock_timer_test_shared_master_2_3(c_clock_timer_test_shared_master_base):
+    branches = (c_clock_timer_test_master_slave_2, c_clock_timer_test_master_slave_3)
+    slave_periods = tuple([b.slave_period for b in branches])
+    pass
+
+#c c_clock_timer_test_shared_master_4
+class c_clock_timer_test_shared_master_4(c_clock_timer_test_shared_master_base):
+    branches = (c_clock_timer_test_master_slave_4, c_clock_timer_test_master_slave_auto_4)
+    slave_periods = tuple([b.slave_period for b in branches])
+    pass
+
+#c c_clock_timer_test_shared_master_5
+class c_clock_timer_test_shared_master_5(c_clock_timer_test_shared_master_base):
+    branches = (c_clock_timer_test_master_slave_5, c_clock_timer_test_master_slave_auto_5)
+    slave_periods = tuple([b.slave_period for b in branches])
+    pass
+
+#c c_clock_timer_test_shared_master_6
+class c_clock_timer_test_shared_master_6(c_clock_timer_test_shared_master_base):
+    branches = (c_clock_timer_test_master_slave_6, c_clock_timer_test_master_slave_7,
+                c_clock_timer_test_master_slave_auto_6, c_clock_timer_test_master_slave_auto_8)
+    slave_periods = tuple([b.slave_period for b in branches])
+    pass
+
+#c c_clock_timer_test_multi_1
+class c_clock_timer_test_multi_1(c_clock_timer_test_multi_slave_base):
+    slave_periods = (16,)
+    pass
+
+#c c_clock_timer_test_multi_2
+class c_clock_timer_test_multi_2(c_clock_timer_test_multi_slave_base):
+    slave_periods = (16, 100)
+    pass
+
+#c c_clock_timer_test_multi_4
+class c_clock_timer_test_multi_4(c_clock_timer_test_multi_slave_base):
+    slave_periods = (16, 40, 100, 250)
+    pass
+
+#c c_clock_timer_test_multi_8
+class c_clock_timer_test_multi_8(c_clock_timer_test_multi_slave_base):
+    slave_periods = (16, 20, 32, 40, 64, 100, 160, 250)
+    pass
+
+#c c_clock_timer_test_multi_12
+class c_clock_timer_test_multi_12(c_clock_timer_test_multi_slave_base):
+    slave_periods = (16, 20, 25, 32, 40, 50, 64, 80, 100, 160, 250, 400)
+    pass
+
+#c c_clock_timer_test_multi_16
+class c_clock_timer_test_multi_16(c_clock_timer_test_multi_slave_base):
+    slave_periods = (12, 16, 20, 25, 32, 40, 50, 64, 80, 100, 128, 160, 200, 250, 320, 400)
     pass
 
 #a Hardware classes
@@ -303,14 +1216,22 @@ class clock_timer_test_hw(HardwareThDut):
     clock_desc = [("clk",(0,5,5)), ("slave_clk",(3,8,8))]
     reset_desc = {"name":"reset_n", "init_value":0, "wait":12}
     module_name = "tb_clock_timer"
-    # module_name = "cwv__tb_clock_timer" - does not save much time
+    # module_name = "cwv__tb_clock_timer" for the Verilated build - see bench_backends
     dut_inputs  = {"master_timer_control" : t_timer_control,
                    "slave_timer_control" : t_timer_control,
+                   "master_timer_compare_request" : t_timer_compare_request,
+                   "master_events" : 8,
+                   "master_timer_capture_request" : t_timer_capture_request,
     }
     dut_outputs = { "master_timer_value":t_timer_value,
                     "master_timer_sec_nsec":t_timer_sec_nsec,
+                    "master_timer_sec_nsec_r4":t_timer_sec_nsec,
+                    "master_timer_sec_nsec_r16":t_timer_sec_nsec,
                     "slave_timer_value":t_timer_value,
                     "slave_timer_sec_nsec":t_timer_sec_nsec,
+                    "master_compare_timer_value":t_timer_value,
+                    "master_timer_compare_response":t_timer_compare_response,
+                    "master_timer_capture_response":t_timer_capture_response,
     }
     th_options = {
                  }
@@ -328,6 +1249,38 @@ class clock_timer_test_hw(HardwareThDut):
         pass
     pass
 
+#c clock_timer_multi_test_hw
+class clock_timer_multi_test_hw(HardwareThDut):
+    """
+    Instantiation of the clock_timer testbench with a master and max_slaves slave clock domains
+
+    The slave_periods give the clock periods of the first slaves; the
+    others are given unused_slave_period so that they cost little to simulate
+    """
+    max_slaves = 16
+    unused_slave_period = 1000*1000
+    clock_desc = [("clk",(0,5,5))] + [("slave_clk_%d"%i,(3,8,8)) for i in range(max_slaves)]
+    reset_desc = {"name":"reset_n", "init_value":0, "wait":12}
+    module_name = "tb_clock_timer_multi"
+    dut_inputs  = dict([("master_timer_control", t_timer_control)] +
+                       [("slave_timer_control_%d"%i, t_timer_control) for i in range(max_slaves)])
+    dut_outputs = dict([("master_timer_value", t_timer_value)] +
+                       [("slave_timer_value_%d"%i, t_timer_value) for i in range(max_slaves)])
+    th_options = {
+                 }
+    loggers = {
+               }
+    #f __init__
+    def __init__(self, slave_periods=(), **kwargs):
+        self.clock_desc = [("clk",(0,5,5))]
+        for i in range(self.max_slaves):
+            period = slave_periods[i] if i<len(slave_periods) else self.unused_slave_period
+            self.clock_desc.append(("slave_clk_%d"%i,(3,period//2,period-period//2)))
+            pass
+        HardwareThDut.__init__(self, **kwargs)
+        pass
+    pass
+
 #a Simulation test classes
 #c clock_timer
 class clock_timer(TestCase):
@@ -336,13 +1289,32 @@ class clock_timer(TestCase):
               "master_sync_0":  (c_clock_timer_test_master_sync_0,   20*1000, {}),
               "master_sync_1":  (c_clock_timer_test_master_sync_1,   20*1000, {}),
               "master_sync_2":  (c_clock_timer_test_master_sync_2,   20*1000, {}),
-              "master_slave_0": (c_clock_timer_test_master_slave_0,  200*1000, {}),
-              "master_slave_1": (c_clock_timer_test_master_slave_1,  5*1000*1000, {}),
-              "master_slave_2": (c_clock_timer_test_master_slave_2,  5*1000*1000, {}),
-              "master_slave_3": (c_clock_timer_test_master_slave_3,  5*1000*1000, {}),
-              "master_slave_4": (c_clock_timer_test_master_slave_4,  1*1000*1000, {}),
-              "master_slave_5": (c_clock_timer_test_master_slave_5,  5*1000*1000, {"slave_period":100}),
-              "master_slave_6": (c_clock_timer_test_master_slave_6, 25*1000*1000, {"slave_period":1000}),
-              "master_slave_7": (c_clock_timer_test_master_slave_7, 25*1000*1000, {"slave_period":1000}),
+              "sec_nsec_window":(c_clock_timer_test_sec_nsec_window, 20*1000, {}),
+              "compare":        (c_clock_timer_test_compare,         30*1000, {}),
+              "capture":        (c_clock_timer_test_capture,         30*1000, {}),
+              "master_slave_0": (c_clock_timer_test_master_slave_0,  200*1000, {"slave_period":c_clock_timer_test_master_slave_0.slave_period}),
+              "master_slave_1": (c_clock_timer_test_master_slave_1,  5*1000*1000, {"slave_period":c_clock_timer_test_master_slave_1.slave_period}),
+              "master_slave_2": (c_clock_timer_test_master_slave_2,  5*1000*1000, {"slave_period":c_clock_timer_test_master_slave_2.slave_period}),
+              "master_slave_3": (c_clock_timer_test_master_slave_3,  5*1000*1000, {"slave_period":c_clock_timer_test_master_slave_3.slave_period}),
+              "master_slave_4": (c_clock_timer_test_master_slave_4,  1*1000*1000, {"slave_period":c_clock_timer_test_master_slave_4.slave_period}),
+              "master_slave_5": (c_clock_timer_test_master_slave_5,  5*1000*1000, {"slave_period":c_clock_timer_test_master_slave_5.slave_period}),
+              "master_slave_6": (c_clock_timer_test_master_slave_6, 25*1000*1000, {"slave_period":c_clock_timer_test_master_slave_6.slave_period}),
+              "master_slave_7": (c_clock_timer_test_master_slave_7, 25*1000*1000, {"slave_period":c_clock_timer_test_master_slave_7.slave_period}),
+    }
+    pass
+
+#c clock_timer_multi
+class clock_timer_multi(TestCase):
+    hw = clock_timer_multi_test_hw
+    _tests = {"multi_1": (c_clock_timer_test_multi_1, 5*1000*1000, {"slave_periods":c_clock_timer_test_multi_1.slave_periods}),
+              "multi_2": (c_clock_timer_test_multi_2, 5*1000*1000, {"slave_periods":c_clock_timer_test_multi_2.slave_periods}),
+              "multi_4": (c_clock_timer_test_multi_4, 5*1000*1000, {"slave_periods":c_clock_timer_test_multi_4.slave_periods}),
+              "multi_8": (c_clock_timer_test_multi_8, 5*1000*1000, {"slave_periods":c_clock_timer_test_multi_8.slave_periods}),
+              "multi_12": (c_clock_timer_test_multi_12, 5*1000*1000, {"slave_periods":c_clock_timer_test_multi_12.slave_periods}),
+              "multi_16": (c_clock_timer_test_multi_16, 5*1000*1000, {"slave_periods":c_clock_timer_test_multi_16.slave_periods}),
+              "shared_master_2_3": (c_clock_timer_test_shared_master_2_3,  5*1000*1000, {"slave_periods":c_clock_timer_test_shared_master_2_3.slave_periods}),
+              "shared_master_4":   (c_clock_timer_test_shared_master_4,    1*1000*1000, {"slave_periods":c_clock_timer_test_shared_master_4.slave_periods}),
+              "shared_master_5":   (c_clock_timer_test_shared_master_5,    5*1000*1000, {"slave_periods":c_clock_timer_test_shared_master_5.slave_periods}),
+              "shared_master_6":   (c_clock_timer_test_shared_master_6,   25*1000*1000, {"slave_periods":c_clock_timer_test_shared_master_6.slave_periods}),
     }
     pass
@@ -0,0 +1,671 @@
+#a Copyright
+#
+#  This file 'test_clock_timer_models.py' copyright Gavin J Stark 2017-20
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Imports
+import math
+import os
+import random
+import tempfile
+import unittest
+import numpy as np
+from regress.clocking.clock_timer import find_closest_ratio, find_closest_ratio_by_mediants
+from regress.clocking.clock_timer import clock_timer_adder_bonus, clock_timer_period
+from regress.clocking.clock_timer_index import c_clock_timer_period_index
+from regress.clocking.clock_timer_batch import clock_timer_adder_bonus_batch, clock_timer_period_batch
+from regress.clocking.clock_timer_batch import clock_timer_as_sec_nsec_batch, timer_sec_nsec_of_values
+from regress.clocking.clock_timer_model import c_clock_timer_model, c_clock_timer_as_sec_nsec_model
+from regress.clocking.clock_timer_model import c_clock_timer_compare_model, c_clock_timer_capture_model
+from regress.clocking.clock_timer_async_model import c_clock_timer_async_model, lock_window_sweep
+from regress.clocking.lock_quality import c_lock_quality
+
+#a Useful functions
+#f dda_space_fractions
+def dda_space_fractions():
+    """
+    All the distinct bonus fractions (add+1)/(add+sub+2) of the 8-bit DDA, sorted
+    """
+    fractions = set()
+    for dda_add in range(256):
+        for dda_sub in range(256):
+            fractions.add((dda_add+1.0)/(dda_add+dda_sub+2))
+            pass
+        pass
+    return sorted(fractions)
+
+#a Test classes
+#c clock_timer_ratio
+class clock_timer_ratio(unittest.TestCase):
+    """
+    Check the continued fraction find_closest_ratio against the mediant walk
+    """
+    #f test_dda_space
+    def test_dda_space(self):
+        """
+        Every fraction the 8-bit DDA can produce, the midpoints between them, and 0
+        """
+        fractions = dda_space_fractions()
+        inputs  = [0.0, 1E-16, 1.0-1E-16]
+        inputs += fractions
+        inputs += [(f0+f1)/2 for (f0,f1) in zip(fractions, fractions[1:])]
+        for f in inputs:
+            self.assertEqual(find_closest_ratio_by_mediants(f,256), find_closest_ratio(f,256), "Fraction %r"%f)
+            pass
+        pass
+    #f test_other_max
+    def test_other_max(self):
+        for max in (2, 3, 16, 17, 100):
+            for i in range(4096):
+                f = i/4096.0
+                self.assertEqual(find_closest_ratio_by_mediants(f,max), find_closest_ratio(f,max), "Fraction %r max %d"%(f,max))
+                pass
+            pass
+        pass
+    #f test_adder_bonus
+    def test_adder_bonus(self):
+        self.assertEqual(clock_timer_adder_bonus(1.0),  ((1,0), (0,0)))
+        self.assertEqual(clock_timer_adder_bonus(1.25), ((1,4), (0,0)))
+        self.assertEqual(clock_timer_adder_bonus(1000.0/600), ((1,10), (1,0)))
+        self.assertEqual(clock_timer_adder_bonus(6.4),  ((6,6), (1,2)))
+        pass
+    pass
+
+#c clock_timer_batch
+class clock_timer_batch(unittest.TestCase):
+    """
+    Check the NumPy batch functions match the scalar functions bit for bit
+    """
+    #f test_adder_bonus_batch
+    def test_adder_bonus_batch(self):
+        rng = random.Random(1)
+        periods  = [1.0, 1.6, 1.6002, 1.5998, 1.599, 10.0, 100.1, 100.0, 1000.0/600, 6.4]
+        periods += [rng.uniform(0.5, 256.0) for i in range(5000)]
+        periods += [i/16.0 + j/4096.0 for i in range(16, 4096, 97) for j in range(0, 4096, 129)]
+        results = clock_timer_adder_bonus_batch(periods)
+        for (ns, r) in zip(periods, results):
+            (adder, bonus) = clock_timer_adder_bonus(ns)
+            period = clock_timer_period(adder, bonus)
+            self.assertEqual((adder, bonus), ((r["integer_adder"], r["fractional_adder"]), (r["bonus_add"], r["bonus_sub"])), "Period %r"%ns)
+            self.assertEqual(period, r["achieved_period"], "Period %r"%ns)
+            self.assertEqual((period-ns)/ns*1E6, r["ppm_error"], "Period %r"%ns)
+            pass
+        pass
+    #f test_period_batch
+    def test_period_batch(self):
+        rng = random.Random(2)
+        adders  = [(rng.randrange(256), rng.randrange(16))  for i in range(2000)]
+        bonuses = [(rng.randrange(256), rng.randrange(256)) for i in range(2000)]
+        bonuses[0] = (0,0)
+        results = clock_timer_period_batch(adders, bonuses)
+        for (adder, bonus, r) in zip(adders, bonuses, results):
+            self.assertEqual(clock_timer_period(adder, bonus), r["achieved_period"])
+            pass
+        self.assertTrue(np.isnan(results["ppm_error"]).all())
+        pass
+    pass
+
+#c clock_timer_index
+class clock_timer_index(unittest.TestCase):
+    """
+    Check the period index against a search of every adder/bonus configuration
+    """
+    #f all_periods_near
+    def all_periods_near(self, ns, adder_range=1):
+        adder = int(ns*16)
+        periods = set()
+        for a in range(adder-adder_range, adder+adder_range+1):
+            for dda_add in range(256):
+                for dda_sub in range(256):
+                    periods.add(clock_timer_period((a//16, a%16), (dda_add, dda_sub)))
+                    pass
+                pass
+            pass
+        return periods
+    #f test_cache
+    def test_cache(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, "index.pickle")
+            index = c_clock_timer_period_index.load(filename)
+            self.assertTrue(os.path.isfile(filename))
+            self.assertEqual(index.fractions, c_clock_timer_period_index.load(filename).fractions)
+            pass
+        pass
+    #f test_queries
+    def test_queries(self):
+        index = c_clock_timer_period_index()
+        rng = random.Random(3)
+        for ns in [1.6, 1000.0/600, 6.4]+[rng.uniform(0.5, 250.0) for i in range(4)]:
+            periods = self.all_periods_near(ns)
+            best = min(periods, key=lambda p:abs(p-ns))
+            (period, adder, bonus) = index.nearest(ns)
+            self.assertEqual(abs(period-ns), abs(best-ns), "Nearest to %r"%ns)
+            self.assertEqual(period, clock_timer_period(adder, bonus))
+            within = index.within_ppm(ns, 20)
+            expected = sorted([p for p in periods if ns*(1-20E-6)<=p<=ns*(1+20E-6)])
+            self.assertEqual(expected, [p for (p,adder,bonus) in within], "Within 20ppm of %r"%ns)
+            pass
+        pass
+    pass
+
+#c clock_timer_model
+class clock_timer_model(unittest.TestCase):
+    """
+    Check the fast-forward of the clock_timer model against stepping it
+    """
+    #f random_control
+    def random_control(self, rng):
+        control = {"reset_counter":int(rng.random()<0.05),
+                   "enable_counter":int(rng.random()<0.9),
+                   "advance":int(rng.random()<0.1),
+                   "retard":int(rng.random()<0.1),
+                   "synchronize":rng.choice((0,0,0,0,1,2,3)),
+                   "synchronize_value":rng.choice((rng.randrange(1<<64), 0xffffffff-rng.randrange(300))),
+                   "integer_adder":rng.choice((0,1,6,255,rng.randrange(256))),
+                   "fractional_adder":rng.choice((0,15,rng.randrange(16))),
+                   "bonus_subfraction_add":rng.choice((0,255,rng.randrange(256))),
+                   "bonus_subfraction_sub":rng.choice((0,255,rng.randrange(256))),
+        }
+        return control
+    #f assert_same_state
+    def assert_same_state(self, model, stepped, reason):
+        self.assertEqual(stepped.__dict__, model.__dict__, reason)
+        pass
+    #f test_advance
+    def test_advance(self):
+        rng = random.Random(4)
+        model   = c_clock_timer_model()
+        stepped = c_clock_timer_model()
+        for i in range(400):
+            control = self.random_control(rng)
+            n = rng.choice((0,1,2,3,rng.randrange(1000)))
+            model.advance(n, control)
+            for j in range(n):
+                stepped.step(control)
+                pass
+            self.assert_same_state(model, stepped, "Control %r for %d cycles"%(control,n))
+            pass
+        pass
+    #f test_long_advance
+    def test_long_advance(self):
+        (adder, bonus) = clock_timer_adder_bonus(6.4)
+        control = {"enable_counter":1, "integer_adder":adder[0], "fractional_adder":adder[1],
+                   "bonus_subfraction_add":bonus[0], "bonus_subfraction_sub":bonus[1]}
+        model = c_clock_timer_model().step(control)
+        hour_of_cycles = 3600*1000*1000*1000*10//64
+        start = model.value_16ths
+        model.advance(hour_of_cycles, control)
+        self.assertEqual(model.value_16ths-start, 3600*1000*1000*1000*16)
+        self.assertEqual(model.cycles_until(model.value+64, control), 10)
+        pass
+    #f test_master_tests
+    def test_master_tests(self):
+        """
+        The values expected by the master tests of test_clock_timer
+        """
+        control = {"integer_adder":1, "reset_counter":1}
+        model = c_clock_timer_model().advance(40, control)
+        control["reset_counter"] = 0
+        model.advance(40, control)
+        control["enable_counter"] = 1
+        self.assertEqual(model.value_after(1000, control), 1000)
+        model.advance(100, control)
+        model.advance(1, dict(control, synchronize=2, synchronize_value=0x123456789abcdef0))
+        self.assertEqual(model.advance(1000, control).value, 0x1234567800000000+1101)
+        pass
+    pass
+
+#c clock_timer_compare_model
+class clock_timer_compare_model(unittest.TestCase):
+    """
+    Check the compare bank model fires irq in the cycle the timer value
+    output first reaches a compare value, however the timer gets there
+    """
+    (adder, bonus) = clock_timer_adder_bonus(6.4)
+    control = {"enable_counter":1, "integer_adder":adder[0], "fractional_adder":adder[1],
+               "bonus_subfraction_add":bonus[0], "bonus_subfraction_sub":bonus[1]}
+    #f running_model
+    def running_model(self, cycles=100):
+        model = c_clock_timer_compare_model()
+        for i in range(cycles): model.step(self.control)
+        return model
+    #f write
+    def write(self, model, select, value, **kwargs):
+        model.step(self.control, dict(kwargs, write=1, select=select, value=value))
+        pass
+    #f run_to_irq
+    def run_to_irq(self, model, max_cycles=10000, **kwargs):
+        """
+        Step until irq, checking each value output before it is below
+        every armed compare value; return (cycles, value)
+        """
+        control = dict(self.control, **kwargs)
+        for i in range(max_cycles):
+            if model.irq: return (i, model.value)
+            model.step(control)
+            control = self.control
+            pass
+        self.fail("No irq in %d cycles"%max_cycles)
+        pass
+    #f test_step_over
+    def test_step_over(self):
+        """
+        A compare value that no timer value equals (as the timer steps 6 or 7) fires on the step over it
+        """
+        model = self.running_model()
+        future = model.timer.copy().advance(500, self.control)
+        compare = future.value+1
+        self.write(model, 2, compare)
+        self.assertEqual(model.compare_response(), {"hits":0, "armed":4})
+        expected = model.cycles_until_irq(self.control)
+        last_value = model.value
+        for i in range(expected):
+            self.assertEqual(model.irq, 0)
+            self.assertLess(model.value, compare)
+            model.step(self.control)
+            pass
+        self.assertEqual(model.timer_value()["irq"], 1)
+        self.assertEqual(model.value, future.value_after(1, self.control))
+        self.assertGreater(model.value, compare)
+        self.assertEqual(model.compare_response(), {"hits":4, "armed":0})
+        pass
+    #f test_synchronize
+    def test_synchronize(self):
+        """
+        A synchronize forward over a compare value fires in the cycle the synchronized value is output;
+        one backward over a compare value does not
+        """
+        model = self.running_model()
+        self.write(model, 0, 1<<40)
+        self.write(model, 1, model.value+100000)
+        model.step(self.control)
+        (cycles, value) = self.run_to_irq(model, synchronize=3, synchronize_value=(1<<40)+5)
+        self.assertEqual((cycles, value), (2, (1<<40)+5))
+        self.assertEqual(model.compare_response(), {"hits":3, "armed":0})
+        model.step(self.control, {"clear_hits":3})
+        self.assertEqual(model.irq, 0)
+        start = model.value
+        self.write(model, 3, start+1000)
+        (cycles, value) = self.run_to_irq(model, synchronize=3, synchronize_value=start-5000)
+        self.assertGreater(cycles, 6000/6.4-10)
+        self.assertGreaterEqual(value, start+1000)
+        self.assertEqual(model.compare_response()["hits"], 8)
+        pass
+    #f test_requests
+    def test_requests(self):
+        """
+        Rewrites, disarms, compare values in the past and out of range selects
+        """
+        model = self.running_model()
+        self.write(model, 0, 0)
+        model.step(self.control)
+        self.assertEqual(model.compare_response(), {"hits":1, "armed":0})
+        self.write(model, 0, 1<<50)
+        self.assertEqual(model.compare_response(), {"hits":0, "armed":1})
+        self.write(model, 0, 0, disarm=1)
+        self.write(model, 7, 0)
+        for i in range(10): model.step(self.control)
+        self.assertEqual(model.compare_response(), {"hits":0, "armed":0})
+        self.assertIsNone(model.cycles_until_irq(self.control))
+        self.write(model, 1, model.value+64*3)
+        expected = model.cycles_until_irq(self.control)
+        self.assertEqual(self.run_to_irq(model)[0], expected)
+        pass
+    pass
+
+#c clock_timer_capture_model
+class clock_timer_capture_model(unittest.TestCase):
+    """
+    Check the capture FIFO model captures at the documented latency, and
+    loses nothing at the documented throughput
+    """
+    control = {"enable_counter":1, "integer_adder":6, "fractional_adder":6}
+    #f timer_values
+    def timer_values(self, cycles):
+        timer = c_clock_timer_model()
+        values = []
+        for i in range(cycles):
+            values.append(timer.timer_value())
+            timer.step(self.control)
+            pass
+        return values
+    #f rising_cycles
+    def rising_cycles(self, events):
+        """
+        Return dictionary of cycle to mask of event inputs rising in that cycle
+        """
+        rising = {}
+        last = 0
+        for (i,e) in enumerate(events):
+            if e & ~last: rising[i] = e & ~last
+            last = e
+            pass
+        return rising
+    #f test_throughput
+    def test_throughput(self):
+        """
+        Events rising in every cycle, popped every cycle, are all captured with the same latency
+        """
+        n = 2000
+        rng = random.Random(19)
+        events = []
+        for i in range(n):
+            e = (i&1) | (((i>>1)&1)<<1)
+            if rng.random()<0.1: e = rng.randrange(4)
+            events.append(e)
+            pass
+        events += [0]*10
+        values = self.timer_values(len(events))
+        model = c_clock_timer_capture_model()
+        captures = model.run(values, events, [1]*len(events))
+        rising = self.rising_cycles(events)
+        self.assertEqual(model.overflows, 0)
+        self.assertEqual(len(captures), len(rising))
+        for ((cycle, mask), (e, value, fraction)) in zip(sorted(rising.items()), captures):
+            latency = cycle + model.sync_delay
+            self.assertEqual((e, value, fraction), (mask, values[latency]["value"], values[latency]["fraction"]))
+            pass
+        pass
+    #f test_burst
+    def test_burst(self):
+        """
+        A burst beyond the FIFO depth with no pops loses the excess, counted as overflows
+        """
+        events = [(i>>1)&1 for i in range(2*12*2)] + [0]*4
+        values = self.timer_values(len(events))
+        model = c_clock_timer_capture_model()
+        self.assertEqual(model.run(values, events, [0]*len(events)), [])
+        self.assertEqual(model.overflows, 4)
+        self.assertEqual(len(model.fifo), 8)
+        first = model.capture_response()
+        self.assertEqual(first["valid"], 1)
+        self.assertEqual(first["value"], values[model.sync_delay+2]["value"])
+        model.step(capture_request={"pop":1, "clear_overflows":1})
+        self.assertEqual(model.capture_response()["overflows"], 0)
+        captures = model.run(values, [0]*10, [1]*10)
+        self.assertEqual(len(captures), 7)
+        self.assertEqual(model.capture_response()["valid"], 0)
+        pass
+    #f test_full
+    def test_full(self):
+        """
+        A full FIFO that is popped accepts a capture; simultaneous rising edges share a capture;
+        the overflow count saturates
+        """
+        model = c_clock_timer_capture_model(fifo_depth=2)
+        for e in (1,0,3,0,0,0):
+            model.step(events=e)
+            pass
+        self.assertEqual((len(model.fifo), model.fifo[1][0]), (2, 3))
+        model.step(events=1)
+        model.step(events=0)
+        model.step(events=0, capture_request={"pop":1})
+        self.assertEqual((len(model.fifo), model.overflows), (2, 0))
+        for i in range(600):
+            model.step(events=i&1)
+            pass
+        self.assertEqual(model.overflows, 255)
+        pass
+    pass
+
+#c clock_timer_async_model
+class clock_timer_async_model(unittest.TestCase):
+    """
+    Check the event-driven clock_timer_async model locks as the master_slave tests of test_clock_timer do
+    """
+    # (model arguments, max_time, max_diff) - max_diff as the test in test_clock_timer
+    master_slave = {"master_slave_1": ({"slave_ns":1.6002, "lock_window_lsb":4}, 2E6, 2),
+                    "master_slave_2": ({"slave_ns":1.5998, "lock_window_lsb":4}, 2E6, 2),
+                    "master_slave_4": ({"slave_ns":1.599,  "lock_window_lsb":4, "master_sync":((10**9)*0xfeedbeef) - 1000}, 2E6, 2),
+                    "master_slave_5": ({"slave_ns":10.0,   "lock_window_lsb":6, "master_sync":((10**9)*0xfeedbeee) - 1000,
+                                        "slave_period":100}, 1E7, 10),
+    }
+    #f test_master_slave
+    def test_master_slave(self):
+        for (name, (config, max_time, max_diff)) in self.master_slave.items():
+            model = c_clock_timer_async_model(**config)
+            results = model.run(max_time)
+            self.assertTrue(results["locked"], name)
+            self.assertIsNotNone(results["time_to_lock"], name)
+            last = model.decisions[-1]
+            self.assertLessEqual(abs(last["master"]-last["slave"]), max_diff, name)
+            pass
+        pass
+    #f test_lock_window_auto
+    def test_lock_window_auto(self):
+        """
+        With lock_window_auto the master_slave cases lock, to the same
+        error, and narrow to lock_window_lsb; slow slave clocks whose
+        error after a synchronize is more than a quarter window (which
+        lock slowly, or not at all, with a fixed window) lock sooner,
+        and others no more than a widest-window toggle period later
+        """
+        # A 10MHz slave's error at a decision is within a slave clock period either side of max_diff of the test
+        slow_slaves = {"master_slave_6": ({"slave_ns":100.1, "lock_window_lsb":8, "master_sync":0xdeadbeefcafef00d,
+                                           "slave_period":1000}, 3E7, 200),
+                       "master_slave_99_9": ({"slave_ns":99.9, "lock_window_lsb":8, "master_sync":0xdeadbeefcafef00d,
+                                              "slave_period":1000}, 3E7, 200),
+        }
+        for (name, (config, max_time, max_diff)) in list(self.master_slave.items())+list(slow_slaves.items()):
+            fixed = c_clock_timer_async_model(**config).run(max_time)
+            model = c_clock_timer_async_model(lock_window_auto=True, **config)
+            auto = model.run(max_time)
+            self.assertTrue(auto["locked"], name)
+            self.assertEqual(auto["final_lock_window_lsb"], config["lock_window_lsb"], name)
+            last = model.decisions[-1]
+            self.assertLessEqual(abs(last["master"]-last["slave"]), max_diff, name)
+            self.assertEqual([d["lock_window_lsb"] for d in model.decisions[:1]], [10], name)
+            if fixed["time_to_lock"] is not None:
+                self.assertLessEqual(abs(auto["mean_error"]-fixed["mean_error"]), max_diff, name)
+                pass
+            if name in slow_slaves:
+                self.assertTrue((fixed["time_to_lock"] is None) or (auto["time_to_lock"]<fixed["time_to_lock"]), name)
+                pass
+            else:
+                self.assertLessEqual(auto["time_to_lock"], fixed["time_to_lock"] + 10*(4<<10), name)
+                pass
+            pass
+        pass
+    #f test_not_locking
+    def test_not_locking(self):
+        """
+        Without lock_to_master the slave drifts, and so loses lock
+        """
+        model = c_clock_timer_async_model(slave_ns=1.599, lock_window_lsb=4, lock_to_master=False)
+        results = model.run(2E6)
+        self.assertFalse(results["locked"])
+        self.assertIsNone(results["time_to_lock"])
+        pass
+    #f test_sweep
+    def test_sweep(self):
+        slave_configurations = [{"slave_ns":1.6+i*0.0002} for i in range(-2,3)]
+        results = lock_window_sweep(slave_configurations, lsbs=(4,6), max_time=1E6, settle_decisions=10, processes=2)
+        self.assertEqual(len(results), 10)
+        self.assertEqual(results, lock_window_sweep(slave_configurations, lsbs=(4,6), max_time=1E6, settle_decisions=10, processes=1))
+        self.assertEqual([r["lock_window_lsb"] for r in results[:2]], [4,6])
+        pass
+    pass
+
+#c lock_quality
+class lock_quality(unittest.TestCase):
+    """
+    Check the streaming lock quality analysis against direct calculation
+    """
+    #f direct
+    def direct(self, x, tau0, max_log2):
+        """
+        MTIE, ADEV and TDEV of x calculated directly from their definitions
+        """
+        (mtie, adev, tdev) = ([], [], [])
+        for k in range(max_log2+1):
+            n = 1<<k
+            mtie.append(max([max(x[i:i+n+1])-min(x[i:i+n+1]) for i in range(len(x)-n)]))
+            d = [x[i+2*n]-2*x[i+n]+x[i] for i in range(len(x)-2*n)]
+            adev.append(math.sqrt(sum([v*v for v in d])/(2*(n*tau0)**2*len(d))))
+            t = [sum(d[j:j+n]) for j in range(len(x)-3*n+1)]
+            tdev.append(math.sqrt(sum([v*v for v in t])/(6*n*n*len(t))))
+            pass
+        return (mtie, adev, tdev)
+    #f test_direct
+    def test_direct(self):
+        rng = random.Random(8)
+        x = [0]
+        for i in range(700):
+            x.append(max(-20, min(20, x[-1]+rng.choice((-1,0,0,1)))))
+            pass
+        (mtie, adev, tdev) = self.direct(x, 2.5, 5)
+        for block_samples in (1<<20, 1000, 37, 5):
+            lq = c_lock_quality(tau0=2.5, max_log2=5, hist_limit=10, bin_width=2, block_samples=block_samples)
+            lq.add(x[0])
+            lq.add(x[1:300])
+            for v in x[300:]: lq.add(v)
+            r = lq.results()
+            self.assertEqual(r["samples"], len(x))
+            self.assertEqual(r["mtie"].tolist(), mtie)
+            np.testing.assert_allclose(r["adev"], adev, rtol=1e-9)
+            np.testing.assert_allclose(r["tdev"], tdev, rtol=1e-9)
+            self.assertEqual((r["min"], r["max"], r["max_abs"]), (min(x), max(x), max([abs(v) for v in x])))
+            self.assertAlmostEqual(r["mean"], sum(x)/float(len(x)))
+            self.assertEqual(r["underflow"], len([v for v in x if v<-10]))
+            self.assertEqual(r["overflow"],  len([v for v in x if v>=10]))
+            self.assertEqual(r["histogram"][5], len([v for v in x if 0<=v<2]))
+            self.assertEqual(r["histogram"].sum()+r["underflow"]+r["overflow"], len(x))
+            pass
+        pass
+    #f test_short_and_values
+    def test_short_and_values(self):
+        lq = c_lock_quality(max_log2=4)
+        self.assertEqual(len(lq.pending), 0)
+        master = np.array([(1<<64)-3, (1<<64)-1, 1, 3, 5, 7, 9, 11], dtype=np.uint64)
+        lq.add_values(master, master-np.array([1,-1,1,-1,1,-1,1,-1], dtype=np.int64).astype(np.uint64))
+        r = lq.results()
+        self.assertEqual((r["min"], r["max"], r["mean"]), (-1, 1, 0))
+        self.assertEqual(r["mtie"][:3].tolist(), [2, 2, 2])
+        self.assertTrue(np.isnan(r["mtie"][3]) and np.isnan(r["adev"][2]) and np.isnan(r["tdev"][2]))
+        self.assertEqual(r["adev"][0], math.sqrt(16.0/2))
+        self.assertEqual(len(lq.report()), 3+3)
+        for i in range(3000): lq.add(i&1)
+        self.assertEqual((len(lq.pending), lq.pending_samples), (4096, 3000))
+        self.assertEqual(lq.results()["samples"], 3008)
+        pass
+    pass
+
+#c clock_timer_sec_nsec
+class clock_timer_sec_nsec(unittest.TestCase):
+    """
+    Check the clock_timer_as_sec_nsec batch model against stepping the scalar model
+    """
+    #f timer_run
+    def timer_run(self, controls):
+        """
+        Return (values, controls) for a clock_timer model run with a list of (control, cycles)
+        """
+        timer = c_clock_timer_model()
+        values = []
+        cycle_controls = []
+        for (control, cycles) in controls:
+            for i in range(cycles):
+                values.append(timer.value)
+                cycle_controls.append(control)
+                timer.step(control)
+                pass
+            pass
+        return (values, cycle_controls)
+    #f test_latency
+    def test_latency(self):
+        """
+        The output is valid from 41 cycles after a synchronize, and tracks the timer from 43
+        """
+        control = {"enable_counter":1, "integer_adder":6, "fractional_adder":6, "bonus_subfraction_add":1, "bonus_subfraction_sub":2}
+        (values, controls) = self.timer_run([(dict(control, synchronize=3, synchronize_value=5*(10**9)-100), 1), (control, 100)])
+        model = c_clock_timer_as_sec_nsec_model()
+        outputs = []
+        for (value, control) in zip(values, controls):
+            outputs.append(model.step(control, value).timer_sec_nsec())
+            pass
+        self.assertEqual([o["valid"] for o in outputs].index(1), 41)
+        for i in range(43, len(values)):
+            self.assertEqual((outputs[i]["sec"], outputs[i]["nsec"]), divmod(values[i], 10**9))
+            pass
+        pass
+    #f test_divider_radix
+    def test_divider_radix(self):
+        """
+        The radix 4 and 16 dividers shorten the invalid window to 24 and
+        15 cycles, and give the same sec/nsec as the radix 2 divider
+        """
+        control = {"enable_counter":1, "integer_adder":6, "fractional_adder":6, "bonus_subfraction_add":1, "bonus_subfraction_sub":2}
+        rng = random.Random(16)
+        for synchronize_value in [0, 5*(10**9)-100, (1<<64)-(1<<20)] + [rng.randrange(1<<64) for i in range(20)]:
+            (values, controls) = self.timer_run([(dict(control, synchronize=3, synchronize_value=synchronize_value), 1), (control, 60)])
+            outputs = {}
+            for (divider_bits_per_step, invalid_cycles) in ((1,41), (2,24), (4,15)):
+                model = c_clock_timer_as_sec_nsec_model(divider_bits_per_step=divider_bits_per_step)
+                self.assertEqual(model.invalid_cycles(), invalid_cycles)
+                outputs[divider_bits_per_step] = [model.step(control, value).timer_sec_nsec() for (value, control) in zip(values, controls)]
+                self.assertEqual([o["valid"] for o in outputs[divider_bits_per_step]].index(1), invalid_cycles)
+                for i in range(invalid_cycles+2, len(values)):
+                    self.assertEqual((outputs[divider_bits_per_step][i]["sec"], outputs[divider_bits_per_step][i]["nsec"]), divmod(values[i], 10**9))
+                    pass
+                pass
+            self.assertEqual(outputs[1][45:], outputs[2][45:])
+            self.assertEqual(outputs[1][45:], outputs[4][45:])
+            pass
+        pass
+    #f test_batch
+    def test_batch(self):
+        rng = random.Random(5)
+        controls = []
+        for i in range(40):
+            (adder, bonus) = clock_timer_adder_bonus(rng.choice((1.0, 1.6, 6.4, 10.0, rng.uniform(1.0,200.0))))
+            control = {"enable_counter":1, "integer_adder":adder[0], "fractional_adder":adder[1],
+                       "bonus_subfraction_add":bonus[0], "bonus_subfraction_sub":bonus[1]}
+            event = rng.choice(("synchronize", "disable", "reset", "none"))
+            if event=="synchronize":
+                controls.append((dict(control, synchronize=3, synchronize_value=rng.randrange(1<<60)), 1))
+                pass
+            elif event=="disable":
+                controls.append((dict(control, enable_counter=0), rng.randrange(1,5)))
+                pass
+            elif event=="reset":
+                controls.append((dict(control, reset_counter=1), rng.randrange(1,5)))
+                pass
+            controls.append((control, rng.choice((1, 2, 3, 38, 39, 40, 41, 42, 43, rng.randrange(100, 2000)))))
+            pass
+        (values, cycle_controls) = self.timer_run(controls)
+        model = c_clock_timer_as_sec_nsec_model()
+        expected = [model.step(control, value).timer_sec_nsec() for (value, control) in zip(values, cycle_controls)]
+        results = clock_timer_as_sec_nsec_batch(values,
+                                                reset_counter=[c.get("reset_counter",0) for c in cycle_controls],
+                                                enable_counter=[c.get("enable_counter",0) for c in cycle_controls],
+                                                synchronize=[c.get("synchronize",0) for c in cycle_controls])
+        for (i, (e, r)) in enumerate(zip(expected, results)):
+            self.assertEqual((e["valid"], e["sec"], e["nsec"]), (r["valid"], r["sec"], r["nsec"]), "Cycle %d"%i)
+            pass
+        pass
+    #f test_second_boundaries
+    def test_second_boundaries(self):
+        values = np.arange(10**9-5000, 10**9+5000, 7, dtype=np.uint64)
+        values = np.concatenate((values, values+np.uint64(0xfeedbeef*(10**9))))
+        results = clock_timer_as_sec_nsec_batch(values, synchronize=[3]+[0]*(len(values)-1))
+        model = c_clock_timer_as_sec_nsec_model()
+        model.step({"synchronize":3, "enable_counter":1}, int(values[0]))
+        for (i, value) in enumerate(values[1:]):
+            model.step({"enable_counter":1}, int(value))
+            self.assertEqual((model.valid, model.sec, model.nsec), tuple(results[i+1]), "Value %d"%value)
+            pass
+        self.assertEqual(timer_sec_nsec_of_values(values[1000:1400]).tolist(), results[1000:1400].tolist())
+        pass
+    pass
@@ -23,13 +23,16 @@ t_bit_delay_response = { "op_ack":1, "delay_value":9, "sync_value":1}
 
 #a Imports
 # import structs
-import math
 from cdl.sim     import ThExecFile
 from cdl.sim     import HardwareThDut
 from cdl.sim     import TestCase
 #from .clock_timer import clock_timer_adder_bonus, clock_timer_period
 from regress.clocking.clock_timer import clock_timer_adder_bonus, clock_timer_period
 from regress.clocking.clocking    import t_phase_measure_request, t_phase_measure_response, t_eye_track_request, t_eye_track_response
+from regress.clocking.testbench   import c_struct_signals, c_th_waits
+from regress.clocking.trace       import c_trace
+from regress.clocking.phase_measure_model import phase_measure, c_clock_sampler, c_table_sampler
+from regress.clocking.eye_tracking_model  import c_eye_channel, c_eye_stimulus, c_eye_tracking_environment, c_eye_tracking_model
 
 #a Useful functions
 def find_fractions_for(ns):
@@ -57,42 +60,66 @@ class c_clocking_phase_measure_test_base(ThExecFile):
 
 #c c_clocking_phase_measure_test_0
 class c_clocking_phase_measure_test_0(c_clocking_phase_measure_test_base):
-    def wait_for_delay(self):
-        toggle = 0
-        if self.delay in self.stable_values:
-            self.sync_value = self.stable_values[self.delay]
-        else:
-            toggle = 1
-            pass
-        while self.delay_config_cpm__op.value()!=1:
-            self.sync_value = self.sync_value ^ toggle
+    """
+    Measure a table of stable delays, waiting for each delay operation
+    (or the response) with the wait primitives of c_th_waits
+    """
+    # No delay operation or response can appear for delay_program_count+delay_capture_count
+    # (and a few more) cycles after a delay operation is acknowledged
+    delay_settle_cycles = 8+32
+    #f wait_for_delay
+    def wait_for_delay(self, holdoff=0):
+        """
+        Wait for a delay operation (which is acknowledged), or for a valid
+        measure response (return True); an unstable capture toggles the
+        synchronized value every cycle
+        """
+        (stable, value) = self.sampler(self.delay)
+        op    = self.delay_config_cpm__op
+        valid = self.measure_response__valid
+        each_cycle = None
+        if stable:
+            self.sync_value = value
             self.delay_response__sync_value.drive(self.sync_value)
-            if self.measure_response__valid.value():
-                return True
-            self.bfm_wait(1)
             pass
+        else:
+            holdoff = 0
+            def each_cycle():
+                self.sync_value = self.sync_value ^ 1
+                self.delay_response__sync_value.drive(self.sync_value)
+                pass
+            pass
+        self.waits.wait_until(lambda:(op.value()==1) or (valid.value()!=0), holdoff=holdoff, each_cycle=each_cycle)
+        if valid.value(): return True
         self.measure_request__valid.drive(0)
         self.delay_response__op_ack.drive(1)
-        self.bfm_wait(1)
+        self.waits.wait(1)
         self.delay_response__op_ack.drive(0)
-        self.bfm_wait(4)
+        self.waits.wait(4)
         self.delay = self.delay_config_cpm__value.value()
         return False
+    #f wait_for_next_delay
+    def wait_for_next_delay(self):
+        """
+        wait_for_delay after a delay operation was acknowledged (5 cycles ago)
+        """
+        return self.wait_for_delay(holdoff=self.delay_settle_cycles-8)
     #f run
     def run(self):
         self.sim_msg = self.sim_message()
         self.bfm_wait(100)
-        self.stable_values = {0:0,1:0,2:0,
-                              31:1,32:1,33:1,34:1,35:1,
-                              66:0,67:0,68:0,69:0,70:0,
-                              101:1,102:1,103:1,104:1}
+        self.sampler = c_table_sampler({0:0,1:0,2:0,
+                                        31:1,32:1,33:1,34:1,35:1,
+                                        66:0,67:0,68:0,69:0,70:0,
+                                        101:1,102:1,103:1,104:1})
+        self.waits = c_th_waits(self)
         self.delay = 0
         self.sync_value = 0
         self.measure_request__valid.drive(1)
         self.wait_for_delay()
         self.measure_request__valid.drive(0)
         while True:
-            if self.wait_for_delay():
+            if self.wait_for_next_delay():
                 break
             pass
 
@@ -103,131 +130,220 @@ class c_clocking_phase_measure_test_0(c_clocking_phase_measure_test_base):
         self.compare_expected("initial value", 1,  result["initial_value"])
         self.compare_expected("initial delay", 31, result["initial_delay"])
         self.compare_expected("delay",         35, result["delay"])
-        self.bfm_wait(10)
+        self.waits.wait(10)
         self.measure_request__valid.drive(1)
+        if self.waits.wait_for_edge(self.measure_response__ack, timeout=10) is None:
+            self.failtest("Measure request not acknowledged")
+            pass
+        print("Phase measure: %s"%self.waits.report())
         self.bfm_wait_until_test_done(10)
         self.passtest("Completed")
         pass
 
+#c c_clocking_phase_measure_test_search
+class c_clocking_phase_measure_test_search(c_clocking_phase_measure_test_0):
+    """
+    Measure clocks with and without a search step, checking the results
+    and the number of delay program operations against the golden model
+    """
+    clocks = ((60, 20, 2), (37, 5, 1), (90, 70, 3))
+    step_log2s = (0, 3)
+    #f measure
+    def measure(self, step_log2):
+        """
+        Perform a measurement of self.sampler, returning the response and the number of delay program operations
+        """
+        self.delay = 0
+        self.sync_value = 0
+        operations = 1
+        self.measure_request__search_step_log2.drive(step_log2)
+        self.measure_request__valid.drive(1)
+        self.wait_for_delay()
+        self.measure_request__valid.drive(0)
+        while not self.wait_for_next_delay():
+            operations += 1
+            pass
+        result = c_struct_signals(self, "measure_response", t_phase_measure_response).sample()
+        self.waits.wait(10)
+        return (result, operations)
+    #f run
+    def run(self):
+        self.sim_msg = self.sim_message()
+        self.bfm_wait(100)
+        self.waits = c_th_waits(self)
+        for (phase_width, offset, jitter) in self.clocks:
+            self.sampler = c_clock_sampler(phase_width, offset, jitter)
+            for step_log2 in self.step_log2s:
+                expected = phase_measure(self.sampler, step_log2)
+                (result, operations) = self.measure(step_log2)
+                for k in ("abort", "initial_value", "initial_delay", "delay"):
+                    if k in expected: self.compare_expected("%s for phase %d step %d"%(k, phase_width, 1<<step_log2), expected[k], result[k])
+                    pass
+                self.compare_expected("delay program operations", len(expected["delays"]), operations)
+                print("Phase width %d offset %d: step %d: %d delay program operations per measurement"%(phase_width, offset, 1<<step_log2, operations))
+                pass
+            pass
+        print("Phase measure search: %s"%self.waits.report())
+        self.passtest("Completed")
+        pass
+
 #c c_clocking_eye_tracking_test_base
 class c_clocking_eye_tracking_test_base(c_clocking_phase_measure_test_base):
     pass
 #c c_clocking_eye_tracking_test_0
 class c_clocking_eye_tracking_test_0(c_clocking_eye_tracking_test_base):
+    """
+    Track an eye for 50 measurements, reporting the cycles to first lock
+    (the first measurement of an eye at least min_eye_width wide
+    centred within a tap of the data delay)
+
+    The eye width and center of every measurement, and the cycles to
+    first lock, must match those of c_eye_tracking_model run with
+    c_eye_tracking_environment on the same channel and request
+
+    If trace_filename is set the eye track response is traced to it,
+    on change, every cycle (load it with trace_load)
+    """
+    trace_filename = None
     phase_width = 73
     eye_center  = int(phase_width*2.2)
     eye_width = phase_width//2
-    #f update_random_data
-    def update_random_data(self):
-        self.random_data = (self.random_data>>4) | ((self.random_data*0xfedcaf81) & 0xf00000000000)
-        pass
-    #f find_data_quality
-    def find_data_quality(self, delay):
-        phases = (delay - self.eye_center + 4*self.phase_width + self.phase_width//2) // self.phase_width
-        dist = (delay - self.eye_center + self.phase_width) % self.phase_width
-        if dist>self.phase_width//2: # -pw/2 to +pw/2
-            dist -= self.phase_width
-            pass
-        dist = abs(dist) # 0 to +pw/2
-        err = dist - self.eye_width//2
-        if err<=0:
-            quality=1
-            pass
-        else:
-            quality = math.pow(err,-0.3)
-            pass
-        #print delay, self.eye_center, self.phase_width, dist, err, phases, quality
-        return (phases,quality)
-    #f data_of_quality
-    def data_of_quality(self, quality, step=17):
-        (phases, quality) = quality
-        data = self.random_data >> phases
-        if quality>0.99:
-            data = data & 0x1f
-        elif (quality>0.75):
-            if ((data>>step)&7)==7: data = data>>1
-            pass
-        elif (quality>0.5):
-            if ((data>>step)&3)==3: data = data>>1
-            pass
-        else:
-            data = data ^ (data>>step)
-            pass
-        return data
-    #f eye_track_bfam_wait
-    def eye_track_bfm_wait(self, cycles):
-        for i in range(cycles):
-            if self.eye_track_response__eye_data_valid.value():
-                self.eye_track_measure_complete = True
+    min_eye_width = 16
+    early_quality = 0
+    fast_seek = 0
+    measurements = 50
+    max_cycles = 350*1000 # as the simulation
+    #f eye_track_wait
+    def eye_track_wait(self):
+        """
+        Wait for one cycle, first checking for valid eye data (a single cycle pulse)
+        """
+        if self.trace is not None: self.trace.sample(self.waits.cycles)
+        if self.eye_track_response__eye_data_valid.value():
+            self.eye_track_measure_complete = True
+            (width, center) = self.eye_track_response.sample_fields("eye_width", "eye_center")
+            self.eye_data.append((width, center))
+            if ((self.first_lock_cycles is None) and
+                (width>=self.min_eye_width) and (abs(center-self.data_delay)<=1)):
+                self.first_lock_cycles = self.waits.cycles
                 pass
-            self.bfm_wait(1)
             pass
+        self.waits.wait(1)
         pass
     #f feed_data_after_delay
     def feed_data_after_delay(self):
-        while self.delay_config_cet__op.value()==0:
-            self.bfm_wait(1)
+        if not hasattr(self, "delay_config"):
+            self.delay_config = c_struct_signals(self, "delay_config_cet", t_bit_delay_config)
             pass
+        op = self.delay_config["op"]
+        self.waits.wait_until(lambda:op.value()!=0)
+        (op, select, value) = self.delay_config.sample_fields("op", "select", "value")
         delay_value = self.data_delay
-        if self.delay_config_cet__select.value(): delay_value = self.tracking_delay
-        if self.delay_config_cet__op.value()==1:  delay_value = self.delay_config_cet__value.value()
-        elif self.delay_config_cet__op.value()==3: delay_value -= 1
-        elif self.delay_config_cet__op.value()==2: delay_value += 1
-        if self.delay_config_cet__select.value():
+        if select: delay_value = self.tracking_delay
+        if op==1:  delay_value = value
+        elif op==3: delay_value -= 1
+        elif op==2: delay_value += 1
+        if select:
             self.tracking_delay = delay_value
             pass
         else:
             self.data_delay = delay_value
             #print("Set data_delay to ",delay_value)
             pass
-        self.bfm_wait(10)
+        self.waits.wait(10)
         self.delay_response__op_ack.drive(1)
-        self.bfm_wait(1)
+        self.waits.wait(1)
         self.delay_response__op_ack.drive(0)
-        data_quality     = self.find_data_quality(self.data_delay)
-        tracking_quality = self.find_data_quality(self.tracking_delay)
+        (data_p, data_n) = self.stimulus.data_in(self.data_delay, self.tracking_delay, self.random_index, 200)
         for i in range(200):
-            data_p = self.data_of_quality(data_quality,     step=17)
-            data_n = self.data_of_quality(tracking_quality, step=23)
-            self.update_random_data()
-            self.data_p_in.drive(data_p&0xf)
-            self.data_n_in.drive(data_n^0xf)
-            self.eye_track_bfm_wait(1)
+            self.random_index += 1
+            self.data_p_in.drive(data_p[i])
+            self.data_n_in.drive(data_n[i])
+            self.eye_track_wait()
             if self.eye_track_measure_complete:
                 self.eye_track_request__measure.drive(0)
                 return
             pass
         pass
+    #f check_model
+    def check_model(self):
+        """
+        Run the model on the channel and request of the test, and check
+        the eye data and cycles to first lock match it
+        """
+        model = c_eye_tracking_model(self.phase_width, min_eye_width=self.min_eye_width,
+                                     early_quality=self.early_quality, fast_seek=self.fast_seek)
+        environment = c_eye_tracking_environment(self.channel)
+        results = model.run(environment, self.max_cycles, measurements=self.measurements, stop_on_lock=False)
+        self.compare_expected("measurements of model", len(results["eye_data"]), len(self.eye_data))
+        for (i, ((width, center), (_, model_width, model_center))) in enumerate(zip(self.eye_data, results["eye_data"])):
+            self.compare_expected("eye width of measurement %d"%i,  model_width,  width)
+            self.compare_expected("eye center of measurement %d"%i, model_center, center)
+            pass
+        self.compare_expected("cycles to first lock", results["first_lock_cycles"], self.first_lock_cycles)
+        pass
     #f run
     def run(self):
         self.sim_msg = self.sim_message()
         self.bfm_wait(100)
         self.data_delay = 0
         self.tracking_delay = 0
-        self.random_data = 0xf1723622
+        self.channel = c_eye_channel(self.phase_width, self.eye_center, self.eye_width)
+        self.stimulus = c_eye_stimulus(self.channel)
+        self.random_index = 0
         print("Eye %d to %d, center %d"%(self.eye_center-self.eye_width//2, self.eye_center+self.eye_width//2, self.eye_center))
         self.bfm_wait(10)
+        self.eye_track_response = c_struct_signals(self, "eye_track_response", t_eye_track_response)
+        (self.waits, self.first_lock_cycles, self.eye_data) = (c_th_waits(self), None, [])
+        self.trace = None
+        if self.trace_filename is not None:
+            self.trace = c_trace(self, (("eye_track_response", t_eye_track_response),), filename=self.trace_filename, on_change=True)
+            pass
+        self.eye_track_request__early_quality.drive(self.early_quality)
+        self.eye_track_request__fast_seek.drive(self.fast_seek)
         self.eye_track_request__enable.drive(1)
         self.eye_track_request__track_enable.drive(1)
         self.eye_track_request__seek_enable.drive(1)
-        self.eye_track_request__min_eye_width.drive(16)
+        self.eye_track_request__min_eye_width.drive(self.min_eye_width)
         self.eye_track_request__phase_width.drive(self.phase_width)
-        self.bfm_wait(10)
+        self.waits.wait(10)
         self.eye_track_measure_complete = False            
         self.feed_data_after_delay()
-        for i in range(50):
+        for i in range(self.measurements):
             self.eye_track_request__measure.drive(1)
             self.eye_track_measure_complete = False            
             while not self.eye_track_measure_complete:
                 self.feed_data_after_delay()
                 pass
             pass
+        print("Early quality %d fast seek %d: %d cycles to first lock, %d cycles for %d measurements"%
+              (self.early_quality, self.fast_seek, -1 if self.first_lock_cycles is None else self.first_lock_cycles, self.waits.cycles, self.measurements))
+        print("Eye tracking: %s"%self.waits.report())
+        if self.trace is not None:
+            self.trace.close()
+            print("Traced %d eye track responses to %s"%(self.trace.records, self.trace_filename))
+            pass
+        if self.first_lock_cycles is None:
+            self.failtest("Eye tracking did not lock")
+            pass
+        self.check_model()
         self.bfm_wait_until_test_done(10)
         self.eye_track_request__enable.drive(0)
         self.bfm_wait(1)
         self.passtest("Completed")
         pass
 
+#c c_clocking_eye_tracking_test_early_quality
+class c_clocking_eye_tracking_test_early_quality(c_clocking_eye_tracking_test_0):
+    early_quality = 1
+    pass
+
+#c c_clocking_eye_tracking_test_fast
+class c_clocking_eye_tracking_test_fast(c_clocking_eye_tracking_test_0):
+    early_quality = 1
+    fast_seek = 1
+    pass
+
 #a Hardware classes
 #c clocking_test_hw
 class clocking_test_hw(HardwareThDut):
@@ -260,13 +376,16 @@ class clocking_test_hw(HardwareThDut):
 class clocking_phase_measure(TestCase):
     hw = clocking_test_hw
     _tests = {"simple": (c_clocking_phase_measure_test_0, 10*1000, {"verbosity":0}),
+              "search": (c_clocking_phase_measure_test_search, 200*1000, {"verbosity":0}),
               }
     pass
 
 #c clocking_eye_tracking
 class clocking_eye_tracking(TestCase):
     hw = clocking_test_hw
-    _tests = {"simple": (c_clocking_eye_tracking_test_0, 350*1000, {"verbosity":0}),
+    _tests = {"simple":        (c_clocking_eye_tracking_test_0,             350*1000, {"verbosity":0}),
+              "early_quality": (c_clocking_eye_tracking_test_early_quality, 350*1000, {"verbosity":0}),
+              "fast":          (c_clocking_eye_tracking_test_fast,          350*1000, {"verbosity":0}),
               }
     pass
 
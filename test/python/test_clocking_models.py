@@ -0,0 +1,197 @@
+#a Copyright
+#
+#  This file 'test_clocking_models.py' copyright Gavin J Stark 2017-20
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+#a Imports
+import unittest
+from regress.clocking.phase_measure_model import phase_measure, c_clock_sampler, c_table_sampler, max_delay
+from regress.clocking.eye_tracking_model  import c_eye_channel, c_eye_stimulus, c_eye_tracking_environment, c_eye_tracking_model
+from regress.clocking.eye_tracking_model  import eye_tracking_lock, eye_tracking_sweep, lock_statistics
+
+#a Useful functions
+#f phase_measure_one_tap
+def phase_measure_one_tap(sample):
+    """
+    Reference phase measurement, stepping the delay one tap at a time as the original module did
+
+    A first edge or stable value at the maximum delay wraps the next delay round to zero
+    """
+    delay = 0
+    results = []
+    for predicate in (lambda s,v: not s,
+                      lambda s,v: s,
+                      lambda s,v: s and (v!=results[1][1])):
+        while True:
+            (stable, value) = sample(delay)
+            if predicate(stable, value): break
+            if delay==max_delay: return {"abort":1}
+            delay += 1
+            pass
+        results.append((delay, value))
+        delay = (delay+1) & max_delay
+        pass
+    (edge, (initial_delay, initial_value), (inverse_delay, inverse_value)) = results
+    return {"abort":0, "initial_value":initial_value, "initial_delay":initial_delay, "delay":(inverse_delay-initial_delay) & max_delay}
+
+#a Test classes
+#c phase_measure_model
+class phase_measure_model(unittest.TestCase):
+    """
+    Check the phase measure model, with and without a search step, against stepping a tap at a time
+    """
+    #f test_table
+    def test_table(self):
+        sampler = c_table_sampler({0:0,1:0,2:0,
+                                   31:1,32:1,33:1,34:1,35:1,
+                                   66:0,67:0,68:0,69:0,70:0,
+                                   101:1,102:1,103:1,104:1})
+        result = phase_measure(sampler)
+        self.assertEqual(result["delays"], list(range(67)))
+        del result["delays"]
+        self.assertEqual(result, {"abort":0, "initial_value":1, "initial_delay":31, "delay":35})
+        pass
+    #f test_wrap
+    def test_wrap(self):
+        """
+        A first edge, or a first stable value, at the maximum delay wraps
+        the next search round to zero, with or without a search step
+        """
+        stable_values = dict([(d, 1) for d in range(10)] + [(d, 0) for d in range(10, max_delay)])
+        sampler = c_table_sampler(stable_values)
+        expected = {"abort":0, "initial_value":1, "initial_delay":0, "delay":10}
+        self.assertEqual(phase_measure_one_tap(sampler), expected)
+        result = phase_measure(sampler)
+        self.assertEqual(result["delays"][-12:], [max_delay]+list(range(11)))
+        del result["delays"]
+        self.assertEqual(result, expected)
+        for step_log2 in (1, 2, 3):
+            result = phase_measure(sampler, step_log2)
+            self.assertIn(max_delay, result["delays"])
+            del result["delays"]
+            self.assertEqual(result, expected)
+            pass
+        stable_values = dict([(d, 1) for d in range(10)] + [(max_delay, 0)])
+        sampler = c_table_sampler(stable_values)
+        expected = {"abort":0, "initial_value":0, "initial_delay":max_delay, "delay":1}
+        self.assertEqual(phase_measure_one_tap(sampler), expected)
+        for step_log2 in (0, 1, 2, 3):
+            result = phase_measure(sampler, step_log2)
+            del result["delays"]
+            self.assertEqual(result, expected)
+            pass
+        pass
+    #f test_search
+    def test_search(self):
+        """
+        Search steps up to the narrowest stable region give the same results, with fewer delay programs
+        """
+        for phase_width in range(4, 260, 7):
+            for offset in range(0, 2*phase_width, 1+phase_width//3):
+                for jitter in (0, 1, 2, 4):
+                    sampler = c_clock_sampler(phase_width, offset, jitter)
+                    expected = phase_measure_one_tap(sampler)
+                    linear = phase_measure(sampler)
+                    linear_operations = len(linear.pop("delays"))
+                    self.assertEqual(linear, expected)
+                    for step_log2 in range(1, 7):
+                        if (1<<step_log2)>sampler.narrowest_stable(): break
+                        result = phase_measure(sampler, step_log2)
+                        operations = len(result.pop("delays"))
+                        self.assertEqual(result, expected, "phase %d offset %d jitter %d step %d"%(phase_width, offset, jitter, 1<<step_log2))
+                        if linear_operations>4*(1<<step_log2):
+                            self.assertLess(operations, linear_operations)
+                            pass
+                        pass
+                    pass
+                pass
+            pass
+        pass
+    pass
+
+#c eye_tracking_model
+class eye_tracking_model(unittest.TestCase):
+    """
+    Check the eye tracking model: the channel arrays against the scalar
+    channel, fast-forward against stepping every cycle, and lock for the
+    channel of the eye tracking simulation test
+    """
+    phase_width = 73
+    #f channel
+    def channel(self, noise=0.0, seed=c_eye_channel.default_seed):
+        return c_eye_channel(self.phase_width, int(self.phase_width*2.2), self.phase_width//2, noise=noise, seed=seed)
+    #f test_channel
+    def test_channel(self):
+        channel = self.channel()
+        for (data_delay, tracking_delay) in ((91,91), (91,60), (87,120), (20,300)):
+            (data_p, data_n) = channel.data_in_array(data_delay, tracking_delay, 5, 300)
+            for i in range(300):
+                self.assertEqual((data_p[i], data_n[i]), channel.data_in(data_delay, tracking_delay, 5+i))
+                pass
+            pass
+        pass
+    #f test_stimulus
+    def test_stimulus(self):
+        channel = self.channel()
+        stimulus = c_eye_stimulus(channel, chunk_size=256)
+        for (data_delay, tracking_delay, start) in ((91,91,0), (91,60,150), (87,120,1000), (20,300,4000), (91,91,300)):
+            (data_p, data_n) = stimulus.data_in(data_delay, tracking_delay, start, 200)
+            self.assertEqual(len(data_p), 200)
+            for i in range(200):
+                self.assertEqual((data_p[i], data_n[i]), channel.data_in(data_delay, tracking_delay, start+i))
+                pass
+            pass
+        self.assertIs(stimulus.chunk(90,91,3), stimulus.chunk(91,90,3))
+        pass
+    #f test_fast_forward
+    def test_fast_forward(self):
+        for (early_quality, fast_seek, noise) in ((0,0,0.0), (1,0,0.0), (1,1,0.0), (1,1,0.3)):
+            states = []
+            for fast_forward in (False, True):
+                model = c_eye_tracking_model(self.phase_width, early_quality=early_quality, fast_seek=fast_seek)
+                environment = c_eye_tracking_environment(self.channel(noise=noise))
+                results = model.run(environment, 100*1000, measurements=4, stop_on_lock=False, fast_forward=fast_forward)
+                states.append((results, vars(model), environment.random_index))
+                pass
+            self.assertEqual(states[0][0]["measurements"], 4)
+            self.assertEqual(len(states[0][0]["eye_data"]), 4)
+            self.assertEqual(states[0], states[1])
+            pass
+        pass
+    #f test_lock
+    def test_lock(self):
+        for (early_quality, fast_seek) in ((0,0), (1,0), (1,1)):
+            results = eye_tracking_lock({"phase_width":self.phase_width, "eye_center":int(self.phase_width*2.2),
+                                         "eye_width":self.phase_width//2, "min_eye_width":16,
+                                         "early_quality":early_quality, "fast_seek":fast_seek})
+            self.assertTrue(results["locked"])
+            self.assertGreaterEqual(results["eye_width"], 16)
+            self.assertLessEqual(abs(results["eye_center"]-results["data_delay"]), 1)
+            pass
+        pass
+    #f test_statistics
+    def test_statistics(self):
+        profiles = [{"phase_width":self.phase_width, "eye_center":int(self.phase_width*2.2),
+                     "eye_width":eye_width, "seed":c_eye_channel.default_seed+(seed<<24), "max_cycles":40*1000}
+                    for eye_width in (4, self.phase_width//2) for seed in range(3)]
+        results = eye_tracking_sweep(profiles, processes=1)
+        statistics = lock_statistics(results)
+        self.assertEqual(statistics["profiles"], 6)
+        self.assertEqual(statistics["lock_probability"], sum([r["locked"] for r in results])/6.0)
+        self.assertGreaterEqual(statistics["lock_probability"], 0.5)
+        self.assertLessEqual(statistics["min"], statistics["p50"])
+        self.assertLessEqual(statistics["p50"], statistics["max"])
+        self.assertEqual(sum(statistics["histogram"][0]), sum([r["locked"] for r in results]))
+        pass
+    pass
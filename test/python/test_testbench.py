@@ -0,0 +1,188 @@
+#a Copyright
+#
+#  This file 'test_testbench.py' copyright Gavin J Stark 2017-20
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+#a Imports
+import os
+import json
+import tempfile
+import unittest
+import numpy as np
+from regress.clocking.clock_timer import t_timer_value
+from regress.clocking.testbench import c_th_waits, record_results
+from regress.clocking.trace import c_trace, trace_load
+
+#a Test classes
+#c record
+class record(unittest.TestCase):
+    """
+    Check record_results appends to the file given, or CDL_TEST_RESULTS, and otherwise does nothing
+    """
+    #f test_record
+    def test_record(self):
+        directory = tempfile.mkdtemp()
+        cwd = os.getcwd()
+        environ = os.environ.pop("CDL_TEST_RESULTS", None)
+        try:
+            os.chdir(directory)
+            record_results({"test":"none"})
+            self.assertEqual(os.listdir(directory), [])
+            filename = os.path.join(directory, "results.jsonl")
+            record_results({"test":"a", "cycles":1}, filename)
+            os.environ["CDL_TEST_RESULTS"] = filename
+            record_results({"test":"b", "cycles":None})
+            with open(filename) as f: records = [json.loads(l) for l in f]
+            self.assertEqual(records, [{"test":"a", "cycles":1}, {"test":"b", "cycles":None}])
+            os.remove(filename)
+        finally:
+            os.chdir(cwd)
+            os.environ.pop("CDL_TEST_RESULTS", None)
+            if environ is not None: os.environ["CDL_TEST_RESULTS"]=environ
+            os.rmdir(directory)
+            pass
+        pass
+    pass
+
+#c th_waits
+class th_waits(unittest.TestCase):
+    """
+    Check c_th_waits against a harness whose signal is a function of the cycle
+    """
+    #c c_harness
+    class c_harness(object):
+        def __init__(self, fn):
+            (self.cycle, self.fn) = (0, fn)
+            pass
+        def bfm_wait(self, cycles):
+            self.cycle += cycles
+            pass
+        def value(self): return self.fn(self.cycle)
+        pass
+    #f test_wait_until
+    def test_wait_until(self):
+        th = self.c_harness(lambda c:c>=37)
+        waits = c_th_waits(th)
+        self.assertEqual(waits.wait_until(th.value), 37)
+        self.assertEqual((waits.calls, waits.cycles), (37, 37))
+        th = self.c_harness(lambda c:c>=37)
+        waits = c_th_waits(th)
+        self.assertEqual(waits.wait_until(th.value, holdoff=30), 37)
+        self.assertEqual((waits.calls, waits.cycles), (8, 37))
+        self.assertEqual(waits.wait_until(th.value, holdoff=5), 5)
+        th = self.c_harness(lambda c:c>=37)
+        waits = c_th_waits(th)
+        self.assertIsNone(waits.wait_until(th.value, timeout=20, poll=8))
+        self.assertEqual((waits.calls, th.cycle), (3, 20))
+        self.assertEqual(waits.wait_until(th.value, poll=8), 24)
+        self.assertAlmostEqual(waits.callbacks_per_cycle(), 6/44.0)
+        driven = []
+        th = self.c_harness(lambda c:c>=3)
+        waits = c_th_waits(th)
+        self.assertEqual(waits.wait_until(th.value, each_cycle=lambda:driven.append(th.cycle)), 3)
+        self.assertEqual(driven, [0,1,2])
+        pass
+    #f test_wait_for_edge
+    def test_wait_for_edge(self):
+        th = self.c_harness(lambda c:(c%10)>=5) # rising at 5, 15; falling at 10, 20
+        waits = c_th_waits(th)
+        self.assertEqual(waits.wait_for_edge(th), 5)
+        self.assertEqual(waits.wait_for_edge(th, edge="falling"), 5)
+        self.assertEqual(waits.wait_for_edge(th, edge="any"), 5)
+        self.assertIsNone(waits.wait_for_edge(th, timeout=9))
+        self.assertEqual(th.cycle, 24)
+        self.assertEqual(waits.wait_for_edge(th, edge="rising", holdoff=3), 11)
+        self.assertEqual(th.cycle, 35)
+        pass
+    pass
+
+#c trace
+class trace(unittest.TestCase):
+    """
+    Check c_trace against a harness whose signals are functions of the cycle
+    """
+    #c c_signal
+    class c_signal(object):
+        def __init__(self, th, fn): (self.th, self.fn) = (th, fn)
+        def value(self): return self.fn(self.th.cycle)
+        pass
+    #c c_harness
+    class c_harness(object):
+        def __init__(self):
+            self.cycle = 0
+            self.master_timer_value__value    = trace.c_signal(self, lambda c:1000+c)
+            self.master_timer_value__irq      = trace.c_signal(self, lambda c:0)
+            self.master_timer_value__locked   = trace.c_signal(self, lambda c:1)
+            self.master_timer_value__fraction = trace.c_signal(self, lambda c:c&15)
+            self.events = trace.c_signal(self, lambda c:(c//10)&3)
+            pass
+        def bfm_wait(self, cycles):
+            self.cycle += cycles
+            pass
+        pass
+    ports = (("master_timer_value", t_timer_value), ("events", 2))
+    #f test_file
+    def test_file(self):
+        th = self.c_harness()
+        (fd, filename) = tempfile.mkstemp(suffix=".trace")
+        os.close(fd)
+        try:
+            trace = c_trace(th, self.ports, filename=filename, every=3, block_records=7)
+            trace.wait(100)
+            self.assertEqual(trace.records, 33)
+            self.assertEqual(len(trace_load(filename)), 28) # only full blocks are written until a flush
+            trace.close()
+            records = trace_load(filename)
+            self.assertIsInstance(records, np.memmap)
+            self.assertEqual(len(records), 33)
+            self.assertEqual(records["cycle"].tolist(), list(range(3,100,3)))
+            self.assertEqual(records["master_timer_value"]["value"].tolist(), [1000+c for c in records["cycle"]])
+            self.assertEqual(records["master_timer_value"]["fraction"].tolist(), [c&15 for c in records["cycle"]])
+            self.assertEqual(records["events"].tolist(), [(c//10)&3 for c in records["cycle"]])
+            with open(filename, "ab") as f: f.write(b"\0"*5)
+            self.assertEqual(len(trace_load(filename)), 33)
+        finally:
+            os.remove(filename)
+            pass
+        pass
+    #f test_ring_on_change
+    def test_ring_on_change(self):
+        th = self.c_harness()
+        trace = c_trace(th, (("events", 2),), on_change=True, ring_records=5)
+        trace.sample()
+        trace.wait(95)
+        self.assertEqual(trace.records, 10) # cycles 0, 10, ... 90
+        records = trace.trace()
+        self.assertEqual(records["cycle"].tolist(), [50, 60, 70, 80, 90])
+        self.assertEqual(records["events"].tolist(), [1, 2, 3, 0, 1])
+        trace = c_trace(th, (("events", 2),), ring_records=5)
+        trace.wait(3)
+        self.assertEqual(trace.trace()["cycle"].tolist(), [1, 2, 3])
+        pass
+    #f test_phase
+    def test_phase(self):
+        """
+        Samples fall on multiples of 'every' cycles whatever the waits
+        """
+        th = self.c_harness()
+        trace = c_trace(th, (("events", 2),), every=4)
+        for cycles in (1, 2, 6, 3, 7, 1):
+            trace.wait(cycles)
+            pass
+        self.assertEqual(th.cycle, 20)
+        self.assertEqual(trace.trace()["cycle"].tolist(), [4, 8, 12, 16, 20])
+        self.assertEqual(trace.trace()["events"].tolist(), [0, 0, 1, 1, 2])
+        pass
+    pass
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+#a Copyright
+#
+#  This file 'regress_parallel.py' copyright Gavin J Stark 2017-20
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Run the regression suites as one cdl_regress job per test, longest first,
+over a number of parallel jobs
+
+The tests of a suite module are found by parsing it (so the simulation
+need not be imported): each TestCase with a _tests dictionary of
+name:(exec_file, cycles, kwargs) gives one job per name, and a module
+with none gives one job for the whole module. Jobs are started
+longest-first; the estimate for a job is its wall time from a previous
+run (kept in a JSON file) if there is one, and otherwise its cycle
+budget scaled by the seconds-per-cycle of the recorded jobs.
+
+With a cache directory the result (pass or fail, and output) of each
+job is stored under a hash of everything it depends on: the built
+simulation engine (the shared objects in the --pyengine-dir), the
+Python of the --package-dir packages, the suite module source, the
+_tests entry of the job (name, exec file, cycles and arguments), and
+the cdl_regress options. A job whose hash is in the cache is not run,
+and its stored result is reported; --force runs every job (and updates
+the cache).
+
+If CDL_TEST_RESULTS names a results file (as record_results uses), the
+master cycles saved by the shared-master tests of the jobs run are
+totalled from the records that they append to it.
+
+Example:
+  regress_parallel.py --cdl-regress=cdl_regress.py --times=build/regress_times.json \\
+        --jobs=8 --cache-dir=build/regress_cache -- --pyengine-dir=build --package-dir regress:python --suite-dir=python \\
+        test_clock_timer test_clocking
+"""
+
+#a Imports
+import os, sys, re, ast, json, time, hashlib, argparse, subprocess
+import concurrent.futures
+
+#a Classes
+#c c_job
+class c_job(object):
+    """
+    A single cdl_regress run: a test of a TestCase in a suite module, or
+    the whole of a module (if test_case is None)
+    """
+    #f __init__
+    def __init__(self, module, test_case=None, test=None, cycles=None, entry=""):
+        self.module = module
+        self.test_case = test_case
+        self.test = test
+        self.cycles = cycles
+        self.entry = entry
+        self.key = None
+        self.cached = False
+        self.estimate = None
+        self.wall_time = None
+        self.returncode = None
+        self.output = ""
+        pass
+    #f name
+    def name(self):
+        if self.test_case is None: return self.module
+        return "%s.%s.%s"%(self.module, self.test_case, self.test)
+    #f only_tests
+    def only_tests(self):
+        """
+        Regular expression for cdl_regress --only-tests for just this test
+        """
+        return ".*%s.*test_%s$"%(re.escape(self.test_case), re.escape(self.test))
+    #f args
+    def args(self, cdl_regress, regress_args):
+        args = [cdl_regress] + regress_args
+        if self.test_case is not None: args += ["--only-tests", self.only_tests()]
+        return args + [self.module]
+    #f run
+    def run(self, cdl_regress, regress_args):
+        t0 = time.perf_counter()
+        p = subprocess.run(self.args(cdl_regress, regress_args),
+                           stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+        self.wall_time = time.perf_counter()-t0
+        self.returncode = p.returncode
+        self.output = p.stdout
+        return self
+    pass
+
+#a Functions
+#f eval_constant
+def eval_constant(node):
+    """
+    Evaluate a constant expression from the AST (such as 5*1000*1000); None if it is not constant
+    """
+    for n in ast.walk(node):
+        if isinstance(n, (ast.Name, ast.Call, ast.Attribute)): return None
+        pass
+    try:
+        return eval(compile(ast.Expression(node), "<_tests>", "eval"), {"__builtins__":{}})
+    except Exception:
+        return None
+    pass
+
+#f find_jobs
+def find_jobs(suite_dir, module):
+    """
+    Find the jobs of a suite module from the _tests of its classes
+    """
+    with open(os.path.join(suite_dir, module+".py")) as f:
+        tree = ast.parse(f.read(), filename=module)
+        pass
+    jobs = []
+    for c in tree.body:
+        if not isinstance(c, ast.ClassDef): continue
+        for a in c.body:
+            if not isinstance(a, ast.Assign): continue
+            if not any([isinstance(t, ast.Name) and t.id=="_tests" for t in a.targets]): continue
+            if not isinstance(a.value, ast.Dict): continue
+            for (k, v) in zip(a.value.keys, a.value.values):
+                cycles = None
+                if isinstance(v, ast.Tuple) and len(v.elts)>1: cycles=eval_constant(v.elts[1])
+                jobs.append(c_job(module, c.name, eval_constant(k), cycles, entry=ast.dump(k)+ast.dump(v)))
+                pass
+            pass
+        pass
+    if len(jobs)==0: jobs.append(c_job(module))
+    return jobs
+
+#f hash_files
+def hash_files(h, paths, suffixes):
+    """
+    Add the names and contents of the files (with one of the suffixes) of
+    the paths to a hash, searching directories recursively in sorted order
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            for (dirpath, dirnames, filenames) in os.walk(path):
+                dirnames[:] = sorted([d for d in dirnames if d!="__pycache__"])
+                hash_files(h, [os.path.join(dirpath, f) for f in sorted(filenames)], suffixes)
+                pass
+            continue
+        if not path.endswith(suffixes): continue
+        h.update(os.path.basename(path).encode("utf8"))
+        with open(path, "rb") as f: h.update(hashlib.sha256(f.read()).digest())
+        pass
+    pass
+
+#f set_job_keys
+def set_job_keys(jobs, options, suite_dir):
+    """
+    Set the cache key of each job from the simulation engine, the Python
+    packages, its suite module source, its _tests entry, and the options
+    """
+    (pyengine_dirs, package_dirs) = ([], [])
+    for (i, a) in enumerate(options):
+        if a.startswith("--pyengine-dir="): pyengine_dirs.append(a.split("=",1)[1])
+        if a.startswith("--package-dir="):  package_dirs.append(a.split("=",1)[1].split(":",1)[-1])
+        if (a=="--package-dir") and (i+1<len(options)): package_dirs.append(options[i+1].split(":",1)[-1])
+        pass
+    h = hashlib.sha256()
+    h.update(json.dumps([sys.version, options]).encode("utf8"))
+    for d in pyengine_dirs:
+        hash_files(h, [os.path.join(d, f) for f in sorted(os.listdir(d))] if os.path.isdir(d) else [], (".so", ".dylib", ".pyd"))
+        pass
+    hash_files(h, package_dirs, (".py",))
+    common = h.digest()
+    module_hashes = {}
+    for j in jobs:
+        if j.module not in module_hashes:
+            h = hashlib.sha256()
+            hash_files(h, [os.path.join(suite_dir, j.module+".py")], (".py",))
+            module_hashes[j.module] = h.digest()
+            pass
+        h = hashlib.sha256(common+module_hashes[j.module])
+        h.update(json.dumps([j.name(), j.entry]).encode("utf8"))
+        j.key = h.hexdigest()
+        pass
+    pass
+
+#f read_cache
+def read_cache(cache_dir, jobs):
+    """
+    Set the result of each job that is in the cache; return the jobs that are not
+    """
+    uncached = []
+    for j in jobs:
+        filename = os.path.join(cache_dir, j.key+".json")
+        if not os.path.exists(filename):
+            uncached.append(j)
+            continue
+        with open(filename) as f: result = json.load(f)
+        (j.returncode, j.output, j.wall_time, j.cached) = (result["returncode"], result["output"], result["wall_time"], True)
+        pass
+    return uncached
+
+#f write_cache
+def write_cache(cache_dir, jobs):
+    """
+    Store the result of each job that was run
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    for j in jobs:
+        if j.cached: continue
+        filename = os.path.join(cache_dir, j.key+".json")
+        with open(filename+".tmp", "w") as f:
+            json.dump({"name":j.name(), "returncode":j.returncode, "output":j.output, "wall_time":round(j.wall_time, 3)}, f)
+            pass
+        os.replace(filename+".tmp", filename)
+        pass
+    pass
+
+#f estimate_jobs
+def estimate_jobs(jobs, recorded_times):
+    """
+    Set the estimated time of each job, from its recorded time or its cycle budget
+
+    Cycle budgets are converted to seconds using the recorded jobs that
+    have budgets; jobs with neither a recorded time nor a budget are
+    assumed to be short
+    """
+    (seconds, cycles) = (0.0, 0)
+    for j in jobs:
+        if (j.name() in recorded_times) and (j.cycles is not None):
+            seconds += recorded_times[j.name()]
+            cycles += j.cycles
+            pass
+        pass
+    seconds_per_cycle = (seconds/cycles) if cycles>0 else 1E-5
+    for j in jobs:
+        if j.name() in recorded_times:  j.estimate = recorded_times[j.name()]
+        elif j.cycles is not None:      j.estimate = j.cycles*seconds_per_cycle
+        else:                           j.estimate = 0.0
+        pass
+    pass
+
+#f run_jobs
+def run_jobs(jobs, cdl_regress, regress_args, num_jobs, verbose=False):
+    """
+    Run the jobs longest-estimate first over num_jobs processes; return the jobs in completion order
+    """
+    jobs = sorted(jobs, key=lambda j:j.estimate, reverse=True)
+    completed = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=num_jobs) as executor:
+        futures = [executor.submit(j.run, cdl_regress, regress_args) for j in jobs]
+        for f in concurrent.futures.as_completed(futures):
+            j = f.result()
+            completed.append(j)
+            if verbose:
+                print("%-4s %8.1fs %s"%("ok" if j.returncode==0 else "FAIL", j.wall_time, j.name()))
+                sys.stdout.flush()
+                pass
+            pass
+        pass
+    return completed
+
+#f read_results
+def read_results(filename, offset=0):
+    """
+    Return the records of a results file (JSON lines) from a byte offset
+    """
+    if (filename is None) or not os.path.exists(filename): return []
+    with open(filename) as f:
+        f.seek(offset)
+        return [json.loads(l) for l in f if l.strip()!=""]
+    pass
+
+#f report
+def report(jobs, elapsed, results=()):
+    """
+    Report on the jobs (with the output of any that failed), and the
+    cycles saved by any results records; return the number failed
+    """
+    failed = [j for j in jobs if j.returncode!=0]
+    for j in failed:
+        print("="*70)
+        print("FAILED%s: %s"%(" (cached)" if j.cached else "", j.name()))
+        print(j.output)
+        pass
+    print("="*70)
+    for j in sorted(jobs, key=lambda j:j.wall_time, reverse=True):
+        estimate = "" if j.estimate is None else "(estimate %.1fs)"%j.estimate
+        if j.cached: estimate="(cached)"
+        print("%-4s %8.1fs %-18s %s"%("ok" if j.returncode==0 else "FAIL", j.wall_time, estimate, j.name()))
+        pass
+    cached = [j for j in jobs if j.cached]
+    total = sum([j.wall_time for j in jobs if not j.cached])
+    print("Ran %d jobs in %.1fs (%.1fs of jobs), %d failed"%(len(jobs)-len(cached), elapsed, total, len(failed)))
+    if len(cached)>0:
+        print("%d jobs from the cache (%.1fs of jobs when run)"%(len(cached), sum([j.wall_time for j in cached])))
+        pass
+    saved = [r["cycles_saved"] for r in results if "cycles_saved" in r]
+    if len(saved)>0:
+        print("%d shared-master tests saved %d master cycles of separate tests"%(len(saved), sum(saved)))
+        pass
+    return len(failed)
+
+#f read_times
+def read_times(filename):
+    if (filename is None) or not os.path.exists(filename): return {}
+    with open(filename) as f:
+        return json.load(f)
+    pass
+
+#f write_times
+def write_times(filename, recorded_times, jobs):
+    """
+    Record the wall times of the jobs that passed (a failure may have ended early)
+    """
+    if filename is None: return
+    for j in jobs:
+        if (j.returncode==0) and not j.cached: recorded_times[j.name()] = round(j.wall_time, 3)
+        pass
+    with open(filename, "w") as f:
+        json.dump(recorded_times, f, indent=1, sort_keys=True)
+        pass
+    pass
+
+#f main
+def main(argv):
+    parser = argparse.ArgumentParser(description="Run cdl_regress suites one test per job, longest first")
+    parser.add_argument("--cdl-regress", required=True, help="cdl_regress script")
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count(), help="number of parallel jobs")
+    parser.add_argument("--times", default=None, help="JSON file of recorded wall times, read and updated")
+    parser.add_argument("--cache-dir", default=None, help="directory of cached job results, read and updated")
+    parser.add_argument("--force", action="store_true", help="run every job, even if its result is cached")
+    parser.add_argument("--verbose", "-v", action="store_true", help="report each job as it completes")
+    parser.add_argument("regress_args", nargs=argparse.REMAINDER,
+                        help="cdl_regress arguments (including --suite-dir) then the suite modules")
+    args = parser.parse_args(argv)
+    regress_args = [a for a in args.regress_args if a!="--"]
+    (options, modules, suite_dir) = ([], [], ".")
+    i = 0
+    while i<len(regress_args):
+        a = regress_args[i]
+        if a.startswith("--suite-dir="): suite_dir=a.split("=",1)[1]
+        if a.startswith("-"):
+            options.append(a)
+            if ("=" not in a) and (i+1<len(regress_args)):
+                i += 1
+                options.append(regress_args[i])
+                pass
+            pass
+        else:
+            modules.append(a)
+            pass
+        i += 1
+        pass
+    jobs = []
+    for m in modules: jobs += find_jobs(suite_dir, m)
+    recorded_times = read_times(args.times)
+    estimate_jobs(jobs, recorded_times)
+    to_run = jobs
+    if args.cache_dir is not None:
+        set_job_keys(jobs, options, suite_dir)
+        if not args.force: to_run = read_cache(args.cache_dir, jobs)
+        pass
+    results_filename = os.environ.get("CDL_TEST_RESULTS")
+    results_offset = os.path.getsize(results_filename) if (results_filename is not None) and os.path.exists(results_filename) else 0
+    t0 = time.perf_counter()
+    completed = run_jobs(to_run, args.cdl_regress, options, max(1, args.jobs), args.verbose)
+    elapsed = time.perf_counter()-t0
+    write_times(args.times, recorded_times, completed)
+    if args.cache_dir is not None: write_cache(args.cache_dir, completed)
+    results = read_results(results_filename, results_offset)
+    return 1 if report(completed+[j for j in jobs if j.cached], elapsed, results)>0 else 0
+
+#a Toplevel
+if __name__=="__main__":
+    sys.exit(main(sys.argv[1:]))